@@ -0,0 +1,97 @@
+import operator
+from settings import *
+
+# Уровни детализации ИИ
+AI_TIER_FULL = 0  # Обновление каждый шаг
+AI_TIER_REDUCED = 1  # Обновление раз в AI_LOD_REDUCED_INTERVAL шагов
+AI_TIER_DORMANT = 2  # Без обновления, пока игрок далеко
+
+_first = operator.itemgetter(0)
+
+class AIScheduler:
+    """Планировщик обновления врагов по уровням детализации с бюджетом на шаг"""
+    def __init__(self, game, budget=AI_UPDATE_BUDGET):
+        self.game = game
+        self.budget = budget  # Число обновлений, а не время: так симуляция остаётся детерминированной
+        self.step = 0
+        self.serial = 0  # Счётчик зарегистрированных врагов для раздачи фаз
+        self.awake = []  # Враги полного и пониженного уровня на текущем шаге
+        self.due = []
+        self.batch = []  # Очередь обновлений текущего шага в пределах бюджета
+        self.overflow = []
+        self.crowd_rows = []  # Враги, по которым считается групповое поведение
+        self.pending = []  # Враги, чьё обновление перенесено на следующий шаг
+
+    def register(self, enemy):
+        """Назначение фазы новому врагу: обдумывание и редкие обновления разнесены по шагам"""
+        enemy.ai_serial = self.serial
+        enemy.ai_phase = self.serial % AI_PHASES
+        enemy.ai_last_step = self.step
+        self.serial += 1
+        # Состояние пересчитывается раз в ENEMY_THINK_INTERVAL мс, сдвиг фазы разводит врагов по разным шагам
+        enemy.last_state_update = self.game.clock.get_ticks() - ENEMY_THINK_INTERVAL * enemy.ai_phase // AI_PHASES
+
+    def clear(self):
+        """Сброс очередей при смене уровня"""
+        self.awake = []
+        self.due = []
+        self.batch = []
+        self.overflow = []
+        self.crowd_rows = []
+        self.pending = []
+
+    def plan(self):
+        """Выбор бодрствующих врагов и очереди обновлений этого шага в пределах бюджета"""
+        self.step += 1
+        step = self.step
+        player_x, player_y = self.game.player.rect.center
+        full_sq = AI_LOD_FULL_RADIUS * AI_LOD_FULL_RADIUS
+        reduced = AI_LOD_REDUCED_RADIUS
+        reduced_sq = reduced * reduced
+        # Один проход по ячейкам сетки вокруг игрока; порядок ячеек зависит от истории движения
+        # и не входит в снимок, поэтому враги сортируются по номеру регистрации
+        near = []
+        for enemy in self.game.enemy_grid.query_rect(player_x - reduced, player_y - reduced,
+                                                     player_x + reduced, player_y + reduced):
+            if not enemy.alive:
+                continue
+            dx = enemy.rect.centerx - player_x
+            dy = enemy.rect.centery - player_y
+            distance_sq = dx * dx + dy * dy
+            if distance_sq < reduced_sq:
+                near.append((enemy.ai_serial, distance_sq < full_sq, enemy))
+        near.sort(key=_first)
+        awake = [enemy for _, _, enemy in near]
+        due = [enemy for _, full, enemy in near if full or (step + enemy.ai_phase) % AI_LOD_REDUCED_INTERVAL == 0]
+        full = sum(1 for _, is_full, _ in near if is_full)
+        self.awake = awake
+        self.due = due
+
+        # Перенесённые с прошлого шага идут первыми; уснувшие и погибшие из очереди выбывают
+        awake_set = set(awake)
+        queue = [enemy for enemy in self.pending if enemy in awake_set]
+        queued = set(queue)
+        queue.extend(enemy for enemy in due if enemy not in queued)
+        self.batch = queue[:self.budget]
+        self.overflow = queue[self.budget:]
+        # Групповое поведение тоже в бюджете: при переполнении толпа считается только по очереди шага
+        self.crowd_rows = awake if len(awake) <= self.budget else self.batch
+
+        metrics = self.game.metrics
+        metrics.gauge('ai.full', full)
+        metrics.gauge('ai.reduced', len(awake) - full)
+        metrics.gauge('ai.dormant', len(self.game.enemies) - len(awake))
+
+    def run(self):
+        """Обновление врагов очереди шага, остаток переносится на следующий шаг"""
+        step = self.step
+        for enemy in self.batch:
+            # Пропущенные шаги наверстываются удлинённым шагом движения, но не больше предела
+            steps = min(step - enemy.ai_last_step, AI_MAX_CATCHUP_STEPS)
+            enemy.ai_last_step = step
+            enemy.update(steps)
+        self.pending = self.overflow
+
+        metrics = self.game.metrics
+        metrics.count('ai.updates', len(self.batch))
+        metrics.gauge('ai.pending', len(self.pending))
@@ -0,0 +1,95 @@
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from settings import *
+from level_generator import GENERATORS, create_generator
+from regions import label_regions
+from tile_grid import TILE_FLAGS
+
+STATS_COLUMNS = ('seed', 'generator', 'width', 'height', 'level', 'rooms', 'floor_ratio', 'enemies',
+                 'enemy_shortfall', 'checkpoints', 'generation_ms', 'unreachable', 'valid', 'error')
+
+def validate_layout(tiles, spawn, enemies, checkpoints, portal):
+    """Число объектов, недостижимых из точки спавна (4-связность по проходимым тайлам)"""
+    if spawn is None or portal is None:
+        return len(enemies) + len(checkpoints) + 1
+    walkable = (TILE_FLAGS[tiles] & TILE_FLAG_SOLID) == 0
+    labels, _ = label_regions(walkable)
+    spawn_label = labels[tuple(spawn)]
+    if spawn_label == 0:
+        return len(enemies) + len(checkpoints) + 1
+    points = np.array(list(enemies) + list(checkpoints) + [portal], dtype=np.int64).reshape(-1, 2)
+    return int(np.count_nonzero(labels[points[:, 0], points[:, 1]] != spawn_label))
+
+def generate_and_validate(task):
+    """Генерация одного уровня и сбор статистики; выполняется в рабочем процессе"""
+    seed, generator_name, width, height, level_number = task
+    start = time.perf_counter()
+    generator = create_generator(generator_name, width, height, level_number, random.Random(seed))
+    try:
+        tiles, spawn, enemies, portal = generator.generate()
+    except Exception as error:
+        # Ошибка одного зерна - невалидная строка статистики, а не остановка всего прогона
+        elapsed = (time.perf_counter() - start) * 1000
+        return (seed, generator_name, width, height, level_number, len(generator.rooms), 0.0, 0, 0, 0,
+                round(elapsed, 3), -1, 0, f"{type(error).__name__}: {error}")
+    elapsed = (time.perf_counter() - start) * 1000
+
+    unreachable = validate_layout(tiles, spawn, enemies, generator.checkpoints, portal)
+    shortfall = sum(requested - placed for _, requested, placed in generator.enemy_shortfall)
+    floor_ratio = float(np.count_nonzero((TILE_FLAGS[tiles] & TILE_FLAG_SOLID) == 0)) / tiles.size
+    return (seed, generator_name, width, height, level_number, len(generator.rooms), round(floor_ratio, 4),
+            len(enemies), shortfall, len(generator.checkpoints), round(elapsed, 3), unreachable,
+            int(unreachable == 0), '')
+
+def build_tasks(args):
+    """Задания (зерно, генератор, ширина, высота, уровень)"""
+    generators = sorted(GENERATORS) if args.generator == 'all' else [args.generator]
+    return [(seed, name, args.width, args.height, args.level)
+            for seed in range(args.start_seed, args.start_seed + args.count)
+            for name in generators]
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетная генерация и проверка уровней по зёрнам")
+    parser.add_argument('--count', type=int, default=100, help="Количество зёрен")
+    parser.add_argument('--start-seed', type=int, default=0, help="Первое зерно")
+    parser.add_argument('--generator', choices=sorted(GENERATORS) + ['all'], default=LEVEL_GENERATOR,
+                        help="Алгоритм генерации")
+    parser.add_argument('--width', type=int, default=LEVEL_WIDTH, help="Ширина уровня в тайлах")
+    parser.add_argument('--height', type=int, default=LEVEL_HEIGHT, help="Высота уровня в тайлах")
+    parser.add_argument('--level', type=int, default=1, help="Номер уровня (влияет на число врагов)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Число рабочих процессов")
+    parser.add_argument('--output', default='levels.tsv', help="Файл статистики (значения через табуляцию)")
+    args = parser.parse_args()
+
+    tasks = build_tasks(args)
+    # Крупные пачки заданий снижают накладные расходы на передачу между процессами
+    chunksize = max(1, len(tasks) // (args.workers * 8))
+    invalid = 0
+    failed = 0
+    start = time.perf_counter()
+    with open(args.output, 'w', encoding='utf-8') as f, \
+            ProcessPoolExecutor(max_workers=args.workers) as executor:
+        f.write('\t'.join(STATS_COLUMNS) + '\n')
+        for row in executor.map(generate_and_validate, tasks, chunksize=chunksize):
+            f.write('\t'.join(str(value) for value in row) + '\n')
+            *_, unreachable, valid, error = row
+            if error:
+                failed += 1
+                print(f"Зерно {row[0]} ({row[1]}): ошибка генерации: {error}")
+            elif not valid:
+                invalid += 1
+                print(f"Зерно {row[0]} ({row[1]}): недостижимых объектов {unreachable}")
+    elapsed = time.perf_counter() - start
+
+    print(f"Уровней: {len(tasks)}, время: {elapsed:.2f} с, {len(tasks) / elapsed:.1f} уровней/с, "
+          f"процессов: {args.workers}, с ошибками связности: {invalid}, с ошибками генерации: {failed}")
+    print(f"Статистика записана в {args.output}")
+    return 1 if invalid or failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
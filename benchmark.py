@@ -0,0 +1,316 @@
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+# Бенчмарк работает без окна
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import numpy as np
+import pygame
+from settings import *
+from input_source import InputFrame, ReplayInput, ScriptedInput, idle_script
+
+DEFAULT_RESULTS = 'benchmark_results.json'
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+
+class SubsystemTimer:
+    """Накопитель времени по подсистемам через обёртки над методами"""
+    def __init__(self):
+        self.totals = {}
+        self.calls = {}
+
+    def wrap(self, obj, attr, name):
+        """Подмена метода объекта на версию с замером времени"""
+        method = getattr(obj, attr)
+        totals = self.totals
+        calls = self.calls
+        totals.setdefault(name, 0.0)
+        calls.setdefault(name, 0)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                totals[name] += time.perf_counter() - start
+                calls[name] += 1
+
+        setattr(obj, attr, timed)
+
+    def report(self, frames):
+        """Среднее время подсистем на кадр в миллисекундах"""
+        return {name: total * 1000 / max(frames, 1) for name, total in sorted(self.totals.items())}
+
+def _summary(samples):
+    """Статистика по замерам кадров в миллисекундах"""
+    values = np.array(samples) * 1000
+    if len(values) == 0:
+        return {}
+    return {
+        'mean_ms': float(values.mean()),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p95_ms': float(np.percentile(values, 95)),
+        'max_ms': float(values.max())
+    }
+
+def make_game(seed, input_source=None):
+    """Игра с фиксированным шагом часов и заданным зерном"""
+    from game import Game
+    from game_clock import GameClock
+    return Game(input_source=input_source or ScriptedInput(idle_script),
+                seed=seed, clock=GameClock(fixed_step=SIMULATION_STEP))
+
+def spawn_enemies(game, count, radius_tiles=6):
+    """Замена врагов уровня на count врагов на полу вокруг игрока"""
+    for enemy in list(game.enemies):
+        enemy.kill()
+    game.enemy_grid.clear()
+    game.level.clear_rooms()
+
+    level = game.level
+    center_x = int(game.player.rect.centerx // level.tile_size)
+    center_y = int(game.player.rect.centery // level.tile_size)
+    floor = []
+    for tile_x in range(max(0, center_x - radius_tiles), min(level.width, center_x + radius_tiles + 1)):
+        for tile_y in range(max(0, center_y - radius_tiles), min(level.height, center_y + radius_tiles + 1)):
+            if not level.grid.has_flag(tile_x, tile_y, TILE_FLAG_SOLID) and (tile_x, tile_y) != (center_x, center_y):
+                floor.append((tile_x, tile_y))
+
+    rng = random.Random(game.seed)
+    for _ in range(count):
+        tile_x, tile_y = rng.choice(floor)
+        game.create_enemy((tile_x * level.tile_size + rng.randint(8, level.tile_size - 8),
+                           tile_y * level.tile_size + rng.randint(8, level.tile_size - 8)))
+
+def instrument(game, timer):
+    """Подключение замеров к подсистемам игры"""
+    timer.wrap(game.ai, 'plan', 'ai_plan')
+    timer.wrap(game.ai, 'run', 'ai_update')
+    timer.wrap(game.projectiles, 'update', 'projectiles')
+    timer.wrap(game.crowd, 'update', 'crowd_steering')
+    timer.wrap(game.level.flow_field, 'update', 'flow_field')
+    timer.wrap(game, 'check_projectile_hits', 'projectile_hits')
+    timer.wrap(game.level, 'update_portal', 'portal')
+    timer.wrap(game.level, 'draw', 'level_draw')
+    timer.wrap(game.hud, 'draw', 'hud_draw')
+
+def run_frames(game, frames, draw=False):
+    """Прогон кадров с замером update и draw по отдельности"""
+    timer = SubsystemTimer()
+    instrument(game, timer)
+    surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)) if draw else None
+    update_samples = []
+    draw_samples = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        game.update()
+        update_samples.append(time.perf_counter() - start)
+        if surface is not None:
+            start = time.perf_counter()
+            game.draw(surface)
+            draw_samples.append(time.perf_counter() - start)
+    result = {'frames': frames, 'update': _summary(update_samples), 'subsystems': timer.report(frames)}
+    if draw_samples:
+        result['draw'] = _summary(draw_samples)
+    return result
+
+def measure_memory(build):
+    """Пиковое выделение памяти Python при подготовке сценария"""
+    tracemalloc.start()
+    try:
+        build()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak // 1024
+
+def scenario_level_generation(generator, size, seed, repeats):
+    """Генерация уровня size x size указанным алгоритмом"""
+    from level_generator import create_generator
+
+    def generate():
+        return create_generator(generator, size, size, 1, random.Random(seed)).generate()
+
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        generate()
+        samples.append(time.perf_counter() - start)
+    return {'generate': _summary(samples), 'peak_memory_kb': measure_memory(generate)}
+
+def scenario_enemy_chase(count, seed, frames):
+    """count врагов преследуют стоящего игрока"""
+    def build():
+        game = make_game(seed)
+        spawn_enemies(game, count)
+        return game
+
+    memory = measure_memory(build)
+    result = run_frames(build(), frames)
+    result['peak_memory_kb'] = memory
+    return result
+
+def make_spam_script():
+    """Непрерывная стрельба всеми четырьмя заклинаниями по кругу"""
+    weapons = (pygame.K_1, pygame.K_2, pygame.K_3, pygame.K_4)
+
+    def script(frame, game):
+        player = game.player
+        # Снимаем ограничения маны и кулдаунов, чтобы каждый кадр был выстрел
+        player.current_mana = player.max_mana
+        for weapon in player.weapons.values():
+            weapon.last_cast_time = -10 ** 9
+        angle = frame * 0.3
+        aim = (player.rect.centerx + math.cos(angle) * 300, player.rect.centery + math.sin(angle) * 300)
+        return InputFrame(keys=(weapons[frame % len(weapons)],), mouse_buttons=(True, False, False), mouse_pos=aim)
+
+    return script
+
+def scenario_projectile_spam(seed, frames, enemies):
+    """Заклинания каждый кадр при enemies врагах вокруг"""
+    game = make_game(seed, ScriptedInput(make_spam_script()))
+    spawn_enemies(game, enemies)
+    return run_frames(game, frames)
+
+def scenario_draw(count, seed, frames):
+    """Отрисовка кадра во внеэкранную поверхность при count врагах"""
+    game = make_game(seed)
+    spawn_enemies(game, count)
+    return run_frames(game, frames, draw=True)
+
+def scenario_replay(path, draw):
+    """Воспроизведение записанной сессии со сверкой хэшей состояния"""
+    replay = ReplayInput(path)
+    result = run_frames(make_game(replay.seed, replay), len(replay), draw=draw)
+    result['desync_frames'] = replay.mismatches
+    if replay.mismatches:
+        print(f"РАСХОЖДЕНИЕ в записи {path}: первое на шаге {replay.first_mismatch}")
+    return result
+
+def build_scenarios(quick, replays=()):
+    """Список сценариев (имя, функция без аргументов)"""
+    frames = 10 if quick else 60
+    sizes = (50, 100) if quick else (50, 100, 200, 500, 1000)
+    generators = ('rooms',) if quick else ('rooms', 'bsp', 'caves')
+    crowds = (100, 1000) if quick else (100, 1000, 5000)
+    seed = 1
+    scenarios = []
+    for generator in generators:
+        for size in sizes:
+            repeats = 3 if quick or size >= 500 else 10
+            scenarios.append((f'level_generation_{generator}_{size}x{size}',
+                              lambda generator=generator, size=size, repeats=repeats:
+                              scenario_level_generation(generator, size, seed, repeats)))
+    for count in crowds:
+        scenarios.append((f'enemy_chase_{count}',
+                          lambda count=count: scenario_enemy_chase(count, seed, frames)))
+    scenarios.append(('projectile_spam', lambda: scenario_projectile_spam(seed, frames * 2, 200)))
+    scenarios.append(('draw_1000', lambda: scenario_draw(1000, seed, frames)))
+    # Записанные сессии (main.py --record) как повторяемые нагрузочные тесты
+    for path in replays:
+        name = os.path.splitext(os.path.basename(path))[0]
+        scenarios.append((f'replay_{name}', lambda path=path: scenario_replay(path, draw=not quick)))
+    return scenarios
+
+def _timing_metrics(result, prefix=''):
+    """Плоский список всех средних времён сценария"""
+    metrics = {}
+    for key, value in result.items():
+        if isinstance(value, dict):
+            metrics.update(_timing_metrics(value, f'{prefix}{key}.'))
+        elif key == 'mean_ms' or prefix.startswith('subsystems.'):
+            metrics[f'{prefix}{key}'] = value
+    return metrics
+
+def compare(results, baseline, tolerance, min_ms=0.1):
+    """Сравнение с базовой линией; возвращает список регрессий"""
+    regressions = []
+    for name, result in results['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if base is None:
+            continue
+        current = _timing_metrics(result)
+        previous = _timing_metrics(base)
+        for metric, value in current.items():
+            old = previous.get(metric)
+            if old is None or old < min_ms:
+                continue
+            if value > old * (1 + tolerance):
+                regressions.append((name, metric, old, value))
+    return regressions
+
+def run(scenario_filter=None, quick=False, replays=()):
+    """Прогон всех сценариев, результат в виде словаря"""
+    pygame.init()
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'pygame': pygame.version.ver,
+            'numpy': np.__version__,
+            'quick': quick
+        },
+        'scenarios': {}
+    }
+    for name, scenario in build_scenarios(quick, replays):
+        if scenario_filter and scenario_filter not in name:
+            continue
+        start = time.perf_counter()
+        results['scenarios'][name] = scenario()
+        print(f"{name}: {time.perf_counter() - start:.2f} с")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Сценарные бенчмарки игры")
+    parser.add_argument('--output', default=DEFAULT_RESULTS, help="Файл результатов")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Файл базовой линии для сравнения")
+    parser.add_argument('--save-baseline', action='store_true', help="Сохранить результаты как базовую линию")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Допустимое относительное замедление")
+    parser.add_argument('--min-ms', type=float, default=0.1, help="Метрики быстрее этого порога не сравниваются")
+    parser.add_argument('--scenario', help="Запускать только сценарии, содержащие эту строку")
+    parser.add_argument('--quick', action='store_true', help="Сокращённый набор сценариев")
+    parser.add_argument('--replay', action='append', default=[], metavar='FILE',
+                        help="Добавить сценарий воспроизведения записанного ввода (можно несколько раз)")
+    args = parser.parse_args()
+
+    results = run(args.scenario, args.quick, args.replay)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"Результаты записаны в {args.output}")
+
+    # Разошедшаяся запись измеряет уже другую игру, сравнивать её время бессмысленно
+    desynced = [name for name, result in results['scenarios'].items() if result.get('desync_frames')]
+    if desynced:
+        print(f"Воспроизведение разошлось с записью: {', '.join(desynced)}")
+        return 1
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"Базовая линия сохранена в {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("Базовая линия не найдена, сравнение пропущено")
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance, args.min_ms)
+    for name, metric, old, new in regressions:
+        print(f"РЕГРЕССИЯ {name} {metric}: {old:.3f} мс -> {new:.3f} мс")
+    if regressions:
+        return 1
+    print(f"Регрессий нет (допуск {args.tolerance:.0%})")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -8,9 +8,17 @@ class Camera:
         self.DISPLAY_W = SCREEN_WIDTH
         self.DISPLAY_H = SCREEN_HEIGHT
         self.offset_float = pygame.math.Vector2(0, 0)
+        
+        # Интерполяция отрисовки между шагами симуляции
+        self.previous_offset = pygame.math.Vector2(0, 0)
+        self.render_offset = pygame.math.Vector2(0, 0)
+        self.alpha = 1.0
+        self.previous_positions = {}
 
     def scroll(self):
         """Плавное следование за целью"""
+        self.previous_offset.update(self.offset)
+        
         # Вычисляем желаемое положение камеры
         desired_x = self.target.rect.centerx - self.DISPLAY_W // 2
         desired_y = self.target.rect.centery - self.DISPLAY_H // 2
@@ -22,26 +30,57 @@ class Camera:
         # Обновляем целочисленное смещение для отрисовки
         self.offset.x = int(self.offset_float.x)
         self.offset.y = int(self.offset_float.y)
+        self.render_offset.update(self.offset)
+
+    def interpolate(self, alpha, previous_positions):
+        """Подготовка отрисовки в доле alpha между предыдущим и текущим шагом симуляции"""
+        self.alpha = alpha
+        self.previous_positions = previous_positions
+        self.render_offset.x = round(self.previous_offset.x + (self.offset.x - self.previous_offset.x) * alpha)
+        self.render_offset.y = round(self.previous_offset.y + (self.offset.y - self.previous_offset.y) * alpha)
+
+    def render_position(self, entity):
+        """Мировая позиция левого верхнего угла спрайта на момент отрисовки"""
+        rect = entity.rect
+        if self.alpha >= 1:
+            return rect.x, rect.y
+        previous = self.previous_positions.get(entity)
+        if previous is None:
+            return rect.x, rect.y
+        dx = rect.x - previous[0]
+        dy = rect.y - previous[1]
+        # Телепорт (возрождение, новый уровень) не растягиваем на промежуточные кадры
+        if abs(dx) + abs(dy) > INTERPOLATION_MAX_JUMP:
+            return rect.x, rect.y
+        return round(previous[0] + dx * self.alpha), round(previous[1] + dy * self.alpha)
 
     def apply(self, entity):
         """Применяет смещение камеры к спрайту"""
-        return pygame.Rect(entity.rect.x - self.offset.x,
-                         entity.rect.y - self.offset.y,
+        x, y = self.render_position(entity)
+        return pygame.Rect(x - self.render_offset.x,
+                         y - self.render_offset.y,
                          entity.rect.width,
                          entity.rect.height)
 
     def apply_rect(self, rect):
         """Применяет смещение камеры к прямоугольнику"""
-        return pygame.Rect(rect.x - self.offset.x,
-                         rect.y - self.offset.y,
+        return pygame.Rect(rect.x - self.render_offset.x,
+                         rect.y - self.render_offset.y,
                          rect.width,
                          rect.height)
 
+    def view_rect(self):
+        """Мировой прямоугольник, видимый на экране"""
+        return pygame.Rect(self.render_offset.x, self.render_offset.y, self.DISPLAY_W, self.DISPLAY_H)
+
     def apply_point(self, x, y):
         """Применяет смещение камеры к точке"""
-        return (x - self.offset.x, y - self.offset.y)
+        return (x - self.render_offset.x, y - self.render_offset.y)
 
     def reset(self):
         """Сброс позиции камеры"""
         self.offset = pygame.math.Vector2(0, 0)
-        self.offset_float = pygame.math.Vector2(0, 0) 
\ No newline at end of file
+        self.offset_float = pygame.math.Vector2(0, 0)
+        self.previous_offset = pygame.math.Vector2(0, 0)
+        self.render_offset = pygame.math.Vector2(0, 0)
+        self.previous_positions = {}
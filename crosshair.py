@@ -2,8 +2,9 @@ import pygame
 from settings import *
 
 class Crosshair(pygame.sprite.Sprite):
-    def __init__(self):
+    def __init__(self, game):
         super().__init__()
+        self.game = game
         # Создаем поверхность для прицела
         self.image = pygame.Surface((CROSSHAIR_SIZE, CROSSHAIR_SIZE), pygame.SRCALPHA)
         
@@ -21,11 +22,9 @@ class Crosshair(pygame.sprite.Sprite):
                         CROSSHAIR_WIDTH)
         
         self.rect = self.image.get_rect()
-        
-        # Скрываем системный курсор
-        pygame.mouse.set_visible(False)
 
     def update(self):
-        # Обновляем позицию прицела в соответствии с позицией мыши
-        pos = pygame.mouse.get_pos()
-        self.rect.center = pos 
\ No newline at end of file
+        # Позиция мыши на экране: смещение камеры то же, по которому ввод переводился в мир
+        mouse_x, mouse_y = self.game.input.mouse_pos
+        offset = self.game.camera.offset
+        self.rect.center = (mouse_x - offset.x, mouse_y - offset.y)
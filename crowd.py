@@ -0,0 +1,172 @@
+import numpy as np
+import pygame
+from settings import *
+
+# Коды состояний ИИ для массивов толпы
+STATE_CODES = {
+    'wander': 0,
+    'chase': 1,
+    'attack': 2,
+    'flee': 3,
+    'idle': 4,
+    'patrol': 5,
+    'stunned': 6
+}
+
+def neighbor_pairs(positions, radius):
+    """Пары индексов (i, j) и расстояния между точками ближе radius"""
+    count = len(positions)
+    if count < 2:
+        empty = np.zeros(0, dtype=np.intp)
+        return empty, empty, np.zeros(0)
+
+    # Раскладываем точки по ячейкам размером radius и сортируем по ключу ячейки
+    cells = np.floor(positions / radius).astype(np.int64)
+    cells -= cells.min(axis=0)
+    stride = int(cells[:, 1].max()) + 3
+    keys = (cells[:, 0] + 1) * stride + (cells[:, 1] + 1)
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    indices = np.arange(count)
+
+    pairs_i = []
+    pairs_j = []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            target = keys + dx * stride + dy
+            start = np.searchsorted(sorted_keys, target, 'left')
+            end = np.searchsorted(sorted_keys, target, 'right')
+            counts = end - start
+            total = int(counts.sum())
+            if total == 0:
+                continue
+            # Разворачиваем диапазоны [start, end) в плоский список индексов
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            pairs_i.append(np.repeat(indices, counts))
+            pairs_j.append(order[np.repeat(start, counts) + offsets])
+
+    if not pairs_i:
+        empty = np.zeros(0, dtype=np.intp)
+        return empty, empty, np.zeros(0)
+
+    i = np.concatenate(pairs_i)
+    j = np.concatenate(pairs_j)
+    delta = positions[j] - positions[i]
+    distances = np.hypot(delta[:, 0], delta[:, 1])
+    mask = (i != j) & (distances < radius)
+    # Сортируем пары по i, чтобы порядок соседей был детерминированным
+    i, j, distances = i[mask], j[mask], distances[mask]
+    pair_order = np.lexsort((j, i))
+    return i[pair_order], j[pair_order], distances[pair_order]
+
+def _normalize_rows(vectors):
+    """Нормализация векторов построчно, нулевые векторы остаются нулевыми"""
+    lengths = np.hypot(vectors[:, 0], vectors[:, 1])
+    result = np.zeros_like(vectors)
+    nonzero = lengths > 0
+    result[nonzero] = vectors[nonzero] / lengths[nonzero, None]
+    return result
+
+class CrowdSteering:
+    """Пакетный расчёт группового поведения врагов на массивах NumPy"""
+    def __init__(self, rng=None):
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.active = False
+        self.enemies = []
+        self.positions = np.zeros((0, 2))
+        self.velocities = np.zeros((0, 2))
+        self.hp_ratios = np.zeros(0)
+        self.states = np.zeros(0, dtype=np.int8)
+        self.steering = np.zeros((0, 2))
+        self.has_neighbors = np.zeros(0, dtype=bool)
+
+    def sync(self, enemies):
+        """Копирование состояния живых врагов в непрерывные массивы"""
+        self.enemies = [enemy for enemy in enemies if enemy.alive]
+        count = len(self.enemies)
+        self.positions = np.empty((count, 2))
+        self.velocities = np.empty((count, 2))
+        self.hp_ratios = np.empty(count)
+        self.states = np.empty(count, dtype=np.int8)
+        for index, enemy in enumerate(self.enemies):
+            enemy.crowd_index = index
+            self.positions[index] = enemy.position
+            self.velocities[index] = enemy.velocity
+            self.hp_ratios[index] = enemy.current_hp / enemy.max_hp
+            self.states[index] = STATE_CODES.get(enemy.state, -1)
+
+    def compute(self):
+        """Расчёт разделения, выравнивания и сплочённости для всех врагов за один проход"""
+        count = len(self.enemies)
+        i, j, distances = neighbor_pairs(self.positions, CROWD_NEIGHBOR_RADIUS)
+        neighbor_count = np.bincount(i, minlength=count)
+        self.has_neighbors = neighbor_count > 0
+        self.steering = np.zeros((count, 2))
+        if len(i) == 0:
+            return
+
+        # Разделение: только очень близкие соседи, вес обратно пропорционален расстоянию
+        close = distances < MIN_ENEMY_DISTANCE
+        away = self.positions[i] - self.positions[j]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            away = np.where(distances[:, None] > 0, away / distances[:, None], 0.0)
+        push = away / (distances[:, None] + 0.1) * close[:, None]
+        separation = np.stack([
+            np.bincount(i, push[:, 0], count),
+            np.bincount(i, push[:, 1], count)
+        ], axis=1)
+
+        # Лидер группы: сосед с максимальным здоровьем и бонусом за преследование
+        scores = self.hp_ratios[j] + (self.states[j] == STATE_CODES['chase'])
+        best = np.zeros(count)
+        np.maximum.at(best, i, scores)
+        leader_pairs = np.flatnonzero((scores == best[i]) & (scores > 0))
+        _, first = np.unique(i[leader_pairs], return_index=True)
+        is_leader = np.zeros(len(i), dtype=bool)
+        is_leader[leader_pairs[first]] = True
+
+        # Выравнивание по направлению движения соседей, лидер весит вдвое больше
+        heading = _normalize_rows(self.velocities)[j] * np.where(is_leader, 2.0, 1.0)[:, None]
+        alignment = np.stack([
+            np.bincount(i, heading[:, 0], count),
+            np.bincount(i, heading[:, 1], count)
+        ], axis=1)
+
+        # Сплочённость и попытка окружить цель, если оба врага атакуют
+        pull = self.positions[j] - self.positions[i]
+        attack = STATE_CODES['attack']
+        both_attack = (self.states[i] == attack) & (self.states[j] == attack)
+        if both_attack.any():
+            angles = self.rng.uniform(0, 2 * np.pi, int(both_attack.sum()))
+            pull[both_attack] += np.stack([np.cos(angles), np.sin(angles)], axis=1) * ENEMY_ATTACK_RANGE * 0.5
+        cohesion = np.stack([
+            np.bincount(i, pull[:, 0], count),
+            np.bincount(i, pull[:, 1], count)
+        ], axis=1)
+
+        divisor = np.maximum(neighbor_count, 1)[:, None]
+        separation = _normalize_rows(separation) * 1.8
+        alignment = _normalize_rows(alignment / divisor) * 0.8
+        cohesion = _normalize_rows(cohesion / divisor) * 0.4
+        random_deviation = self.rng.uniform(-0.2, 0.2, (count, 2))
+
+        self.steering = (separation + alignment + cohesion + random_deviation) * 0.15
+        self.steering[~self.has_neighbors] = 0
+
+    def update(self, enemies, population=None):
+        """Пакетный проход за кадр, если врагов (population, по умолчанию len(enemies)) достаточно для режима толпы"""
+        population = len(enemies) if population is None else population
+        self.active = CROWD_STEERING and population >= CROWD_STEERING_MIN_ENEMIES
+        if not self.active:
+            return
+        self.sync(enemies)
+        self.compute()
+
+    def steering_for(self, enemy):
+        """Вектор группового поведения для врага или None, если соседей нет"""
+        index = enemy.crowd_index
+        if index < 0 or index >= len(self.enemies) or self.enemies[index] is not enemy:
+            return None
+        if not self.has_neighbors[index]:
+            return None
+        return pygame.math.Vector2(float(self.steering[index, 0]), float(self.steering[index, 1]))
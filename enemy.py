@@ -1,12 +1,32 @@
+import time
 import pygame
 import math
-import random
 from settings import *
 
+# Дальность проверки прямого пути к игроку
+PATH_PROBE_DISTANCE = 3 * TILESIZE
+
+# Общие изображения врагов по (размер, цвет); сами изображения не изменяются
+_SPRITE_IMAGES = {}
+
+def enemy_image(size=ENEMY_SIZE, color=ENEMY_COLOR):
+    """Общее изображение врага; создаётся один раз на размер и цвет"""
+    image = _SPRITE_IMAGES.get((size, color))
+    if image is None:
+        radius = size // 2
+        image = pygame.Surface((size, size), pygame.SRCALPHA)
+        pygame.draw.circle(image, color, (radius, radius), radius)
+        _SPRITE_IMAGES[(size, color)] = image
+    return image
+
 class BaseEnemy(pygame.sprite.Sprite):
     def __init__(self, x, y, game):
         super().__init__()
         self.game = game
+        self.clock = game.clock
+        self.rng = game.rng
+        self.metrics = game.metrics
+        self.trace_name = f'ai.{type(self).__name__}'  # Сводный участок трассы для класса врага
         self.spawn_position = (x, y)
         self.init_sprite()
         
@@ -34,9 +54,14 @@ class BaseEnemy(pygame.sprite.Sprite):
         self.last_pathfinding_time = 0
         self.cached_direction = None
         self.direction_cache_time = 0
+        self.crowd_index = -1  # Индекс в массивах режима толпы
+        self.ai_phase = 0  # Фаза обновлений, назначается планировщиком ИИ
+        self.ai_last_step = 0  # Шаг планировщика, на котором враг обновлялся последним
+        self.ai_serial = 0  # Номер регистрации: устойчивый порядок обновления и обхода соседей
+        self.room = -1  # Номер комнаты уровня, с которой враг засыпает (-1 - вне комнат)
         
-        # Создаем копию изображения для анимации урона
-        self.original_image = self.image.copy()
+        # Исходное изображение для анимации урона; вспышка рисуется на копии
+        self.original_image = self.image
         
         self.states = {
             'idle': self.idle_state,
@@ -53,8 +78,7 @@ class BaseEnemy(pygame.sprite.Sprite):
     def init_sprite(self):
         """Инициализация спрайта"""
         self.radius = ENEMY_SIZE // 2
-        self.image = pygame.Surface((ENEMY_SIZE, ENEMY_SIZE), pygame.SRCALPHA)
-        pygame.draw.circle(self.image, ENEMY_COLOR, (self.radius, self.radius), self.radius)
+        self.image = enemy_image()
         self.rect = self.image.get_rect()
         self.rect.center = self.spawn_position
 
@@ -74,20 +98,24 @@ class BaseEnemy(pygame.sprite.Sprite):
             return pygame.math.Vector2(0, 0)
         return pygame.math.Vector2(dx / distance, dy / distance)
 
+    def can_see_player(self, player):
+        """Прямая видимость игрока без стен между тайлами"""
+        return self.game.level.has_line_of_sight(self.rect.center, player.rect.center)
+
     def get_random_target(self):
         """Выбирает случайную точку для блуждания"""
-        angle = random.uniform(0, 2 * math.pi)
-        distance = random.uniform(0, ENEMY_WANDER_RADIUS)
+        angle = self.rng.uniform(0, 2 * math.pi)
+        distance = self.rng.uniform(0, ENEMY_WANDER_RADIUS)
         target_x = self.spawn_position[0] + math.cos(angle) * distance
         target_y = self.spawn_position[1] + math.sin(angle) * distance
         return pygame.math.Vector2(target_x, target_y)
 
     def update_state(self, player):
         """Обновляет состояние ИИ"""
-        current_time = pygame.time.get_ticks()
+        current_time = self.clock.get_ticks()
         
-        # Обновляем состояние только каждые 100мс
-        if current_time - self.last_state_update < 100:
+        # Обновляем состояние только каждые ENEMY_THINK_INTERVAL мс
+        if current_time - self.last_state_update < ENEMY_THINK_INTERVAL:
             return
             
         self.last_state_update = current_time
@@ -99,8 +127,10 @@ class BaseEnemy(pygame.sprite.Sprite):
         # Проверяем расстояние ��ля атаки
         elif distance_to_player <= ENEMY_ATTACK_RANGE:
             self.state = 'attack'
-        # Проверяем расстояние для преследования
-        elif distance_to_player <= ENEMY_AGGRO_RANGE:
+        # Проверяем расстояние для преследования: заметить игрока можно только при прямой видимости,
+        # а уже начатое преследование продолжается и за углом
+        elif distance_to_player <= ENEMY_AGGRO_RANGE and \
+                (self.state in ('chase', 'attack') or self.can_see_player(player)):
             self.state = 'chase'
         # Иначе блуждаем
         else:
@@ -112,26 +142,11 @@ class BaseEnemy(pygame.sprite.Sprite):
 
     def collide_with_walls(self, dx=0, dy=0):
         """Проверка коллизий со стенами"""
-        # Проверяем четыре угла и центры сторон противника
-        test_points = [
-            (self.rect.centerx + dx, self.rect.centery + dy),  # Центр
-            (self.rect.left + dx, self.rect.top + dy),         # Верхний левый
-            (self.rect.right + dx, self.rect.top + dy),        # Верхний правый
-            (self.rect.left + dx, self.rect.bottom + dy),      # Нижний левый
-            (self.rect.right + dx, self.rect.bottom + dy),     # Нижний правый
-            (self.rect.centerx + dx, self.rect.top + dy),      # Центр верха
-            (self.rect.centerx + dx, self.rect.bottom + dy),   # Центр низа
-            (self.rect.left + dx, self.rect.centery + dy),     # Центр левой стороны
-            (self.rect.right + dx, self.rect.centery + dy)     # Центр правой стороны
-        ]
-        
-        for x, y in test_points:
-            if self.game.level.is_wall_at(x, y):
-                return True
-        return False
-
-    def update_movement(self, player):
-        """Обновляет движение в зависимости от состояния"""
+        # Проверяем все тайлы под смещённым прямоугольником противника одним срезом карты
+        return self.game.level.is_wall_in_rect(self.rect, dx, dy)
+
+    def update_movement(self, player, steps=1):
+        """Обновляет движение в зависимости от состояния; steps - число шагов симуляции с прошлого обновления"""
         # Обновляем отталкивание
         if self.knockback.length() > 0:
             new_pos = self.position + self.knockback
@@ -157,20 +172,13 @@ class BaseEnemy(pygame.sprite.Sprite):
         elif self.state == 'flee':
             flee_direction = -self.get_direction_to_player(player)
             # Упрощенное отталкивание от других врагов
-            for other in self.game.enemies:
-                if other != self and other.alive:
-                    dx = self.rect.centerx - other.rect.centerx
-                    dy = self.rect.centery - other.rect.centery
-                    dist_sq = dx * dx + dy * dy
-                    if dist_sq < ENEMY_ATTACK_RANGE * ENEMY_ATTACK_RANGE * 4:
-                        dist = math.sqrt(dist_sq)
-                        flee_direction += pygame.math.Vector2(dx/dist, dy/dist) * 0.5
+            flee_direction += self._get_flee_repulsion()
             
             if flee_direction.length() > 0:
                 self.velocity = flee_direction.normalize() * ENEMY_SPEED
         
         elif self.state == 'wander':
-            current_time = pygame.time.get_ticks()
+            current_time = self.clock.get_ticks()
             if self.wander_target is None or current_time > self.wander_pause_time:
                 self.wander_target = self._get_valid_wander_target()
                 self.wander_pause_time = current_time + ENEMY_WANDER_PAUSE
@@ -184,7 +192,7 @@ class BaseEnemy(pygame.sprite.Sprite):
             self._apply_group_behavior()
             
             # Оптимизированная проверка коллизий
-            new_pos = self.position + self.velocity
+            new_pos = self.position + self.velocity * steps
             if not self.collide_with_walls(new_pos.x - self.position.x, new_pos.y - self.position.y):
                 if not self.collide_with_enemies(new_pos.x - self.position.x, new_pos.y - self.position.y, self.game):
                     self.position = new_pos
@@ -192,17 +200,23 @@ class BaseEnemy(pygame.sprite.Sprite):
                     # Пробуем только основные направления при коллизии
                     for angle in [45, -45]:
                         test_direction = self._rotate_vector(self.velocity.normalize(), angle)
-                        test_pos = self.position + test_direction * self.velocity.length()
+                        test_pos = self.position + test_direction * (self.velocity.length() * steps)
                         if not self.collide_with_enemies(test_pos.x - self.position.x, test_pos.y - self.position.y, self.game) and \
                            not self.collide_with_walls(test_pos.x - self.position.x, test_pos.y - self.position.y):
                             self.position = test_pos
                             break
         
         self.rect.center = self.position
+        self.game.enemy_grid.move(self)
 
     def _get_path_direction(self, player):
         """Получает направление к игроку с учетом препятствий"""
-        current_time = pygame.time.get_ticks()
+        # Общее поле направлений: одно обращение к массиву вместо проб
+        direction = self.game.level.flow_field.direction_at(self.position)
+        if direction is not None:
+            return direction
+        
+        current_time = self.clock.get_ticks()
         
         # Используем кэшированное направление, если оно актуально
         if self.cached_direction and current_time - self.direction_cache_time < 200:
@@ -210,16 +224,11 @@ class BaseEnemy(pygame.sprite.Sprite):
             
         direction = self.get_direction_to_player(player)
         
-        # Проверяем, есть ли прямой путь к игроку
-        test_pos = self.position.copy()
-        step = direction * TILESIZE
-        
-        # Уменьшаем количество проверок
-        for _ in range(3):  # Проверяем только 3 шага вперед вместо 5
-            test_pos += step
-            if self.game.level.is_wall_at(test_pos.x, test_pos.y):
-                direction = self._find_alternative_direction(player)
-                break
+        # Проверяем, есть ли прямой путь к игроку на 3 тайла вперед одним лучом
+        steps = min(PATH_PROBE_DISTANCE, self.get_distance_to_player(player))
+        probe_end = (self.position.x + direction.x * steps, self.position.y + direction.y * steps)
+        if not self.game.level.has_line_of_sight(self.position, probe_end):
+            direction = self._find_alternative_direction(player)
         
         # Кэшируем результат
         self.cached_direction = direction
@@ -274,6 +283,15 @@ class BaseEnemy(pygame.sprite.Sprite):
         """Применяет улучшенное групповое поведение"""
         if self.velocity.length() == 0:
             return
+        
+        # В режиме толпы силы уже посчитаны пакетно для всех врагов
+        if self.game.crowd.active:
+            steering = self.game.crowd.steering_for(self)
+            if steering is not None:
+                self.velocity += steering
+                if self.velocity.length() > 0:
+                    self.velocity = self.velocity.normalize() * self.speed
+            return
             
         separation = pygame.math.Vector2(0, 0)
         alignment = pygame.math.Vector2(0, 0)
@@ -284,23 +302,16 @@ class BaseEnemy(pygame.sprite.Sprite):
         leader_score = 0
         
         nearby_enemies = []
-        check_distance = MIN_ENEMY_DISTANCE * 3
+        check_distance = CROWD_NEIGHBOR_RADIUS
         
-        for other in self.game.enemies:
-            if other != self and other.alive:
-                dx = self.rect.centerx - other.rect.centerx
-                dy = self.rect.centery - other.rect.centery
-                dist_sq = dx * dx + dy * dy
-                
-                if dist_sq < check_distance * check_distance:
-                    distance = math.sqrt(dist_sq)
-                    nearby_enemies.append((other, distance))
-                    
-                    # Определяем лиде��а группы
-                    other_score = other.current_hp / other.max_hp + (1 if other.state == 'chase' else 0)
-                    if other_score > leader_score:
-                        leader_score = other_score
-                        leader = other
+        for other, distance in self.game.enemy_grid.neighbors(self, check_distance):
+            nearby_enemies.append((other, distance))
+            
+            # Определяем лиде��а группы
+            other_score = other.current_hp / other.max_hp + (1 if other.state == 'chase' else 0)
+            if other_score > leader_score:
+                leader_score = other_score
+                leader = other
         
         if nearby_enemies:
             for other, distance in nearby_enemies:
@@ -321,7 +332,7 @@ class BaseEnemy(pygame.sprite.Sprite):
                 # Тактическое позиционирование
                 if self.state == 'attack' and other.state == 'attack':
                     # Пытаемся окружить цель
-                    angle = random.uniform(0, 2 * math.pi)
+                    angle = self.rng.uniform(0, 2 * math.pi)
                     tactical_pos = pygame.math.Vector2(
                         math.cos(angle) * ENEMY_ATTACK_RANGE,
                         math.sin(angle) * ENEMY_ATTACK_RANGE
@@ -340,8 +351,8 @@ class BaseEnemy(pygame.sprite.Sprite):
             
             # Добавляем случайное отклонение для более естественного движения
             random_deviation = pygame.math.Vector2(
-                random.uniform(-0.2, 0.2),
-                random.uniform(-0.2, 0.2)
+                self.rng.uniform(-0.2, 0.2),
+                self.rng.uniform(-0.2, 0.2)
             )
             
             # Комбинируем все силы
@@ -380,7 +391,7 @@ class BaseEnemy(pygame.sprite.Sprite):
         if not hasattr(self, 'last_pathfinding_time'):
             self.last_pathfinding_time = 0
         
-        current_time = pygame.time.get_ticks()
+        current_time = self.clock.get_ticks()
         if current_time - self.last_pathfinding_time < 500:  # Проверяем путь каждые 500мс
             return
             
@@ -397,7 +408,7 @@ class BaseEnemy(pygame.sprite.Sprite):
 
     def try_attack(self, player):
         """Пытается атаковать игрока"""
-        current_time = pygame.time.get_ticks()
+        current_time = self.clock.get_ticks()
         if self.state == 'attack' and current_time - self.last_attack_time >= ENEMY_ATTACK_COOLDOWN:
             self.last_attack_time = current_time
             # Наносим урон и отталкивание
@@ -409,19 +420,22 @@ class BaseEnemy(pygame.sprite.Sprite):
         """Получение урона"""
         self.current_hp -= amount
         self.is_hit = True
-        self.hit_time = pygame.time.get_ticks()
+        self.hit_time = self.clock.get_ticks()
         
         if self.current_hp <= 0:
             self.current_hp = 0
             self.alive = False
             self.kill()  # Удаляем врага из всех групп спрайтов
+            self.game.enemy_grid.remove(self)
+            self.game.emit_particles('death', *self.rect.center)
             return True  # Враг умер
+        self.game.emit_particles('hit', *self.rect.center)
         return False  # Враг жив
 
     def update_damage_animation(self):
         """Обновление анимации получения урона"""
         if self.is_hit:
-            current_time = pygame.time.get_ticks()
+            current_time = self.clock.get_ticks()
             if current_time - self.hit_time <= ENEMY_DAMAGE_FLASH_DURATION:
                 self.image = self.original_image.copy()
                 self.image.fill(DAMAGE_FLASH_COLOR, special_flags=pygame.BLEND_ADD)
@@ -429,9 +443,10 @@ class BaseEnemy(pygame.sprite.Sprite):
                 self.image = self.original_image.copy()
                 self.is_hit = False
 
-    def update(self):
-        """Обновление состояния противника"""
+    def update(self, steps=1):
+        """Обновление состояния противника за steps шагов симуляции (больше одного у дальних врагов)"""
         if self.alive:
+            start = time.perf_counter()
             # Получаем игрока из game
             player = self.game.player
             
@@ -443,8 +458,9 @@ class BaseEnemy(pygame.sprite.Sprite):
                 self.states[self.state](player)
             
             # Обновляем движение и анимации
-            self.update_movement(player)
+            self.update_movement(player, steps)
             self.update_damage_animation()
+            self.metrics.add_time(self.trace_name, time.perf_counter() - start)
 
     def draw_health_bar(self, screen):
         """Отрисовка полоски здоровья"""
@@ -472,25 +488,29 @@ class BaseEnemy(pygame.sprite.Sprite):
         if not game:
             return False
             
+        game.metrics.count('collision_checks')
         # Временно вычисляем новую позицию центра
         center_x = self.rect.centerx + dx
         center_y = self.rect.centery + dy
         
-        for other in game.enemies:
-            if other != self and other.alive:
-                # Вычисляем расстояние между центрами
-                distance = math.sqrt(
-                    (center_x - other.rect.centerx) ** 2 + 
-                    (center_y - other.rect.centery) ** 2
-                )
-                # Если расстояние меньше суммы радиусов - есть столкновение
-                if distance < (self.radius + other.radius):
-                    return True
-        return False 
+        # Проверяем только врагов из соседних ячеек пространственной сетки
+        return game.enemy_grid.any_overlap(center_x, center_y, self.radius,
+                                           ENEMY_SIZE // 2, exclude=self)
+
+    def _get_flee_repulsion(self):
+        """Суммарное отталкивание от ближайших врагов при отступлении"""
+        repulsion = pygame.math.Vector2(0, 0)
+        for other, dist in self.game.enemy_grid.neighbors(self, ENEMY_ATTACK_RANGE * 2):
+            if dist == 0:
+                continue
+            dx = self.rect.centerx - other.rect.centerx
+            dy = self.rect.centery - other.rect.centery
+            repulsion += pygame.math.Vector2(dx/dist, dy/dist) * 0.5
+        return repulsion
 
     def idle_state(self, player):
         """Состояние ожидания"""
-        if self.get_distance_to_player(player) <= ENEMY_AGGRO_RANGE:
+        if self.get_distance_to_player(player) <= ENEMY_AGGRO_RANGE and self.can_see_player(player):
             self.state = 'chase'
             
     def patrol_state(self, player):
@@ -505,12 +525,12 @@ class BaseEnemy(pygame.sprite.Sprite):
         if self.position.distance_to(target) < TILESIZE:
             self.current_patrol_index = (self.current_patrol_index + 1) % len(self.patrol_points)
             
-        if self.get_distance_to_player(player) <= ENEMY_AGGRO_RANGE:
+        if self.get_distance_to_player(player) <= ENEMY_AGGRO_RANGE and self.can_see_player(player):
             self.state = 'chase'
             
     def stunned_state(self, player):
         """Состояние оглушения"""
-        current_time = pygame.time.get_ticks()
+        current_time = self.clock.get_ticks()
         if current_time >= self.stun_duration:
             self.state = 'chase'
         self.velocity = pygame.math.Vector2(0, 0)
@@ -521,7 +541,7 @@ class BaseEnemy(pygame.sprite.Sprite):
         center = pygame.math.Vector2(self.spawn_position)
         for i in range(4):
             angle = i * (2 * math.pi / 4)
-            distance = random.uniform(TILESIZE * 3, TILESIZE * 6)
+            distance = self.rng.uniform(TILESIZE * 3, TILESIZE * 6)
             point = center + pygame.math.Vector2(math.cos(angle), math.sin(angle)) * distance
             if not self.game.level.is_wall_at(point.x, point.y):
                 self.patrol_points.append(point)
@@ -529,7 +549,7 @@ class BaseEnemy(pygame.sprite.Sprite):
     def apply_stun(self, duration):
         """Применение оглушения"""
         self.state = 'stunned'
-        self.stun_duration = pygame.time.get_ticks() + duration
+        self.stun_duration = self.clock.get_ticks() + duration
 
     def chase_state(self, player):
         """Состояние преследования игрока"""
@@ -559,14 +579,7 @@ class BaseEnemy(pygame.sprite.Sprite):
         flee_direction = -self.get_direction_to_player(player)
         
         # Добавляем отталкивание от других врагов
-        for other in self.game.enemies:
-            if other != self and other.alive:
-                dx = self.rect.centerx - other.rect.centerx
-                dy = self.rect.centery - other.rect.centery
-                dist_sq = dx * dx + dy * dy
-                if dist_sq < ENEMY_ATTACK_RANGE * ENEMY_ATTACK_RANGE * 4:
-                    dist = math.sqrt(dist_sq)
-                    flee_direction += pygame.math.Vector2(dx/dist, dy/dist) * 0.5
+        flee_direction += self._get_flee_repulsion()
         
         if flee_direction.length() > 0:
             self.velocity = flee_direction.normalize() * self.speed
@@ -592,12 +605,13 @@ class RangedEnemy(BaseEnemy):
         self.attack_damage = ENEMY_ATTACK_DAMAGE * 0.7
         
     def try_attack(self, player):
-        current_time = pygame.time.get_ticks()
+        current_time = self.clock.get_ticks()
         if self.state == 'attack' and current_time - self.last_attack_time >= ENEMY_ATTACK_COOLDOWN:
             self.last_attack_time = current_time
             # Создаем снаряд
             direction = self.get_direction_to_player(player)
-            self.game.projectiles.add(Projectile(self.rect.center, direction, self.attack_damage))
+            self.game.projectiles.spawn('enemy_bolt', self.rect.centerx, self.rect.centery,
+                                        direction, self.attack_damage)
 
 class TankEnemy(BaseEnemy):
     def __init__(self, x, y, game):
@@ -0,0 +1,108 @@
+import math
+from collections import deque
+import numpy as np
+import pygame
+from settings import *
+
+# Соседи тайла: сначала ортогональные, затем диагональные
+NEIGHBOR_OFFSETS = [(1, 0), (-1, 0), (0, 1), (0, -1),
+                    (1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+class FlowField:
+    """Общее поле направлений к игроку, построенное поиском в ширину по сетке уровня"""
+    def __init__(self, grid, radius=FLOW_FIELD_RADIUS):
+        self.grid = grid
+        self.radius = radius
+        self.tile_size = grid.tile_size
+        self.target = None
+        self.target_tile = None
+        # Следующий тайл на пути к цели для каждого тайла (-1 - путь неизвестен)
+        self.next_x = np.full((grid.width, grid.height), -1, dtype=np.int32)
+        self.next_y = np.full((grid.width, grid.height), -1, dtype=np.int32)
+        self.recompute_count = 0
+
+    def update(self, position):
+        """Обновление цели; поле пересчитывается только при смене тайла игрока"""
+        self.target = (position[0], position[1])
+        tile = (int(position[0] // self.tile_size), int(position[1] // self.tile_size))
+        if tile == self.target_tile:
+            return False
+        self.target_tile = tile
+        self._compute(*tile)
+        return True
+
+    def _compute(self, target_x, target_y):
+        """Поиск в ширину от тайла игрока в пределах радиуса"""
+        self.next_x.fill(-1)
+        self.next_y.fill(-1)
+        self.recompute_count += 1
+        width, height = self.grid.width, self.grid.height
+        if not (0 <= target_x < width and 0 <= target_y < height):
+            return
+
+        solid = (self.grid.flags & TILE_FLAG_SOLID) != 0
+        if solid[target_x, target_y]:
+            return
+
+        # Работаем с окном вокруг игрока, чтобы стоимость не зависела от размера карты
+        min_x = max(0, target_x - self.radius)
+        max_x = min(width - 1, target_x + self.radius)
+        min_y = max(0, target_y - self.radius)
+        max_y = min(height - 1, target_y + self.radius)
+        blocked = solid[min_x:max_x + 1, min_y:max_y + 1].tolist()
+        next_x = [[-1] * (max_y - min_y + 1) for _ in range(max_x - min_x + 1)]
+        next_y = [[-1] * (max_y - min_y + 1) for _ in range(max_x - min_x + 1)]
+        span_x = max_x - min_x
+        span_y = max_y - min_y
+
+        start_x = target_x - min_x
+        start_y = target_y - min_y
+        next_x[start_x][start_y] = target_x
+        next_y[start_x][start_y] = target_y
+        queue = deque([(start_x, start_y)])
+        while queue:
+            x, y = queue.popleft()
+            for dx, dy in NEIGHBOR_OFFSETS:
+                nx = x + dx
+                ny = y + dy
+                if nx < 0 or ny < 0 or nx > span_x or ny > span_y:
+                    continue
+                if blocked[nx][ny] or next_x[nx][ny] != -1:
+                    continue
+                # Диагональ запрещена, если она срезает угол стены
+                if dx and dy and (blocked[x][ny] or blocked[nx][y]):
+                    continue
+                next_x[nx][ny] = x + min_x
+                next_y[nx][ny] = y + min_y
+                queue.append((nx, ny))
+
+        self.next_x[min_x:max_x + 1, min_y:max_y + 1] = next_x
+        self.next_y[min_x:max_x + 1, min_y:max_y + 1] = next_y
+
+    def direction_at(self, position):
+        """Единичное направление движения к игроку или None, если тайл вне поля"""
+        if self.target_tile is None:
+            return None
+        tile_x = int(position[0] // self.tile_size)
+        tile_y = int(position[1] // self.tile_size)
+        if not (0 <= tile_x < self.grid.width and 0 <= tile_y < self.grid.height):
+            return None
+        next_x = int(self.next_x[tile_x, tile_y])
+        if next_x < 0:
+            return None
+
+        next_y = int(self.next_y[tile_x, tile_y])
+        if (next_x, next_y) == self.target_tile:
+            # Рядом с игроком или в одном тайле с ним идем прямо к нему
+            goal_x, goal_y = self.target
+        else:
+            # Иначе держим курс на центр следующего тайла пути
+            goal_x = (next_x + 0.5) * self.tile_size
+            goal_y = (next_y + 0.5) * self.tile_size
+
+        dx = goal_x - position[0]
+        dy = goal_y - position[1]
+        distance = math.sqrt(dx * dx + dy * dy)
+        if distance == 0:
+            return pygame.math.Vector2(0, 0)
+        return pygame.math.Vector2(dx / distance, dy / distance)
@@ -1,3 +1,8 @@
+import hashlib
+import operator
+import random
+import struct
+import numpy as np
 import pygame
 from settings import *
 from player import Player
@@ -5,21 +10,79 @@ from crosshair import Crosshair
 from enemy import Enemy
 from camera import Camera
 from level import Level
+from spatial_hash import SpatialHash
+from particles import ParticleSystem
+from projectiles import ProjectileManager
+from crowd import CrowdSteering
+from ai_scheduler import AIScheduler
+from room_streamer import RoomStreamer
+from hud import HUD
+from input_source import InputFrame, PygameInput
+from game_clock import GameClock
+from metrics import FrameMetrics, MetricsOverlay, MetricsWriter
+from tracing import TraceRecorder
+from level_prefetch import LevelPrefetcher
+from snapshot import SnapshotWriter, capture_snapshot, load_snapshot, restore_snapshot, save_snapshot
 
 class Game:
-    def __init__(self):
+    def __init__(self, input_source=None, seed=None, clock=None, metrics_path=None, trace_dir=None,
+                 interpolate=False, prefetch=False, level_cache_dir=None, autosave_path=None):
+        # Часы и генераторы случайных чисел, общие для всех систем игры
+        self.clock = clock or GameClock()
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        self.rng = random.Random(self.seed)
+        self.fx_rng = random.Random(self.rng.getrandbits(32))  # Только для визуальных эффектов
+        self.level_rng = random.Random(self.rng.getrandbits(32))  # Зёрна уровней, не зависят от хода игры
+        self.level_seeds = []
+        
+        # Источник ввода: реальные устройства или синтетический сценарий
+        self.input_source = input_source or PygameInput()
+        self.input = InputFrame()
+        
+        # Позиции спрайтов до последнего шага симуляции для интерполяции отрисовки
+        self.interpolate = interpolate
+        self.previous_positions = {}
+        
+        # Метрики кадра, при заданном пути пишутся в JSONL фоновым потоком.
+        # Трасса пишется в буфер всегда, а на диск - при провале кадра, если задан каталог
+        self.metrics = FrameMetrics(writer=MetricsWriter(metrics_path) if metrics_path else None,
+                                    tracer=TraceRecorder(trace_dir))
+        
         # Спрайты
         self.all_sprites = pygame.sprite.Group()
         self.obstacles = pygame.sprite.Group()
         self.enemies = pygame.sprite.Group()
         self.effects = pygame.sprite.Group()  # Группа для визуальных эффектов
+        self.particles = ParticleSystem()  # Общий пул частиц попаданий, смертей и заклинаний
+        self.particle_styles = {
+            'hit': self.particles.style(HIT_PARTICLE_COLOR, count=HIT_PARTICLES, lifetime=(10, 20)),
+            'death': self.particles.style(DEATH_PARTICLE_COLOR, radius=3, count=DEATH_PARTICLES,
+                                          speed=(1, 4), lifetime=(20, 40))
+        }
+        for weapon_type, settings in MAGIC_WEAPONS.items():
+            self.particle_styles[weapon_type] = self.particles.style(settings['color'], count=SPELL_PARTICLES)
+        self.particle_styles['enemy_bolt'] = self.particles.style(ENEMY_PROJECTILE['color'], count=HIT_PARTICLES)
+        self.projectiles = ProjectileManager(self)  # Снаряды игрока и врагов в общем пуле
+        # Пространственная сетка для поиска соседей; соседи - в порядке регистрации, как после восстановления
+        self.enemy_grid = SpatialHash(order=operator.attrgetter('ai_serial'))
+        self.crowd = CrowdSteering(np.random.default_rng(self.rng.getrandbits(64)))  # Пакетный расчёт группового поведения
+        self.ai = AIScheduler(self)  # Обновление врагов по уровням детализации в пределах бюджета
+        self.room_streamer = RoomStreamer(self)  # Враги создаются и засыпают по комнатам вокруг игрока
         
         # Игровые параметры
         self.current_level = 1
         self.score = 0
         
-        # Создаем уровень
+        # Снимок состояния при активации контрольной точки пишется на диск фоновым потоком
+        self.autosave = SnapshotWriter(autosave_path) if autosave_path else None
+        
+        # Создаем уровень; следующий сразу начинает генерироваться в фоновом процессе.
+        # Уровни с известным зерном берутся из дискового кэша, если он задан;
+        # со случайным зерном раскладки не повторяются, и кэш бы только рос
+        self.level_cache_dir = level_cache_dir if seed is not None else None
+        self.prefetcher = LevelPrefetcher() if prefetch else None
         self.level = Level(self, self.current_level)
+        self.prefetch_next_level()
         
         # Создаем игрока в позиции, определенной картой
         self.player = Player(self)
@@ -27,129 +90,316 @@ class Game:
         self.player.position = pygame.math.Vector2(self.player.rect.center)
         self.player.spawn_position = self.player.position
         self.all_sprites.add(self.player)
+        self.room_streamer.update()
         
         # Создаем прицел
-        self.crosshair = Crosshair()
+        self.crosshair = Crosshair(self)
         self.all_sprites.add(self.crosshair)
         
         # Создаем камеру
         self.camera = Camera(self.player)
+        
+        # Создаем интерфейс
+        self.hud = HUD(self)
+        self.metrics_overlay = MetricsOverlay(self.metrics, self.hud.fonts)
+
+    def level_seed(self, level_number):
+        """Зерно генерации уровня с указанным номером"""
+        while len(self.level_seeds) < level_number:
+            self.level_seeds.append(self.level_rng.getrandbits(32))
+        return self.level_seeds[level_number - 1]
+
+    def prefetch_next_level(self):
+        """Запуск фоновой генерации следующего уровня"""
+        if self.prefetcher is not None:
+            level_number = self.current_level + 1
+            self.prefetcher.request(LEVEL_WIDTH, LEVEL_HEIGHT, level_number, self.level_seed(level_number),
+                                    LEVEL_GENERATOR, self.level_cache_dir)
 
     def create_enemy(self, pos):
         """Создание врага в указанной позиции"""
         enemy = Enemy(*pos, self)
         self.add_enemy(enemy)
+        return enemy
 
     def next_level(self):
         """Переход на следующий уровень"""
+        with self.metrics.timer('next_level'):
+            self._next_level()
+
+    def _next_level(self):
         self.current_level += 1
         
         # Очищаем группы спрайтов
         for enemy in self.enemies:
             enemy.kill()
+        self.enemy_grid.clear()
+        self.ai.clear()
         
-        # Создаем новый уровень
-        self.level = Level(self, self.current_level)
+        # Создаем новый уровень из заранее сгенерированной раскладки, если она готова
+        layout = None
+        if self.prefetcher is not None:
+            layout = self.prefetcher.take(LEVEL_WIDTH, LEVEL_HEIGHT, self.current_level,
+                                          self.level_seed(self.current_level),
+                                          LEVEL_GENERATOR, self.level_cache_dir)
+        self.level = Level(self, self.current_level, layout)
+        self.prefetch_next_level()
         
         # Обновляем позицию игрока
         self.player.position = pygame.math.Vector2(self.level.player_pos)
         self.player.rect.center = self.level.player_pos
         self.player.spawn_position = self.player.position
+        self.room_streamer.update()
+        
+        # Частицы остались в координатах прошлого уровня
+        self.particles.clear()
         
         # Сбрасываем камеру
         self.camera.reset()
+        self.previous_positions = {}
 
     def update(self):
-        """Обновление игровой логики"""
-        # Обновляем все спрайты
-        self.all_sprites.update()
+        """Кадр с одним шагом симуляции"""
+        self.begin_frame()
+        self.step()
+
+    def begin_frame(self):
+        """Начало кадра отрисовки: закрытие метрик предыдущего кадра"""
+        self.metrics.gauge('enemies', len(self.enemies))
+        self.metrics.gauge('projectiles', len(self.projectiles))
+        self.metrics.gauge('effects', len(self.effects))
+        self.metrics.gauge('particles', self.particles.count + self.level.particles.count)
+        self.metrics.begin_frame()
+
+    def step(self):
+        """Один шаг симуляции фиксированной длины"""
+        self.metrics.count('simulation_steps')
+        if self.interpolate:
+            self.remember_positions()
+        with self.metrics.timer('update'):
+            self._update()
+
+    def remember_positions(self):
+        """Запоминание позиций спрайтов перед шагом симуляции"""
+        self.previous_positions = {sprite: sprite.rect.topleft for sprite in self.all_sprites}
+        self.projectiles.remember_positions()
+
+    def _update(self):
+        # Переводим часы на новый кадр и считываем ввод один раз за кадр
+        self.clock.advance()
+        self.input = self.input_source.poll(self)
+        
+        # Видимость между тайлами кэшируется только в пределах шага
+        self.level.begin_step()
+        
+        # Враги комнат рядом с игроком создаются, оставленные позади комнаты засыпают
+        with self.metrics.timer('update.rooms'):
+            self.room_streamer.update()
+        
+        # Поле направлений к игроку пересчитывается только при смене его тайла
+        with self.metrics.timer('update.flow_field'):
+            self.level.flow_field.update(self.player.rect.center)
+        
+        # Планировщик выбирает врагов рядом с игроком и тех, кому пора обновиться
+        with self.metrics.timer('update.ai_plan'):
+            self.ai.plan()
+        
+        # Групповое поведение толпы считаем одним проходом до обновления врагов; строк не больше бюджета ИИ
+        with self.metrics.timer('update.crowd'):
+            self.crowd.update(self.ai.crowd_rows, len(self.ai.awake))
+        
+        # Обновляем игрока и прицел
+        with self.metrics.timer('update.player'):
+            self.player.update()
+            self.crosshair.update()
+        
+        # Обновляем врагов в пределах бюджета шага (основное время - ИИ и движение)
+        with self.metrics.timer('update.sprites'):
+            self.ai.run()
+        
+        # Снаряды игрока и врагов двигаются одним векторным шагом
+        with self.metrics.timer('update.projectiles'):
+            self.projectiles.update()
         
         # Обновляем камеру
         self.camera.scroll()
         
+        # Частицы эффектов: один векторный шаг на весь пул
+        with self.metrics.timer('update.particles'):
+            self.particles.update()
+        
         # Обновляем портал
         self.level.update_portal()
         
         # Проверяем контрольные точки
+        checkpoint_activated = False
+        previous_checkpoint = self.level.active_checkpoint_tile
         if self.level.check_checkpoint_collision(self.player.position):
             self.player.spawn_position = pygame.math.Vector2(self.level.active_checkpoint)
+            checkpoint_activated = self.level.active_checkpoint_tile != previous_checkpoint
         
         # Проверяем портал
         if self.level.check_portal_collision(self.player.position):
             self.next_level()
         
         # Проверяем попадания снарядов по врагам
-        self.check_projectile_hits()
+        with self.metrics.timer('update.projectile_hits'):
+            self.check_projectile_hits()
+        
+        # Автосохранение в конце шага, чтобы снимок продолжался так же, как исходная игра
+        if checkpoint_activated and self.autosave is not None:
+            self.autosave_game()
+
+    def autosave_game(self):
+        """Копия состояния в потоке игры и фоновая запись на диск"""
+        with self.metrics.timer('autosave.capture'):
+            snapshot = capture_snapshot(self)
+        self.autosave.submit(snapshot)
+
+    def save_state(self, path):
+        """Синхронное сохранение состояния игры в файл"""
+        save_snapshot(path, capture_snapshot(self))
+
+    def load_state(self, path):
+        """Восстановление состояния игры из файла снимка"""
+        with self.metrics.timer('load_state'):
+            restore_snapshot(self, load_snapshot(path))
+        self.prefetch_next_level()
 
     def check_projectile_hits(self):
-        """Проверка попаданий снарядов по врагам"""
-        for weapon in self.player.weapons.values():
-            for projectile in weapon.projectiles:
-                hits = pygame.sprite.spritecollide(
-                    projectile,
-                    self.enemies,
-                    False,
-                    pygame.sprite.collide_circle
-                )
-                for enemy in hits:
-                    if enemy.alive:
-                        if enemy.take_damage(weapon.settings['damage']):
-                            self.player.gain_xp(ENEMY_XP_REWARD)  # Начисляем опыт за убийство
-                        projectile.kill()
-                        break
-
-    def draw(self, screen):
-        """Отрисовка всех игровых объектов"""
+        """Проверка попаданий снарядов по врагам и по игроку"""
+        self.projectiles.check_hits()
+
+    def emit_particles(self, style, x, y):
+        """Вспышка частиц заданного вида в мировой точке"""
+        self.particles.burst(self.particle_styles[style], x, y, self.fx_rng)
+
+    def draw(self, screen, alpha=1.0):
+        """Отрисовка всех игровых объектов в доле alpha между двумя последними шагами симуляции"""
+        self.camera.interpolate(alpha, self.previous_positions)
+        with self.metrics.timer('draw'):
+            self._draw(screen)
+        # Оверлей метрик рисуется вне замера, чтобы не искажать его
+        self.metrics_overlay.draw(screen)
+
+    def _draw(self, screen):
         # Заполняем экран черным цветом
         screen.fill('black')
         
         # Отрисовка уровня
-        self.level.draw(screen, self.camera)
-        
-        # Отрисовка всех спрайтов с учетом камеры
-        for sprite in self.all_sprites:
-            if sprite == self.player:
-                self.player.draw(screen, self.camera)
-            elif sprite != self.crosshair:
-                screen.blit(sprite.image, self.camera.apply(sprite))
-            else:
-                screen.blit(sprite.image, sprite.rect)
-        
-        # Отрисовка эффектов
+        with self.metrics.timer('draw.level'):
+            self.level.draw(screen, self.camera)
+        
+        # Кадр в мировых координатах: враги и эффекты за его пределами не рисуются
+        view = self.camera.view_rect()
+        
+        # Отрисовка спрайтов с учетом камеры; прицел рисуется в экранных координатах
+        with self.metrics.timer('draw.sprites'):
+            visible_enemies = self.visible_enemies(view)
+            self.player.draw(screen, self.camera)
+            screen.blit(self.crosshair.image, self.crosshair.rect)
+            screen.blits([(enemy.image, screen_rect) for enemy, screen_rect in visible_enemies], doreturn=False)
+        
+        # Отрисовка снарядов
+        with self.metrics.timer('draw.projectiles'):
+            drawn_projectiles = self.projectiles.draw(screen, self.camera)
+        
+        # Отрисовка частиц
+        with self.metrics.timer('draw.particles'):
+            drawn_particles = self.particles.draw(screen, self.camera)
+        
+        # Отрисовка эффектов в кадре; истёкшие удаляются и за его пределами
+        effect_view = view.inflate(DRAW_CULL_MARGIN * 2, DRAW_CULL_MARGIN * 2)
+        culled_effects = 0
         for effect in list(self.effects):
             if hasattr(effect, 'draw'):
-                effect.draw(screen, self.camera)
+                if effect_view.colliderect(effect.rect):
+                    effect.draw(screen, self.camera)
+                else:
+                    culled_effects += 1
             if hasattr(effect, 'is_alive') and not effect.is_alive():
                 self.effects.remove(effect)
         
-        # Отрисовка полосок здоровья врагов с учетом камеры
-        for enemy in self.enemies:
-            if enemy.alive:
-                health_bar_bg = pygame.Rect(
-                    self.camera.apply_point(enemy.rect.centerx - HEALTH_BAR_WIDTH // 2,
-                                          enemy.rect.top - HEALTH_BAR_OFFSET)[0],
-                    self.camera.apply_point(0, enemy.rect.top - HEALTH_BAR_OFFSET)[1],
-                    HEALTH_BAR_WIDTH,
+        # Отрисовка полосок здоровья видимых врагов
+        for enemy, screen_rect in visible_enemies:
+            health_bar_bg = pygame.Rect(
+                screen_rect.centerx - HEALTH_BAR_WIDTH // 2,
+                screen_rect.top - HEALTH_BAR_OFFSET,
+                HEALTH_BAR_WIDTH,
+                HEALTH_BAR_HEIGHT
+            )
+            pygame.draw.rect(screen, HEALTH_BAR_BG, health_bar_bg)
+            
+            if enemy.current_hp > 0:
+                health_width = int(HEALTH_BAR_WIDTH * (enemy.current_hp / enemy.max_hp))
+                health_bar = pygame.Rect(
+                    health_bar_bg.x,
+                    health_bar_bg.y,
+                    health_width,
                     HEALTH_BAR_HEIGHT
                 )
-                pygame.draw.rect(screen, HEALTH_BAR_BG, health_bar_bg)
-                
-                if enemy.current_hp > 0:
-                    health_width = int(HEALTH_BAR_WIDTH * (enemy.current_hp / enemy.max_hp))
-                    health_bar = pygame.Rect(
-                        health_bar_bg.x,
-                        health_bar_bg.y,
-                        health_width,
-                        HEALTH_BAR_HEIGHT
-                    )
-                    pygame.draw.rect(screen, HEALTH_BAR_HP, health_bar)
-        
-        # Отображение текущего уровня
-        font = pygame.font.Font(None, 36)
-        level_text = font.render(f"Уровень: {self.current_level}", True, WHITE)
-        screen.blit(level_text, (SCREEN_WIDTH - 150, 10))
+                pygame.draw.rect(screen, HEALTH_BAR_HP, health_bar)
+        
+        # Сколько объектов отсечено кадром
+        metrics = self.metrics
+        metrics.gauge('culled.enemies', len(self.enemies) - len(visible_enemies))
+        metrics.gauge('culled.effects', culled_effects)
+        metrics.gauge('culled.projectiles', len(self.projectiles) - drawn_projectiles)
+        metrics.gauge('culled.particles', self.particles.count - drawn_particles)
+        
+        # Интерфейс игрока и номер уровня
+        with self.metrics.timer('draw.hud'):
+            self.hud.draw(screen)
+
+    def visible_enemies(self, view):
+        """Живые враги в кадре с экранными прямоугольниками"""
+        camera = self.camera
+        margin = DRAW_CULL_MARGIN
+        screen_area = pygame.Rect(0, 0, view.width, view.height)
+        bar_left = HEALTH_BAR_WIDTH // 2
+        visible = []
+        # Кандидаты - из ячеек сетки вокруг кадра; виден враг, если на экран попадает спрайт или полоска здоровья
+        for enemy in self.enemy_grid.query_rect(view.left - margin, view.top - margin,
+                                                view.right + margin, view.bottom + margin):
+            if not enemy.alive:
+                continue
+            screen_rect = camera.apply(enemy)
+            left = min(screen_rect.left, screen_rect.centerx - bar_left)
+            right = max(screen_rect.right, screen_rect.centerx - bar_left + HEALTH_BAR_WIDTH)
+            top = screen_rect.top - HEALTH_BAR_OFFSET
+            if screen_area.colliderect(left, top, right - left, screen_rect.bottom - top):
+                visible.append((enemy, screen_rect))
+        return visible
+
+    def close(self):
+        """Остановка фоновых потоков и процессов игры"""
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+        if self.autosave is not None:
+            self.autosave.close()
+        self.metrics.close()
+
+    def state_hash(self):
+        """Хэш симуляционного состояния для сравнения детерминированных прогонов"""
+        digest = hashlib.blake2b(digest_size=16)
+        player = self.player
+        digest.update(struct.pack('<iqddddiii', self.current_level, self.clock.get_ticks(),
+                                  player.position.x, player.position.y,
+                                  player.hp, player.current_mana,
+                                  player.xp, player.level, int(player.alive)))
+        for enemy in self.enemies:
+            digest.update(struct.pack('<dddd', enemy.position.x, enemy.position.y,
+                                      enemy.current_hp, enemy.max_hp))
+            digest.update(enemy.state.encode())
+        for weapon in player.weapons.values():
+            digest.update(struct.pack('<q', weapon.last_cast_time))
+            digest.update(self.projectiles.positions_of(weapon.weapon_type).tobytes())
+        digest.update(self.projectiles.positions_of('enemy_bolt').tobytes())
+        return digest.hexdigest()
 
     def add_enemy(self, enemy):
         """Добавление врага в игру"""
+        self.ai.register(enemy)
         self.all_sprites.add(enemy)
-        self.enemies.add(enemy) 
\ No newline at end of file
+        self.enemies.add(enemy)
+        self.enemy_grid.insert(enemy) 
\ No newline at end of file
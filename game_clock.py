@@ -0,0 +1,23 @@
+import pygame
+
+class GameClock:
+    """Игровые часы: реальное время pygame или фиксированный шаг на кадр"""
+    def __init__(self, fixed_step=None):
+        self.fixed_step = fixed_step  # Миллисекунд на кадр; None - реальное время
+        self.time = 0.0 if fixed_step is not None else float(pygame.time.get_ticks())
+
+    @property
+    def is_fixed(self):
+        """Идёт ли время фиксированными шагами"""
+        return self.fixed_step is not None
+
+    def advance(self, step=None):
+        """Переход к следующему кадру; все системы кадра видят одно и то же время"""
+        if self.fixed_step is None:
+            self.time = float(pygame.time.get_ticks())
+        else:
+            self.time += self.fixed_step if step is None else step
+
+    def get_ticks(self):
+        """Время текущего кадра в миллисекундах"""
+        return int(self.time)
@@ -0,0 +1,167 @@
+import argparse
+import os
+import sys
+import time
+
+# Драйверы-заглушки нужно выбрать до инициализации pygame
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+from settings import *
+from input_source import InputRecorder, ReplayInput, ScriptedInput, idle_script, make_wander_script
+from tracing import ProfileCapture
+
+SCRIPTS = {
+    'idle': lambda seed: idle_script,
+    'wander': lambda seed: make_wander_script(seed)
+}
+
+def init_headless():
+    """Инициализация pygame без окна"""
+    pygame.init()
+
+class _FrameLog:
+    """Источник ввода, запоминающий выданные кадры, чтобы подать их второй игре"""
+    def __init__(self, source):
+        self.source = source
+        self.frames = []
+
+    def poll(self, game):
+        frame = self.source.poll(game)
+        self.frames.append(frame)
+        return frame
+
+def verify_restore(game, steps):
+    """Номер первого из steps шагов, где игра из снимка разошлась с исходной, или None"""
+    from game import Game
+    from game_clock import GameClock
+    from snapshot import GameSnapshot, capture_snapshot, restore_snapshot
+
+    snapshot = GameSnapshot.from_bytes(capture_snapshot(game).to_bytes())
+    log = _FrameLog(game.input_source)
+    game.input_source = log
+    restored = Game(input_source=ScriptedInput(log.frames), seed=game.seed,
+                    clock=GameClock(fixed_step=SIMULATION_STEP))
+    restore_snapshot(restored, snapshot)
+    try:
+        for step in range(steps):
+            game.update()
+            restored.update()
+            if game.state_hash() != restored.state_hash():
+                return step
+        return None
+    finally:
+        game.input_source = log.source
+        restored.close()
+
+def run_headless(frames=600, input_source=None, draw=False, game=None, seed=0, metrics_path=None,
+                 trace_dir=None, profile_path=None, level_cache_dir=None, autosave_path=None, load_path=None,
+                 restore_steps=0):
+    """Прогон симуляции без окна и без ограничения FPS"""
+    from game import Game
+    from game_clock import GameClock
+
+    init_headless()
+    if game is None:
+        # Фиксированный шаг часов делает прогон воспроизводимым кадр в кадр
+        game = Game(input_source=input_source or ScriptedInput(idle_script),
+                    seed=seed, clock=GameClock(fixed_step=SIMULATION_STEP),
+                    metrics_path=metrics_path, trace_dir=trace_dir, level_cache_dir=level_cache_dir,
+                    autosave_path=autosave_path)
+        if load_path:
+            game.load_state(load_path)
+    surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)) if draw else None
+
+    profiler = ProfileCapture()
+    if profile_path:
+        profiler.start()
+    start = time.perf_counter()
+    for _ in range(frames):
+        game.update()
+        if surface is not None:
+            game.draw(surface)
+    elapsed = time.perf_counter() - start
+    if profile_path:
+        profiler.stop(profile_path)
+    restore_mismatch = verify_restore(game, restore_steps) if restore_steps else None
+    game.close()
+
+    return {
+        'frames': frames,
+        'seconds': elapsed,
+        'fps': frames / elapsed if elapsed > 0 else float('inf'),
+        'enemies': len(game.enemies),
+        'level': game.current_level,
+        'state_hash': game.state_hash(),
+        'frame_ms': game.metrics.percentiles('frame'),
+        'traces': game.metrics.tracer.dumps,
+        'restore_mismatch': restore_mismatch
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Запуск симуляции без окна")
+    parser.add_argument('--frames', type=int, help="Количество кадров симуляции (по умолчанию 600 или длина записи)")
+    parser.add_argument('--draw', action='store_true', help="Рисовать кадры во внеэкранную поверхность")
+    parser.add_argument('--script', choices=sorted(SCRIPTS), default='wander', help="Сценарий синтетического ввода")
+    parser.add_argument('--metrics', metavar='FILE', help="Записывать метрики кадров в JSONL-файл")
+    parser.add_argument('--trace-dir', help="Сбрасывать трассы провалов кадра в этот каталог")
+    parser.add_argument('--level-cache', metavar='DIR', help="Брать уровни из дискового кэша и пополнять его")
+    parser.add_argument('--autosave', metavar='FILE', help="Сохранять снимок игры при активации контрольной точки")
+    parser.add_argument('--load', metavar='FILE', help="Начать прогон из файла снимка")
+    parser.add_argument('--profile', metavar='FILE', help="Профилировать прогон cProfile в .prof-файл")
+    parser.add_argument('--seed', type=int, default=0, help="Зерно игры и сценария ввода")
+    parser.add_argument('--record', metavar='FILE', help="Записать ввод прогона в файл")
+    parser.add_argument('--checksum', action='store_true', help="Записывать хэш состояния каждого шага")
+    parser.add_argument('--replay', metavar='FILE', help="Воспроизвести записанный ввод вместо сценария")
+    parser.add_argument('--verify-restore', type=int, default=0, metavar='STEPS',
+                        help="После прогона восстановить снимок в новую игру и сверять хэши STEPS шагов")
+    args = parser.parse_args()
+    if args.record and args.load:
+        # Запись воспроизводится с новой игры по зерну, а не с загруженного снимка
+        parser.error("--record нельзя совмещать с --load")
+
+    seed = args.seed
+    frames = args.frames or 600
+    if args.replay:
+        # Запись задаёт и зерно игры, и число шагов
+        input_source = ReplayInput(args.replay)
+        seed = input_source.seed
+        frames = args.frames or len(input_source)
+    else:
+        input_source = ScriptedInput(SCRIPTS[args.script](args.seed))
+    recorder = None
+    if args.record:
+        input_source = recorder = InputRecorder(input_source, args.record, checksum=args.checksum)
+    result = run_headless(frames, input_source, args.draw, seed=seed,
+                          metrics_path=args.metrics, trace_dir=args.trace_dir, profile_path=args.profile,
+                          level_cache_dir=args.level_cache, autosave_path=args.autosave, load_path=args.load,
+                          restore_steps=args.verify_restore)
+    print(f"Кадров: {result['frames']}, время: {result['seconds']:.2f} с, "
+          f"симуляция: {result['fps']:.1f} кадр/с, врагов: {result['enemies']}, "
+          f"уровень: {result['level']}, хэш состояния: {result['state_hash']}")
+    if result['frame_ms']:
+        print("Кадр p50/p95/p99: {:.2f} / {:.2f} / {:.2f} мс".format(*result['frame_ms']))
+    for path in result['traces']:
+        print(f"Трасса провала кадра: {path}")
+    if recorder is not None:
+        recorder.close()
+        print(f"Ввод записан в {args.record}: {recorder.frames} шагов")
+    if args.verify_restore:
+        if result['restore_mismatch'] is not None:
+            print(f"РАСХОЖДЕНИЕ после восстановления снимка на шаге {result['restore_mismatch']}")
+            return 1
+        print(f"Восстановленный снимок совпал с игрой на {args.verify_restore} шагах")
+    if args.replay:
+        replay = recorder.source if recorder is not None else input_source
+        if not replay.verify:
+            print("Запись без хэшей состояния, сверка пропущена")
+        elif replay.mismatches:
+            print(f"РАСХОЖДЕНИЕ: {replay.mismatches} шагов, первое на шаге {replay.first_mismatch}")
+            return 1
+        else:
+            print(f"Хэши состояния совпали на {min(frames, len(replay))} шагах")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,230 @@
+from collections import OrderedDict
+import pygame
+from settings import *
+
+class FontRegistry:
+    """Реестр шрифтов: каждый размер загружается один раз"""
+    def __init__(self):
+        self.fonts = {}
+
+    def get(self, size):
+        """Шрифт по умолчанию указанного размера"""
+        font = self.fonts.get(size)
+        if font is None:
+            font = pygame.font.Font(None, size)
+            self.fonts[size] = font
+        return font
+
+class TextCache:
+    """LRU-кэш отрендеренного текста по ключу (шрифт, строка, цвет)"""
+    def __init__(self, fonts, capacity=HUD_TEXT_CACHE_SIZE):
+        self.fonts = fonts
+        self.capacity = capacity
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, size, text, color=WHITE):
+        """Поверхность с текстом из кэша или новый рендер"""
+        key = (size, text, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = self.fonts.get(size).render(text, True, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.capacity:
+            self.surfaces.popitem(last=False)
+        return surface
+
+class HUD:
+    """Интерфейс поверх игры, перерисовываемый только при изменении данных"""
+    def __init__(self, game):
+        self.game = game
+        self.fonts = FontRegistry()
+        self.text = TextCache(self.fonts)
+        self.surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+        self.state = None
+        self.redraw_count = 0
+        self.weapon_icons = {}
+        self.cooldown_overlay = None
+        self.mana_overlay = None
+
+    def _build_static_images(self):
+        """Однократная отрисовка иконок оружия и затемнений"""
+        for weapon_name in MAGIC_WEAPONS:
+            self.weapon_icons[weapon_name] = self._draw_weapon_icon(weapon_name)
+        self.cooldown_overlay = pygame.Surface((WEAPON_ICON_SIZE, WEAPON_ICON_SIZE), pygame.SRCALPHA)
+        self.cooldown_overlay.fill(WEAPON_ICON_COOLDOWN_COLOR)
+        self.mana_overlay = pygame.Surface((WEAPON_ICON_SIZE, WEAPON_ICON_SIZE), pygame.SRCALPHA)
+        self.mana_overlay.fill(WEAPON_ICON_MANA_COLOR)
+
+    def _draw_weapon_icon(self, weapon_name):
+        """Символ оружия для иконки"""
+        weapon_surface = pygame.Surface((WEAPON_ICON_SIZE - 8, WEAPON_ICON_SIZE - 8), pygame.SRCALPHA)
+        color = MAGIC_WEAPONS[weapon_name]['color']
+        if weapon_name == 'fireball':
+            # Рисуем огненный шар
+            pygame.draw.circle(weapon_surface, color,
+                             (WEAPON_ICON_SIZE // 2 - 4, WEAPON_ICON_SIZE // 2 - 4),
+                             WEAPON_ICON_SIZE // 3)
+        elif weapon_name == 'ice_lance':
+            # Рисуем ледяное копье
+            start_pos = (4, WEAPON_ICON_SIZE // 2 - 4)
+            end_pos = (WEAPON_ICON_SIZE - 12, WEAPON_ICON_SIZE // 2 - 4)
+            pygame.draw.line(weapon_surface, color, start_pos, end_pos, 6)
+            # Рисуем наконечник
+            pygame.draw.polygon(weapon_surface, color,
+                             [(end_pos[0], end_pos[1] - 8),
+                              (end_pos[0] + 8, end_pos[1]),
+                              (end_pos[0], end_pos[1] + 8)])
+        else:  # lightning_bolt
+            # Рисуем молнию
+            points = [(4, 4), (WEAPON_ICON_SIZE//2 - 4, WEAPON_ICON_SIZE//2 - 4),
+                     (WEAPON_ICON_SIZE//2 - 12, WEAPON_ICON_SIZE//2 - 4),
+                     (WEAPON_ICON_SIZE - 12, WEAPON_ICON_SIZE - 12)]
+            pygame.draw.lines(weapon_surface, color, False, points, 3)
+        return weapon_surface
+
+    def _cooldown_text(self, weapon, current_time):
+        """Оставшийся кулдаун оружия в виде строки или None"""
+        elapsed = current_time - weapon.last_cast_time
+        if elapsed >= weapon.settings['cooldown']:
+            return None
+        remaining = (weapon.settings['cooldown'] - elapsed) / 1000
+        return f"{remaining:.1f}" if remaining > 0 else ''
+
+    def get_state(self):
+        """Снимок всех значений, от которых зависит изображение интерфейса"""
+        player = self.game.player
+        current_time = self.game.clock.get_ticks()
+        weapons = tuple(
+            (self._cooldown_text(weapon, current_time),
+             player.current_mana < weapon.settings['mana_cost'])
+            for weapon in player.weapons.values()
+        )
+        return (player.hp, player.max_hp, int(player.current_mana), player.max_mana,
+                player.xp, player.xp_to_next_level, player.level,
+                self.game.current_level, player.current_weapon, weapons)
+
+    def draw(self, screen):
+        """Вывод интерфейса, перерисовка только при изменении состояния"""
+        state = self.get_state()
+        if state != self.state:
+            self.state = state
+            self.redraw()
+        screen.blit(self.surface, (0, 0))
+
+    def redraw(self):
+        """Полная перерисовка постоянной поверхности интерфейса"""
+        if not self.weapon_icons:
+            self._build_static_images()
+        self.redraw_count += 1
+        self.surface.fill((0, 0, 0, 0))
+        player = self.game.player
+        self.draw_health_bar(self.surface, player)
+        self.draw_mana_bar(self.surface, player)
+        self.draw_xp_bar(self.surface, player)
+        self.draw_weapon_interface(self.surface, player)
+
+        # Отображение текущего оружия
+        weapon_text = self.text.render(24, f"Оружие: {player.current_weapon}")
+        self.surface.blit(weapon_text, (10, 70))
+
+        # Отображение текущего уровня
+        level_text = self.text.render(36, f"Уровень: {self.game.current_level}")
+        self.surface.blit(level_text, (SCREEN_WIDTH - 150, 10))
+
+    def draw_health_bar(self, surface, player):
+        """Отрисовка полоски здоровья игрока"""
+        health_bar_bg = pygame.Rect(10, 10, 200, 20)
+        pygame.draw.rect(surface, HEALTH_BAR_BG, health_bar_bg)
+
+        health_width = int(200 * (player.hp / player.max_hp))
+        health_bar = pygame.Rect(10, 10, health_width, 20)
+        pygame.draw.rect(surface, HEALTH_BAR_HP, health_bar)
+
+        # Отображение значения здоровья
+        health_text = self.text.render(24, f"HP: {player.hp}/{player.max_hp}")
+        surface.blit(health_text, (220, 10))
+
+    def draw_mana_bar(self, surface, player):
+        """Отрисовка полоски маны"""
+        mana_bar_bg = pygame.Rect(10, 40, 200, 20)  # Располагаем под полоской здоровья
+        pygame.draw.rect(surface, HEALTH_BAR_BG, mana_bar_bg)
+
+        mana_width = int(200 * (player.current_mana / player.max_mana))
+        mana_bar = pygame.Rect(10, 40, mana_width, 20)
+        pygame.draw.rect(surface, (0, 0, 255), mana_bar)  # Синий цвет для маны
+
+        # Отображение значения маны
+        mana_text = self.text.render(24, f"MP: {int(player.current_mana)}/{player.max_mana}")
+        surface.blit(mana_text, (220, 40))
+
+    def draw_xp_bar(self, surface, player):
+        """Отрисовка полоски опыта"""
+        # Фон полоски опыта
+        xp_bar_bg = pygame.Rect(
+            XP_BAR_OFFSET,
+            SCREEN_HEIGHT - XP_BAR_OFFSET - XP_BAR_HEIGHT,
+            XP_BAR_WIDTH,
+            XP_BAR_HEIGHT
+        )
+        pygame.draw.rect(surface, HEALTH_BAR_BG, xp_bar_bg)
+
+        # Текущий опыт
+        xp_width = int(XP_BAR_WIDTH * (player.xp / player.xp_to_next_level))
+        xp_bar = pygame.Rect(
+            XP_BAR_OFFSET,
+            SCREEN_HEIGHT - XP_BAR_OFFSET - XP_BAR_HEIGHT,
+            xp_width,
+            XP_BAR_HEIGHT
+        )
+        pygame.draw.rect(surface, XP_BAR_COLOR, xp_bar)
+
+        # Отображение текста уровня
+        level_text = self.text.render(24, f"Level {player.level}")
+        surface.blit(level_text, (XP_BAR_OFFSET, SCREEN_HEIGHT - XP_BAR_OFFSET - XP_BAR_HEIGHT - 20))
+
+    def draw_weapon_interface(self, surface, player):
+        """Отрисовка интерфейса оружия"""
+        cooldowns = self.state[-1] if self.state else ()
+        for i, (weapon_name, weapon) in enumerate(player.weapons.items()):
+            # Позиция иконки
+            x = WEAPON_ICON_START_X + (WEAPON_ICON_SIZE + WEAPON_ICON_SPACING) * i
+            y = WEAPON_ICON_Y
+
+            # Рисуем фон иконки, выбранное оружие подсвечиваем
+            icon_rect = pygame.Rect(x, y, WEAPON_ICON_SIZE, WEAPON_ICON_SIZE)
+            if weapon_name == player.current_weapon:
+                pygame.draw.rect(surface, WEAPON_ICON_SELECTED_COLOR, icon_rect)
+            else:
+                pygame.draw.rect(surface, WEAPON_ICON_BG_COLOR, icon_rect)
+
+            # Рисуем рамку и символ оружия
+            pygame.draw.rect(surface, WHITE, icon_rect, 2)
+            surface.blit(self.weapon_icons[weapon_name], (x + 4, y + 4))
+
+            # Затемнение и оставшееся время кулдауна
+            cooldown_text, no_mana = cooldowns[i] if i < len(cooldowns) else (None, False)
+            if cooldown_text is not None:
+                surface.blit(self.cooldown_overlay, (x, y))
+                if cooldown_text:
+                    text = self.text.render(20, cooldown_text)
+                    text_rect = text.get_rect(center=(x + WEAPON_ICON_SIZE//2, y + WEAPON_ICON_SIZE//2))
+                    surface.blit(text, text_rect)
+
+            # Индикатор нехватки маны
+            if no_mana:
+                surface.blit(self.mana_overlay, (x, y))
+
+            # Рисуем стоимость маны
+            mana_text = self.text.render(20, f"{weapon.settings['mana_cost']}")
+            surface.blit(mana_text, (x + 2, y + WEAPON_ICON_SIZE - 20))
+
+            # Рисуем название оружия под иконкой
+            name_text = self.text.render(20, WEAPON_DESCRIPTIONS[weapon_name])
+            name_rect = name_text.get_rect(midtop=(x + WEAPON_ICON_SIZE//2, y + WEAPON_ICON_SIZE + 5))
+            surface.blit(name_text, name_rect)
@@ -0,0 +1,193 @@
+import math
+import random
+import struct
+import pygame
+from settings import *
+
+# Клавиши, которые читает игрок
+TRACKED_KEYS = (
+    pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN,
+    pygame.K_a, pygame.K_d, pygame.K_w, pygame.K_s,
+    pygame.K_LSHIFT, pygame.K_f,
+    pygame.K_1, pygame.K_2, pygame.K_3, pygame.K_4
+)
+
+# Файл записи ввода (little-endian): заголовок INPUT_HEADER, затем по записи INPUT_RECORD на шаг
+# симуляции; при флаге INPUT_FLAG_CHECKSUM за каждой записью следует хэш состояния перед шагом
+INPUT_MAGIC = b'RINP'
+INPUT_FORMAT_VERSION = 1
+INPUT_HEADER = struct.Struct('<4sHHQI')
+INPUT_RECORD = struct.Struct('<HBxdd')  # Маска клавиш, маска кнопок мыши, позиция мыши в мире
+INPUT_CHECKSUM_SIZE = 16
+INPUT_FLAG_CHECKSUM = 1
+
+# Бит маски для каждой отслеживаемой клавиши
+KEY_BITS = {key: 1 << index for index, key in enumerate(TRACKED_KEYS)}
+
+def pack_keys(keys):
+    """Маска отслеживаемых клавиш; прочие клавиши игрок не читает"""
+    mask = 0
+    for key in keys:
+        mask |= KEY_BITS.get(key, 0)
+    return mask
+
+def unpack_keys(mask):
+    """Множество клавиш по маске"""
+    return frozenset(key for key, bit in KEY_BITS.items() if mask & bit)
+
+class InputFrame:
+    """Состояние ввода за один кадр"""
+    __slots__ = ('keys', 'mouse_buttons', 'mouse_pos')
+
+    def __init__(self, keys=frozenset(), mouse_buttons=(False, False, False), mouse_pos=(0, 0)):
+        self.keys = frozenset(keys)  # Нажатые клавиши pygame.K_*
+        self.mouse_buttons = tuple(mouse_buttons)
+        self.mouse_pos = mouse_pos  # Позиция мыши в мировых координатах
+
+    def is_pressed(self, key):
+        """Нажата ли клавиша"""
+        return key in self.keys
+
+class PygameInput:
+    """Опрос реальной клавиатуры и мыши через pygame"""
+    def poll(self, game):
+        keys = pygame.key.get_pressed()
+        mouse_x, mouse_y = pygame.mouse.get_pos()
+        return InputFrame(
+            keys=(key for key in TRACKED_KEYS if keys[key]),
+            mouse_buttons=pygame.mouse.get_pressed()[:3],
+            mouse_pos=(mouse_x + game.camera.offset.x, mouse_y + game.camera.offset.y)
+        )
+
+class ScriptedInput:
+    """Синтетический ввод: функция кадра или готовая последовательность кадров"""
+    def __init__(self, script):
+        self.script = script
+        self.frame = 0
+
+    def poll(self, game):
+        if callable(self.script):
+            frame = self.script(self.frame, game)
+        elif self.frame < len(self.script):
+            frame = self.script[self.frame]
+        else:
+            frame = InputFrame()
+        self.frame += 1
+        return frame
+
+class InputRecorder:
+    """Запись ввода каждого шага в компактный файл, который только дописывается"""
+    def __init__(self, source, path, checksum=False, flush_frames=INPUT_RECORD_FLUSH):
+        self.source = source
+        self.path = path
+        self.checksum = checksum  # Сохранять хэш состояния для сверки при воспроизведении
+        self.flush_frames = flush_frames
+        self.file = None
+        self.frames = 0
+
+    def poll(self, game):
+        # Заголовок пишется при первом опросе, когда зерно игры уже известно
+        if self.file is None:
+            self.file = open(self.path, 'wb')
+            flags = INPUT_FLAG_CHECKSUM if self.checksum else 0
+            self.file.write(INPUT_HEADER.pack(INPUT_MAGIC, INPUT_FORMAT_VERSION, INPUT_HEADER.size,
+                                              game.seed, flags))
+        frame = self.source.poll(game)
+        buttons = sum(1 << index for index, pressed in enumerate(frame.mouse_buttons[:3]) if pressed)
+        self.file.write(INPUT_RECORD.pack(pack_keys(frame.keys), buttons,
+                                          frame.mouse_pos[0], frame.mouse_pos[1]))
+        if self.checksum:
+            self.file.write(bytes.fromhex(game.state_hash()))
+        self.frames += 1
+        # Периодический сброс: при аварийном завершении остаётся корректное начало записи
+        if self.frames % self.flush_frames == 0:
+            self.file.flush()
+        return frame
+
+    def close(self):
+        """Завершение записи"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+class ReplayInput:
+    """Воспроизведение записанного ввода со сверкой хэшей состояния, если они записаны"""
+    def __init__(self, path, verify=True):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < INPUT_HEADER.size:
+            raise ValueError(f"{path}: файл короче заголовка")
+        magic, version, header_size, self.seed, flags = INPUT_HEADER.unpack_from(data, 0)
+        if magic != INPUT_MAGIC:
+            raise ValueError(f"{path}: не запись ввода")
+        if version != INPUT_FORMAT_VERSION or header_size != INPUT_HEADER.size:
+            raise ValueError(f"{path}: версия формата {version}, ожидается {INPUT_FORMAT_VERSION}")
+        self.path = path
+        self.has_checksum = bool(flags & INPUT_FLAG_CHECKSUM)
+        self.verify = verify and self.has_checksum
+        record_size = INPUT_RECORD.size + (INPUT_CHECKSUM_SIZE if self.has_checksum else 0)
+
+        # Недописанная последняя запись (прерванная сессия) отбрасывается
+        count = (len(data) - header_size) // record_size
+        keys_cache = {}
+        self.frames = []
+        self.checksums = []
+        for index in range(count):
+            offset = header_size + index * record_size
+            mask, buttons, mouse_x, mouse_y = INPUT_RECORD.unpack_from(data, offset)
+            keys = keys_cache.get(mask)
+            if keys is None:
+                keys = keys_cache[mask] = unpack_keys(mask)
+            self.frames.append(InputFrame(keys, tuple(bool(buttons & (1 << bit)) for bit in range(3)),
+                                          (mouse_x, mouse_y)))
+            if self.has_checksum:
+                start = offset + INPUT_RECORD.size
+                self.checksums.append(data[start:start + INPUT_CHECKSUM_SIZE])
+        self.frame = 0
+        self.mismatches = 0
+        self.first_mismatch = None
+
+    def __len__(self):
+        return len(self.frames)
+
+    @property
+    def finished(self):
+        """Все записанные шаги воспроизведены"""
+        return self.frame >= len(self.frames)
+
+    def poll(self, game):
+        index = self.frame
+        self.frame += 1
+        if index >= len(self.frames):
+            return InputFrame()
+        if self.verify and bytes.fromhex(game.state_hash()) != self.checksums[index]:
+            self.mismatches += 1
+            if self.first_mismatch is None:
+                self.first_mismatch = index
+        return self.frames[index]
+
+def idle_script(frame, game):
+    """Игрок стоит на месте"""
+    return InputFrame(mouse_pos=game.player.rect.center)
+
+def make_wander_script(seed=0, hold_frames=30):
+    """Случайное блуждание с постоянной стрельбой по направлению движения"""
+    rng = random.Random(seed)
+    directions = [
+        (pygame.K_w,), (pygame.K_s,), (pygame.K_a,), (pygame.K_d,),
+        (pygame.K_w, pygame.K_a), (pygame.K_w, pygame.K_d),
+        (pygame.K_s, pygame.K_a), (pygame.K_s, pygame.K_d)
+    ]
+    weapons = (pygame.K_1, pygame.K_2, pygame.K_3, pygame.K_4)
+    state = {'keys': (), 'angle': 0.0}
+
+    def script(frame, game):
+        if frame % hold_frames == 0:
+            state['keys'] = rng.choice(directions) + (rng.choice(weapons),)
+            state['angle'] = rng.uniform(0, 2 * math.pi)
+        center_x, center_y = game.player.rect.center
+        aim = (center_x + math.cos(state['angle']) * 200,
+               center_y + math.sin(state['angle']) * 200)
+        return InputFrame(keys=state['keys'], mouse_buttons=(True, False, False), mouse_pos=aim)
+
+    return script
@@ -1,52 +1,156 @@
 import pygame
 import random
 import math
+import numpy as np
 from settings import *
-from level_generator import LevelGenerator
+from level_prefetch import generate_layout
+from tile_grid import TileGrid
+from flow_field import FlowField
+from level_renderer import ChunkedLevelRenderer
+from particles import ParticleSystem
+
+# Состояния комнат уровня
+ROOM_UNVISITED = 0  # Враги ещё не созданы, у комнаты только точки их появления
+ROOM_AWAKE = 1  # Враги комнаты существуют как спрайты
+ROOM_ASLEEP = 2  # Враги сохранены в компактные записи
+
+class LevelRoom:
+    """Комната уровня: прямоугольник в тайлах, соседи по коридорам и враги комнаты"""
+    __slots__ = ('index', 'x', 'y', 'width', 'height', 'neighbours', 'spawns', 'records', 'enemies')
+
+    def __init__(self, index, x, y, width, height):
+        self.index = index
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.neighbours = []  # Номера комнат, соединённых с этой коридором
+        self.spawns = []  # Центры появления ещё не созданных врагов в пикселях
+        self.records = None  # Записи уснувших врагов (ENEMY_DTYPE снимка)
+        self.enemies = []  # Созданные враги комнаты, пока она не спит
 
 class Level:
-    def __init__(self, game, level_number=1):
+    def __init__(self, game, level_number=1, layout=None):
         self.game = game
         self.level_number = level_number
+        # Зерно уровня заранее известно игре, поэтому уровень можно сгенерировать в фоне
+        self.seed = game.level_seed(level_number)
+        self.fx_rng = game.fx_rng
+        self.metrics = game.metrics
         self.tile_size = TILESIZE
-        self.width = 50  # Размер уровня в тайлах
-        self.height = 50
+        self.width = LEVEL_WIDTH  # Размер уровня в тайлах
+        self.height = LEVEL_HEIGHT
+        self.generator = LEVEL_GENERATOR
         self.checkpoints = []
         self.active_checkpoint = None
+        self.active_checkpoint_tile = None
         self.portal = None
-        self.portal_particles = []
-        self.generate_level()
+        self.particles = ParticleSystem(PORTAL_PARTICLE_CAPACITY)
+        self.portal_particle_style = self.particles.style(PORTAL_PARTICLES_COLOR)
+        self.sight_cache = {}  # Видимость между парами тайлов, сбрасывается каждый шаг
+        self.rooms = []
+        self.room_states = np.zeros(0, dtype=np.uint8)
+        self.room_bounds = np.zeros((0, 4))  # left, top, right, bottom комнат в пикселях
+        self.generate_level(layout)
 
-    def generate_level(self):
-        """Генерация нового уровня"""
-        generator = LevelGenerator(self.width, self.height, self.level_number)
-        self.tiles, self.player_pos, enemy_positions, self.portal_pos = generator.generate()
+    def generate_level(self, layout=None):
+        """Построение уровня по готовой раскладке или генерация новой"""
+        with self.metrics.timer('level.generate'):
+            if layout is None:
+                layout = generate_layout(self.width, self.height, self.level_number, self.seed,
+                                         self.generator, self.game.level_cache_dir)
+            self.tiles = layout.tiles_array()
+            self.player_pos, enemy_positions, self.portal_pos = layout.spawn, layout.enemies, layout.portal
+            self.grid = TileGrid(self.width, self.height, self.tiles, self.tile_size)
+            self.flow_field = FlowField(self.grid)
+            self.renderer = ChunkedLevelRenderer(self)
         
         # Конвертируем позицию игрока и портала в пиксели
         self.player_pos = (self.player_pos[0] * self.tile_size, self.player_pos[1] * self.tile_size)
         self.portal_pos = (self.portal_pos[0] * self.tile_size, self.portal_pos[1] * self.tile_size)
         
-        # Создаем врагов
-        for pos in enemy_positions:
-            enemy_x = pos[0] * self.tile_size + self.tile_size // 2  # Центрируем врага в тайле
-            enemy_y = pos[1] * self.tile_size + self.tile_size // 2
-            self.game.create_enemy((enemy_x, enemy_y))
+        # Граф комнат; враги комнат создаются при приближении игрока, остальные - сразу
+        self.build_rooms(layout.rooms, layout.connections)
+        with self.metrics.timer('level.spawn_enemies'):
+            for pos, room in zip(enemy_positions, layout.enemy_rooms):
+                enemy_x = pos[0] * self.tile_size + self.tile_size // 2  # Центрируем врага в тайле
+                enemy_y = pos[1] * self.tile_size + self.tile_size // 2
+                if 0 <= room < len(self.rooms):
+                    self.rooms[room].spawns.append((enemy_x, enemy_y))
+                else:
+                    self.game.create_enemy((enemy_x, enemy_y))
         
         # Создаем контрольные точки
         self.checkpoints = []
-        for y in range(self.height):
-            for x in range(self.width):
-                if self.tiles[x][y] == TILE_CHECKPOINT:
-                    self.checkpoints.append(pygame.math.Vector2(x * self.tile_size, y * self.tile_size))
+        for x, y in self.grid.positions_of(TILE_CHECKPOINT):
+            self.checkpoints.append(pygame.math.Vector2(x * self.tile_size, y * self.tile_size))
+
+    def build_rooms(self, rooms, connections):
+        """Комнаты уровня и их соседство по коридорам"""
+        self.rooms = [LevelRoom(index, *room) for index, room in enumerate(rooms)]
+        for first, second in connections:
+            self.rooms[first].neighbours.append(second)
+            self.rooms[second].neighbours.append(first)
+        self.room_states = np.full(len(self.rooms), ROOM_UNVISITED, dtype=np.uint8)
+        bounds = np.array(rooms, dtype=np.float64).reshape(-1, 4) * self.tile_size
+        bounds[:, 2:] += bounds[:, :2]
+        self.room_bounds = bounds
+
+    def room_distances(self, x, y):
+        """Расстояния от точки в пикселях до прямоугольников всех комнат (0 - внутри)"""
+        bounds = self.room_bounds
+        dx = np.maximum(np.maximum(bounds[:, 0] - x, x - bounds[:, 2]), 0)
+        dy = np.maximum(np.maximum(bounds[:, 1] - y, y - bounds[:, 3]), 0)
+        return np.sqrt(dx * dx + dy * dy)
+
+    def clear_rooms(self):
+        """Забыть врагов всех комнат: точки появления, записи и созданных врагов"""
+        for room in self.rooms:
+            room.spawns = []
+            room.records = None
+            room.enemies = []
+        self.room_states[:] = ROOM_ASLEEP
 
     def is_wall_at(self, x, y):
         """Проверка наличия стены в указанной позиции"""
-        tile_x = int(x // self.tile_size)
-        tile_y = int(y // self.tile_size)
-        
-        if 0 <= tile_x < self.width and 0 <= tile_y < self.height:
-            return self.tiles[tile_x][tile_y] == TILE_WALL
-        return True  # За пределами уровня считаем стеной
+        self.metrics.count('wall_checks')
+        return self.grid.is_wall_at(x, y)
+
+    def is_wall_in_rect(self, rect, dx=0, dy=0):
+        """Проверка стен под смещённым прямоугольником одним срезом карты"""
+        self.metrics.count('wall_checks')
+        return self.grid.is_wall_in_rect(rect.left + dx, rect.top + dy,
+                                         rect.right + dx, rect.bottom + dy)
+
+    def raycast(self, start, end):
+        """Первый тайл стены на отрезке между точками или None, если путь свободен"""
+        self.metrics.count('raycasts')
+        return self.grid.raycast(start[0], start[1], end[0], end[1])
+
+    def segments_blocked(self, starts, ends):
+        """Пакетная проверка пересечения стен отрезками (N, 2)"""
+        self.metrics.count('raycasts', len(starts))
+        return self.grid.segments_blocked(starts, ends)
+
+    def has_line_of_sight(self, start, end):
+        """Прямая видимость между центрами тайлов двух точек с кэшем на шаг симуляции"""
+        self.metrics.count('sight_checks')
+        size = self.tile_size
+        key = (int(start[0] // size), int(start[1] // size), int(end[0] // size), int(end[1] // size))
+        if key[2:] < key[:2]:
+            # Луч всегда идёт от меньшего тайла к большему: A->B и B->A - одна запись
+            key = key[2:] + key[:2]
+        visible = self.sight_cache.get(key)
+        if visible is None:
+            self.metrics.count('raycasts')
+            visible = self.grid.raycast((key[0] + 0.5) * size, (key[1] + 0.5) * size,
+                                        (key[2] + 0.5) * size, (key[3] + 0.5) * size) is None
+            self.sight_cache[key] = visible
+        return visible
+
+    def begin_step(self):
+        """Сброс кэша видимости перед шагом симуляции"""
+        self.sight_cache.clear()
 
     def check_checkpoint_collision(self, player_pos):
         """Проверка столкновения с контрольными точками"""
@@ -54,10 +158,28 @@ class Level:
         
         for checkpoint in self.checkpoints:
             if (player_vec - checkpoint).length() < CHECKPOINT_RADIUS:
-                self.active_checkpoint = checkpoint
+                self.set_active_checkpoint(checkpoint)
                 return True
         return False
 
+    def set_active_checkpoint(self, checkpoint):
+        """Активация контрольной точки с перезапеканием затронутых чанков"""
+        tile = (int(checkpoint.x // self.tile_size), int(checkpoint.y // self.tile_size))
+        if tile == self.active_checkpoint_tile:
+            self.active_checkpoint = checkpoint
+            return
+        if self.active_checkpoint_tile is not None:
+            self.renderer.invalidate_tile(*self.active_checkpoint_tile)
+        self.renderer.invalidate_tile(*tile)
+        self.active_checkpoint = checkpoint
+        self.active_checkpoint_tile = tile
+
+    def set_tile(self, tile_x, tile_y, tile):
+        """Изменение тайла с обновлением флагов и кэша отрисовки"""
+        self.grid.set_tile(tile_x, tile_y, tile)
+        self.renderer.invalidate_tile(tile_x, tile_y)
+        self.sight_cache.clear()
+
     def check_portal_collision(self, player_pos):
         """Проверка столкновения с порталом"""
         if self.portal_pos:
@@ -71,52 +193,20 @@ class Level:
     def update_portal(self):
         """Обновление анимации портала"""
         # Добавляем новые частицы
-        if random.random() < 0.2:  # 20% шанс каждый кадр
-            angle = random.uniform(0, 2 * math.pi)
-            speed = random.uniform(1, 3)
-            lifetime = random.randint(20, 40)
-            self.portal_particles.append({
-                'pos': pygame.math.Vector2(self.portal_pos),
-                'vel': pygame.math.Vector2(math.cos(angle) * speed, math.sin(angle) * speed),
-                'lifetime': lifetime,
-                'max_lifetime': lifetime
-            })
+        if self.fx_rng.random() < 0.2:  # 20% шанс каждый кадр
+            angle = self.fx_rng.uniform(0, 2 * math.pi)
+            speed = self.fx_rng.uniform(1, 3)
+            lifetime = self.fx_rng.randint(20, 40)
+            self.particles.emit(self.portal_particle_style, self.portal_pos[0], self.portal_pos[1],
+                                math.cos(angle) * speed, math.sin(angle) * speed, lifetime)
         
         # Обновляем существующие частицы
-        for particle in self.portal_particles[:]:
-            particle['pos'] += particle['vel']
-            particle['lifetime'] -= 1
-            if particle['lifetime'] <= 0:
-                self.portal_particles.remove(particle)
+        self.particles.update()
 
     def draw(self, screen, camera):
         """Отрисовка уровня"""
-        # Получаем видимую область
-        screen_rect = screen.get_rect()
-        camera_rect = pygame.Rect(camera.offset.x, camera.offset.y, screen_rect.width, screen_rect.height)
-        
-        # Вычисляем границы видимой области в тайлах
-        start_x = max(0, int(camera_rect.left // self.tile_size))
-        end_x = min(self.width, int(camera_rect.right // self.tile_size) + 1)
-        start_y = max(0, int(camera_rect.top // self.tile_size))
-        end_y = min(self.height, int(camera_rect.bottom // self.tile_size) + 1)
-        
-        # Отрисовка тайлов
-        for x in range(start_x, end_x):
-            for y in range(start_y, end_y):
-                tile = self.tiles[x][y]
-                if tile != TILE_FLOOR:  # Пол пропускаем
-                    rect = pygame.Rect(x * self.tile_size, y * self.tile_size,
-                                     self.tile_size, self.tile_size)
-                    screen_pos = camera.apply_rect(rect)
-                    
-                    if tile == TILE_WALL:
-                        pygame.draw.rect(screen, (100, 100, 100), screen_pos)
-                    elif tile == TILE_CHECKPOINT:
-                        color = CHECKPOINT_ACTIVE_COLOR if pygame.math.Vector2(x * self.tile_size, y * self.tile_size) == self.active_checkpoint else CHECKPOINT_COLOR
-                        pygame.draw.circle(screen, color,
-                                         (screen_pos.centerx, screen_pos.centery),
-                                         CHECKPOINT_RADIUS)
+        # Статичные тайлы выводятся готовыми чанками
+        self.renderer.draw(screen, camera)
         
         # Отрисовка портала
         if self.portal_pos:
@@ -129,10 +219,4 @@ class Level:
                              PORTAL_SIZE//2)
             
             # Отрисовка частиц портала
-            for particle in self.portal_particles:
-                alpha = int(255 * (particle['lifetime'] / particle['max_lifetime']))
-                particle_color = (*PORTAL_PARTICLES_COLOR, alpha)
-                particle_pos = camera.apply_point(particle['pos'].x, particle['pos'].y)
-                particle_surface = pygame.Surface((4, 4), pygame.SRCALPHA)
-                pygame.draw.circle(particle_surface, particle_color, (2, 2), 2)
-                screen.blit(particle_surface, (particle_pos[0] - 2, particle_pos[1] - 2)) 
\ No newline at end of file
+            self.particles.draw(screen, camera) 
\ No newline at end of file
@@ -0,0 +1,183 @@
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import numpy as np
+import settings
+from settings import *
+import level_generator
+import regions
+from tile_grid import TILE_FLAGS
+
+logger = logging.getLogger(__name__)
+
+# Двоичный формат уровня (little-endian):
+#   заголовок LEVEL_HEADER, затем контрольные точки и позиции врагов (int32 x, y),
+#   номера комнат врагов (int32), комнаты (int32 x, y, ширина, высота), коридоры между комнатами (int32 a, b),
+#   затем с выравниванием по LEVEL_TILES_ALIGN байт массив тайлов uint8 (width, height) в порядке C
+LEVEL_MAGIC = b'RLVL'
+LEVEL_FORMAT_VERSION = 2
+LEVEL_HEADER = struct.Struct('<4sHH16sQIIIiiiiIIIII')
+LEVEL_TILES_ALIGN = 16
+
+# Настройки, от которых зависит раскладка уровня
+GENERATOR_SETTINGS = (
+    'ROOM_MIN_SIZE', 'ROOM_MAX_SIZE', 'ROOMS_PER_LEVEL', 'CORRIDOR_WIDTH', 'ROOM_GRID_CELL', 'ROOM_GRID_FILL',
+    'BSP_MIN_LEAF_SIZE', 'CAVE_WALL_CHANCE', 'CAVE_SMOOTHING_STEPS', 'CAVE_SECTOR_SIZE', 'CAVE_SECTOR_MIN_FLOOR',
+    'ENEMIES_PER_ROOM', 'MIN_ENEMY_DISTANCE', 'MIN_ENEMY_DISTANCE_FROM_PLAYER',
+)
+
+def generator_fingerprint():
+    """Короткий хэш кода генераторов, их настроек и флагов тайлов"""
+    digest = hashlib.sha1()
+    for module in (level_generator, regions):
+        with open(module.__file__, 'rb') as f:
+            digest.update(f.read())
+    digest.update(repr([getattr(settings, name) for name in GENERATOR_SETTINGS]).encode())
+    digest.update(TILE_FLAGS.tobytes())
+    return digest.hexdigest()[:12]
+
+# Входит в имена файлов кэша: после изменения генераторов старые раскладки не находятся и вытесняются
+GENERATOR_FINGERPRINT = generator_fingerprint()
+
+class LevelLayout:
+    """Готовая раскладка уровня: компактные данные без спрайтов, передаются между процессами"""
+    __slots__ = ('generator', 'width', 'height', 'level_number', 'seed', 'tiles', 'spawn', 'enemies', 'portal',
+                 'checkpoints', 'enemy_rooms', 'rooms', 'connections')
+
+    def __init__(self, generator, width, height, level_number, seed, tiles, spawn, enemies, portal,
+                 checkpoints=(), enemy_rooms=None, rooms=(), connections=()):
+        self.generator = generator  # Имя алгоритма генерации
+        self.width = width
+        self.height = height
+        self.level_number = level_number
+        self.seed = seed
+        self.tiles = tiles  # Байты или массив тайлов uint8 (width, height)
+        self.spawn = spawn
+        self.enemies = enemies
+        self.portal = portal
+        self.checkpoints = list(checkpoints)
+        # Номер комнаты каждого врага (-1 - вне комнат), комнаты (x, y, ширина, высота) в тайлах и коридоры
+        self.enemy_rooms = list(enemy_rooms) if enemy_rooms is not None else [-1] * len(enemies)
+        self.rooms = list(rooms)
+        self.connections = list(connections)
+
+    def key(self):
+        """Параметры, однозначно задающие раскладку"""
+        return (self.generator, self.width, self.height, self.level_number, self.seed)
+
+    def tiles_array(self):
+        """Изменяемый массив тайлов для сетки уровня; копия только для неизменяемых данных"""
+        array = np.frombuffer(self.tiles, dtype=np.uint8).reshape(self.width, self.height)
+        return array if array.flags.writeable else array.copy()
+
+def _tiles_offset(value_count):
+    """Смещение массива тайлов от начала файла по числу значений int32 перед ним"""
+    offset = LEVEL_HEADER.size + value_count * 4
+    return (offset + LEVEL_TILES_ALIGN - 1) // LEVEL_TILES_ALIGN * LEVEL_TILES_ALIGN
+
+def save_layout(path, layout):
+    """Запись раскладки уровня; файл подменяется атомарно"""
+    checkpoints = np.asarray(layout.checkpoints, dtype='<i4').reshape(-1, 2)
+    enemies = np.asarray(layout.enemies, dtype='<i4').reshape(-1, 2)
+    enemy_rooms = np.asarray(layout.enemy_rooms, dtype='<i4')
+    rooms = np.asarray(layout.rooms, dtype='<i4').reshape(-1, 4)
+    connections = np.asarray(layout.connections, dtype='<i4').reshape(-1, 2)
+    arrays = (checkpoints, enemies, enemy_rooms, rooms, connections)
+    tiles_offset = _tiles_offset(sum(array.size for array in arrays))
+    header = LEVEL_HEADER.pack(
+        LEVEL_MAGIC, LEVEL_FORMAT_VERSION, LEVEL_HEADER.size, layout.generator.encode()[:16],
+        layout.seed, layout.width, layout.height, layout.level_number,
+        layout.spawn[0], layout.spawn[1], layout.portal[0], layout.portal[1],
+        len(checkpoints), len(enemies), len(rooms), len(connections), tiles_offset
+    )
+    body = header + b''.join(array.tobytes() for array in arrays)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(body)
+        f.write(b'\0' * (tiles_offset - len(body)))
+        f.write(np.frombuffer(layout.tiles, dtype=np.uint8).tobytes())
+    os.replace(temp_path, path)
+
+def load_layout(path):
+    """Загрузка раскладки через mmap: массив тайлов ссылается на отображённые страницы файла"""
+    with open(path, 'rb') as f:
+        # Копирование при записи: изменения тайлов не попадают в файл, нетронутые страницы не копируются
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    if len(mapped) < LEVEL_HEADER.size:
+        raise ValueError(f"{path}: файл короче заголовка")
+    (magic, version, header_size, generator, seed, width, height, level_number,
+     spawn_x, spawn_y, portal_x, portal_y, checkpoint_count, enemy_count, room_count, connection_count,
+     tiles_offset) = LEVEL_HEADER.unpack_from(mapped, 0)
+    if magic != LEVEL_MAGIC:
+        raise ValueError(f"{path}: не файл уровня")
+    if version != LEVEL_FORMAT_VERSION or header_size != LEVEL_HEADER.size:
+        raise ValueError(f"{path}: версия формата {version}, ожидается {LEVEL_FORMAT_VERSION}")
+    if len(mapped) < tiles_offset + width * height:
+        raise ValueError(f"{path}: файл обрезан")
+
+    point_count = checkpoint_count + enemy_count
+    values = np.frombuffer(mapped, dtype='<i4', count=point_count * 2 + enemy_count + room_count * 4 +
+                           connection_count * 2, offset=LEVEL_HEADER.size)
+    points = values[:point_count * 2].reshape(-1, 2)
+    enemy_rooms = values[point_count * 2:point_count * 2 + enemy_count]
+    rooms = values[point_count * 2 + enemy_count:point_count * 2 + enemy_count + room_count * 4].reshape(-1, 4)
+    connections = values[len(values) - connection_count * 2:].reshape(-1, 2)
+    tiles = np.frombuffer(mapped, dtype=np.uint8, count=width * height,
+                          offset=tiles_offset).reshape(width, height)
+    return LevelLayout(generator.rstrip(b'\0').decode(), width, height, level_number, seed, tiles,
+                       (spawn_x, spawn_y), [tuple(point) for point in points[checkpoint_count:].tolist()],
+                       (portal_x, portal_y), [tuple(point) for point in points[:checkpoint_count].tolist()],
+                       enemy_rooms.tolist(), [tuple(room) for room in rooms.tolist()],
+                       [tuple(pair) for pair in connections.tolist()])
+
+class LevelCache:
+    """Дисковый кэш уровней по ключу (генератор, зерно, размер, номер уровня, версия генераторов)"""
+    def __init__(self, directory=LEVEL_CACHE_DIR, max_files=LEVEL_CACHE_MAX_FILES):
+        self.directory = directory
+        self.max_files = max_files
+
+    def path_for(self, generator, seed, width, height, level_number):
+        """Путь к файлу уровня в кэше"""
+        return os.path.join(self.directory,
+                            f'{generator}_{seed}_{width}x{height}_{level_number}_{GENERATOR_FINGERPRINT}.lvl')
+
+    def load(self, generator, seed, width, height, level_number):
+        """Раскладка из кэша или None, если её нет или файл не читается"""
+        path = self.path_for(generator, seed, width, height, level_number)
+        if not os.path.exists(path):
+            return None
+        try:
+            layout = load_layout(path)
+            # Время изменения - метка последнего использования для вытеснения
+            os.utime(path)
+            return layout
+        except (OSError, ValueError) as error:
+            logger.warning("Пропускаем файл кэша уровня: %s", error)
+            return None
+
+    def store(self, layout):
+        """Сохранение раскладки в кэш"""
+        os.makedirs(self.directory, exist_ok=True)
+        save_layout(self.path_for(layout.generator, layout.seed, layout.width, layout.height,
+                                  layout.level_number), layout)
+        self.evict()
+
+    def evict(self):
+        """Удаление давно не использованных файлов сверх max_files"""
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith('.lvl'):
+                    try:
+                        entries.append((entry.stat().st_mtime, entry.path))
+                    except OSError:
+                        continue
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.max_files)]:
+            try:
+                os.remove(path)
+            except OSError:
+                # Файл уже удалил другой процесс или он ещё отображён в память
+                pass
@@ -1,6 +1,16 @@
+import logging
 import random
-import pygame
+import numpy as np
 from settings import *
+from tile_grid import TILE_FLAGS
+from regions import largest_region
+
+logger = logging.getLogger(__name__)
+
+# Маска тайлов вокруг врага, ближе MIN_ENEMY_DISTANCE к которым не может стоять другой враг
+ENEMY_SPACING_RADIUS = int(MIN_ENEMY_DISTANCE)
+_spacing = np.arange(-ENEMY_SPACING_RADIUS, ENEMY_SPACING_RADIUS + 1)
+ENEMY_SPACING_MASK = _spacing[:, None] ** 2 + _spacing[None, :] ** 2 < MIN_ENEMY_DISTANCE * MIN_ENEMY_DISTANCE
 
 class Room:
     def __init__(self, x, y, width, height):
@@ -18,59 +28,233 @@ class Room:
                 self.y - min_distance < other.y + other.height and
                 self.y + self.height + min_distance > other.y)
 
-    def get_random_position(self):
+    def get_random_position(self, rng):
         """Получение случайной позиции внутри комнаты"""
         # Оставляем отступ от стен
         padding = 1
-        x = random.randint(self.x + padding, self.x + self.width - padding - 1)
-        y = random.randint(self.y + padding, self.y + self.height - padding - 1)
+        x = rng.randint(self.x + padding, self.x + self.width - padding - 1)
+        y = rng.randint(self.y + padding, self.y + self.height - padding - 1)
         return (x, y)
 
 class LevelGenerator:
-    def __init__(self, width, height, level_number=1):
+    """Базовый генератор: планировку строит подкласс, объекты расставляются общим кодом"""
+    name = None
+
+    def __init__(self, width, height, level_number=1, rng=None):
         self.width = width
         self.height = height
         self.level_number = level_number
-        self.tiles = [[TILE_WALL for _ in range(height)] for _ in range(width)]
+        self.rng = rng if rng is not None else random.Random()
+        self.tiles = np.full((width, height), TILE_WALL, dtype=np.uint8)
         self.rooms = []
         self.checkpoints = []
         self.portal_position = None
         self.spawn_position = None
         self.enemy_positions = []
+        self.enemy_rooms = []  # Номер комнаты каждого врага из enemy_positions
+        self.connections = []  # Пары номеров комнат, соединённых коридором
+        self.enemy_shortfall = []  # (номер комнаты, запрошено, размещено) для недозаполненных комнат
 
     def generate(self):
-        """Генерация нового уровня"""
+        """Генерация нового уровня: (tiles, spawn, enemy_positions, portal)"""
         self.rooms = []
+        self.connections = []
         self.enemy_positions = []
+        self.enemy_rooms = []
+        self.enemy_shortfall = []
         
-        print(f"Генерация уровня {self.level_number}")
-        
-        # Генерация комнат
-        self._place_rooms()
-        print(f"Создано комнат: {len(self.rooms)}")
-        
-        # Соединение комнат коридорами
-        self._connect_rooms()
+        # Планировка: стены, полы и список комнат в порядке прохождения
+        self._build_layout()
+        if self.spawn_position is None and self.rooms:
+            self.spawn_position = self._nearest_floor(self.rooms[0])
+        if self.spawn_position is None:
+            raise ValueError(f"Генератор {self.name}: на карте {self.width}x{self.height} нет комнаты для спавна")
         
         # Размещение контрольных точек
         self._place_checkpoints()
         
         # Размещение портала
         self._place_portal()
-        print(f"Портал размещен в: {self.portal_position}")
         
         # Размещение врагов
         self._place_enemies()
-        print(f"Размещено врагов: {len(self.enemy_positions)}")
-        print(f"Позиции врагов: {self.enemy_positions}")
+        logger.info("Уровень %d: комнат %d, врагов %d, портал %s",
+                    self.level_number, len(self.rooms), len(self.enemy_positions), self.portal_position)
         
         return self.tiles, self.spawn_position, self.enemy_positions, self.portal_position
 
+    def _build_layout(self):
+        """Построение стен и полов, заполнение self.rooms и self.connections"""
+        raise NotImplementedError
+
+    def _nearest_floor(self, room, target=None):
+        """Ближайший к точке (по умолчанию центру комнаты) тайл пола внутри комнаты"""
+        target_x, target_y = target if target is not None else room.center
+        if 0 <= target_x < self.width and 0 <= target_y < self.height and self.tiles[target_x, target_y] == TILE_FLOOR:
+            return (target_x, target_y)
+        area = self.tiles[room.x:room.x + room.width, room.y:room.y + room.height]
+        xs, ys = np.nonzero(area == TILE_FLOOR)
+        if len(xs) == 0:
+            return None
+        best = int(np.argmin((xs + room.x - target_x) ** 2 + (ys + room.y - target_y) ** 2))
+        return (int(xs[best]) + room.x, int(ys[best]) + room.y)
+
+    def _farthest_floor(self, room, target):
+        """Самый дальний от точки тайл пола внутри комнаты или None, если другого пола нет"""
+        area = self.tiles[room.x:room.x + room.width, room.y:room.y + room.height]
+        xs, ys = np.nonzero(area == TILE_FLOOR)
+        if len(xs) == 0:
+            return None
+        best = int(np.argmax((xs + room.x - target[0]) ** 2 + (ys + room.y - target[1]) ** 2))
+        position = (int(xs[best]) + room.x, int(ys[best]) + room.y)
+        return position if position != tuple(target) else None
+
+    def _carve_room(self, room):
+        """Вырезание комнаты в тайлах"""
+        self.tiles[room.x:room.x + room.width, room.y:room.y + room.height] = TILE_FLOOR
+
+    def _create_l_corridor(self, start, end):
+        """Г-образный коридор между двумя точками со случайным порядком осей"""
+        x1, y1 = start
+        x2, y2 = end
+        if self.rng.random() < 0.5:
+            # Сначала по горизонтали, потом по вертикали
+            self._create_corridor((x1, y1), (x2, y1))
+            self._create_corridor((x2, y1), (x2, y2))
+        else:
+            # Сначала по вертикали, потом по горизонтали
+            self._create_corridor((x1, y1), (x1, y2))
+            self._create_corridor((x1, y2), (x2, y2))
+
+    def _create_corridor(self, start, end):
+        """Создание коридора между двумя точками"""
+        x1, y1 = start
+        x2, y2 = end
+
+        half = CORRIDOR_WIDTH // 2
+
+        # Сначала идем по X
+        self._carve_rect(min(x1, x2), y1 - half, max(x1, x2) + 1, y1 - half + CORRIDOR_WIDTH)
+
+        # Затем по Y
+        self._carve_rect(x2 - half, min(y1, y2), x2 - half + CORRIDOR_WIDTH, max(y1, y2) + 1)
+
+    def _carve_rect(self, x0, y0, x1, y1):
+        """Вырезание прямоугольника [x0, x1) x [y0, y1) с обрезкой по границам карты"""
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(self.width, x1), min(self.height, y1)
+        if x0 < x1 and y0 < y1:
+            self.tiles[x0:x1, y0:y1] = TILE_FLOOR
+
+    def _place_checkpoints(self):
+        """Размещение контрольных точек"""
+        room_indices = list(range(1, len(self.rooms) - 1))  # Исключаем первую и последнюю комнаты
+        checkpoint_count = len(self.rooms) // 3  # Размещаем КТ примерно в каждой третьей комнате
+        
+        if room_indices and checkpoint_count > 0:
+            selected_rooms = self.rng.sample(room_indices, min(checkpoint_count, len(room_indices)))
+            for room_idx in selected_rooms:
+                room = self.rooms[room_idx]
+                checkpoint_pos = room.get_random_position(self.rng)
+                if self.tiles[checkpoint_pos] != TILE_FLOOR:
+                    # В неправильных комнатах (пещеры) случайная точка может попасть в стену
+                    checkpoint_pos = self._nearest_floor(room, checkpoint_pos)
+                    if checkpoint_pos is None:
+                        continue
+                self.checkpoints.append(checkpoint_pos)
+                self.tiles[checkpoint_pos] = TILE_CHECKPOINT
+
+    def _place_portal(self):
+        """Размещение портала в последней комнате, не на точке спавна"""
+        room = self.rooms[-1]
+        position = self._nearest_floor(room)
+        if position is None or position == tuple(self.spawn_position):
+            # В единственной комнате портал уходит в самый дальний от спавна угол
+            position = self._farthest_floor(room, self.spawn_position)
+        if position is None:
+            raise ValueError(f"Генератор {self.name}: в последней комнате нет пола для портала")
+        self.portal_position = position
+        self.tiles[position] = TILE_PORTAL
+
+    def _room_occupancy(self, room, room_index):
+        """Сетка свободных для врагов тайлов внутри комнаты (без крайних рядов)"""
+        x0, y0 = room.x + 1, room.y + 1
+        x1 = min(room.x + room.width - 1, self.width)
+        y1 = min(room.y + room.height - 1, self.height)
+        free = (TILE_FLAGS[self.tiles[x0:x1, y0:y1]] & TILE_FLAG_SPAWNABLE) != 0
+
+        # Рядом с точкой спавна в первых двух комнатах врагов не ставим
+        if room_index < 2 and self.spawn_position and free.size:
+            xs = np.arange(x0, x1)[:, None] - self.spawn_position[0]
+            ys = np.arange(y0, y1)[None, :] - self.spawn_position[1]
+            free &= xs * xs + ys * ys >= MIN_ENEMY_DISTANCE_FROM_PLAYER * MIN_ENEMY_DISTANCE_FROM_PLAYER
+        return free
+
+    def _sample_room(self, room, room_index, count):
+        """Выборка по Пуассону: метание дротиков по перемешанным свободным тайлам за один проход"""
+        free = self._room_occupancy(room, room_index)
+        candidates = np.flatnonzero(free).tolist()
+        self.rng.shuffle(candidates)
+        width, height = free.shape
+        radius = ENEMY_SPACING_RADIUS
+        positions = []
+        for index in candidates:
+            if len(positions) >= count:
+                break
+            x, y = divmod(index, height)
+            if not free[x, y]:
+                continue
+            positions.append((room.x + 1 + x, room.y + 1 + y))
+            # Вычёркиваем круг вокруг принятой позиции, маску обрезаем по краям сетки
+            left, top = max(0, x - radius), max(0, y - radius)
+            right, bottom = min(width, x + radius + 1), min(height, y + radius + 1)
+            mask = ENEMY_SPACING_MASK[left - x + radius:right - x + radius, top - y + radius:bottom - y + radius]
+            free[left:right, top:bottom] &= ~mask
+        return positions
+
+    def _place_enemies(self):
+        """Размещение врагов в комнатах с заданной плотностью"""
+        self.enemy_positions = []
+        self.enemy_rooms = []
+        self.enemy_shortfall = []
+        
+        # Пропускаем первую комнату (стартовую) и последнюю (с порталом)
+        rooms_for_enemies = self.rooms[1:-1]
+        
+        # Увеличиваем количество врагов с уровнем
+        min_enemies = max(1, int(ENEMIES_PER_ROOM[0] * (1 + (self.level_number - 1) * 0.2)))
+        max_enemies = max(2, int(ENEMIES_PER_ROOM[1] * (1 + (self.level_number - 1) * 0.2)))
+        
+        requested = 0
+        for i, room in enumerate(rooms_for_enemies):
+            enemy_count = self.rng.randint(min_enemies, max_enemies)
+            requested += enemy_count
+            positions = self._sample_room(room, i, enemy_count)
+            self.enemy_positions.extend(positions)
+            self.enemy_rooms.extend([i + 1] * len(positions))
+            if len(positions) < enemy_count:
+                self.enemy_shortfall.append((i + 1, enemy_count, len(positions)))
+                logger.debug("Комната %d (%d, %d, %dx%d): размещено %d из %d врагов, свободных мест нет",
+                             i + 1, room.x, room.y, room.width, room.height, len(positions), enemy_count)
+        
+        if self.enemy_shortfall:
+            logger.info("Уровень %d: недобор врагов %d из %d в %d комнатах",
+                        self.level_number, requested - len(self.enemy_positions), requested,
+                        len(self.enemy_shortfall))
+
+class RoomGridGenerator(LevelGenerator):
+    """Комнаты в ячейках сетки, соединённые цепочкой коридоров"""
+    name = 'rooms'
+
+    def _build_layout(self):
+        self._place_rooms()
+        self._connect_rooms()
+
     def _place_rooms(self):
         """Размещение комнат в сетке"""
-        # Определяем размеры сетки
-        grid_cols = 4  # Количество столбцов в сетке
-        grid_rows = 3  # Количество рядов в сетке
+        # Размеры сетки растут вместе с картой, на 50x50 это 4x3
+        grid_cols = max(4, (self.width - 2) // ROOM_GRID_CELL)
+        grid_rows = max(3, (self.height - 2) // ROOM_GRID_CELL)
         
         # Вычисляем размеры ячейки сетки
         cell_width = (self.width - 2) // grid_cols
@@ -83,18 +267,19 @@ class LevelGenerator:
                 grid_positions.append((row, col))
         
         # Выбираем случайные позиции для комнат
-        selected_positions = random.sample(grid_positions, min(ROOMS_PER_LEVEL, len(grid_positions)))
+        room_count = max(ROOMS_PER_LEVEL, int(len(grid_positions) * ROOM_GRID_FILL))
+        selected_positions = self.rng.sample(grid_positions, min(room_count, len(grid_positions)))
         
         # Сортируем позиции слева направо и сверху вниз для создания последовательного пути
         selected_positions.sort(key=lambda pos: (pos[0], pos[1]))
         
         for i, (row, col) in enumerate(selected_positions):
             # Определяем размеры комнаты (немного меньше ячейки сетки)
-            room_width = random.randint(
+            room_width = self.rng.randint(
                 min(ROOM_MIN_SIZE, cell_width - 4),
                 min(ROOM_MAX_SIZE, cell_width - 4)
             )
-            room_height = random.randint(
+            room_height = self.rng.randint(
                 min(ROOM_MIN_SIZE, cell_height - 4),
                 min(ROOM_MAX_SIZE, cell_height - 4)
             )
@@ -104,8 +289,8 @@ class LevelGenerator:
             cell_y = 1 + row * cell_height
             
             # Добавляем случайное смещение внутри ячейки
-            x = cell_x + random.randint(2, cell_width - room_width - 2)
-            y = cell_y + random.randint(2, cell_height - room_height - 2)
+            x = cell_x + self.rng.randint(2, cell_width - room_width - 2)
+            y = cell_y + self.rng.randint(2, cell_height - room_height - 2)
             
             new_room = Room(x, y, room_width, room_height)
             self._carve_room(new_room)
@@ -115,137 +300,139 @@ class LevelGenerator:
             if i == 0:
                 self.spawn_position = new_room.center
 
-    def _carve_room(self, room):
-        """Вырезание комнаты в тайлах"""
-        for x in range(room.x, room.x + room.width):
-            for y in range(room.y, room.y + room.height):
-                self.tiles[x][y] = TILE_FLOOR
-
     def _connect_rooms(self):
         """Соединение комнат коридорами с учетом структуры"""
         for i, room in enumerate(self.rooms[:-1]):
             next_room = self.rooms[i + 1]
             
-            # Находим центры комнат
-            x1, y1 = room.center
-            x2, y2 = next_room.center
-            
-            # Создаем коридор с промежуточными точками для более структурированного пути
-            if random.random() < 0.5:
-                # Сначала по горизонтали, потом по вертикали
-                self._create_corridor((x1, y1), (x2, y1))
-                self._create_corridor((x2, y1), (x2, y2))
-            else:
-                # Сначала по вертикали, потом по горизонтали
-                self._create_corridor((x1, y1), (x1, y2))
-                self._create_corridor((x1, y2), (x2, y2))
+            # Коридор между центрами комнат с промежуточной точкой
+            self._create_l_corridor(room.center, next_room.center)
             
             room.connected = True
             next_room.connected = True
+            self.connections.append((i, i + 1))
 
-    def _create_corridor(self, start, end):
-        """Создание коридора между двумя точками"""
-        x1, y1 = start
-        x2, y2 = end
+class BSPGenerator(LevelGenerator):
+    """Двоичное разбиение карты: комната в каждом листе, коридоры между соседними ветвями"""
+    name = 'bsp'
 
-        # Сначала идем по X
-        for x in range(min(x1, x2), max(x1, x2) + 1):
-            for w in range(CORRIDOR_WIDTH):
-                y = y1 + w - CORRIDOR_WIDTH // 2
-                if 0 <= x < self.width and 0 <= y < self.height:
-                    self.tiles[x][y] = TILE_FLOOR
+    def _build_layout(self):
+        # Узел: [x, y, ширина, высота, левый потомок, правый потомок]; обход без рекурсии
+        root = [1, 1, self.width - 2, self.height - 2, None, None]
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if self._split(node):
+                stack.append(node[5])
+                stack.append(node[4])
 
-        # Затем по Y
-        for y in range(min(y1, y2), max(y1, y2) + 1):
-            for w in range(CORRIDOR_WIDTH):
-                x = x2 + w - CORRIDOR_WIDTH // 2
-                if 0 <= x < self.width and 0 <= y < self.height:
-                    self.tiles[x][y] = TILE_FLOOR
-
-    def _place_checkpoints(self):
-        """Размещение контрольных точек"""
-        room_indices = list(range(1, len(self.rooms) - 1))  # Исключаем первую и последнюю комнаты
-        checkpoint_count = len(self.rooms) // 3  # Размещаем КТ примерно в каждой третьей комнате
-        
-        if room_indices and checkpoint_count > 0:
-            selected_rooms = random.sample(room_indices, min(checkpoint_count, len(room_indices)))
-            for room_idx in selected_rooms:
-                room = self.rooms[room_idx]
-                checkpoint_pos = room.get_random_position()
-                self.checkpoints.append(checkpoint_pos)
-                self.tiles[checkpoint_pos[0]][checkpoint_pos[1]] = TILE_CHECKPOINT
+        # Комнаты в листьях в порядке обхода слева направо; у узла - номер комнаты-представителя
+        representatives = {}
+        order = []
+        stack = [(root, False)]
+        while stack:
+            node, visited = stack.pop()
+            left, right = node[4], node[5]
+            if left is None:
+                room = self._room_in_leaf(node)
+                self._carve_room(room)
+                representatives[id(node)] = len(self.rooms)
+                self.rooms.append(room)
+            elif visited:
+                # Соединяем представителей двух поддеревьев и поднимаем представителя вверх
+                first, second = representatives[id(left)], representatives[id(right)]
+                self._create_l_corridor(self.rooms[first].center, self.rooms[second].center)
+                self.connections.append((first, second))
+                representatives[id(node)] = first
+            else:
+                stack.append((node, True))
+                stack.append((right, False))
+                stack.append((left, False))
 
-    def _place_portal(self):
-        """Размещение портала в последней комнате"""
-        if self.rooms:
-            last_room = self.rooms[-1]
-            self.portal_position = last_room.center
-            self.tiles[last_room.center[0]][last_room.center[1]] = TILE_PORTAL
-
-    def _is_valid_enemy_position(self, pos, room, room_index):
-        """Проверка валидности позиции для врага"""
-        x, y = pos
-        
-        # Проверка, что позиция находится в пределах уровня
-        if not (0 <= x < self.width and 0 <= y < self.height):
+    def _split(self, node):
+        """Разрезание узла пополам; False, если узел слишком мал и становится листом"""
+        x, y, width, height = node[:4]
+        min_leaf = BSP_MIN_LEAF_SIZE
+        can_split_x = width >= min_leaf * 2
+        can_split_y = height >= min_leaf * 2
+        if not can_split_x and not can_split_y:
             return False
-            
-        # Проверка, что позиция не в стене
-        if self.tiles[x][y] != TILE_FLOOR:
-            return False
-        
-        # Проверка расстояния от других врагов
-        for enemy_pos in self.enemy_positions:
-            dx = x - enemy_pos[0]
-            dy = y - enemy_pos[1]
-            distance = (dx * dx + dy * dy) ** 0.5
-            if distance < MIN_ENEMY_DISTANCE:
-                return False
-        
-        # Проверка расстояния от точки спавна только для первых двух комнат
-        if room_index < 2 and self.spawn_position:
-            dx = x - self.spawn_position[0]
-            dy = y - self.spawn_position[1]
-            distance = (dx * dx + dy * dy) ** 0.5
-            if distance < MIN_ENEMY_DISTANCE_FROM_PLAYER:
-                return False
-        
-        # Проверка, что позиция внутри текущей комнаты
-        if not (room.x < x < room.x + room.width and room.y < y < room.y + room.height):
-            return False
-            
+        # Режем поперёк длинной стороны, у почти квадратных узлов - случайно
+        if can_split_x and (not can_split_y or width > height * 1.25 or
+                            (height <= width * 1.25 and self.rng.random() < 0.5)):
+            cut = self.rng.randint(min_leaf, width - min_leaf)
+            node[4] = [x, y, cut, height, None, None]
+            node[5] = [x + cut, y, width - cut, height, None, None]
+        else:
+            cut = self.rng.randint(min_leaf, height - min_leaf)
+            node[4] = [x, y, width, cut, None, None]
+            node[5] = [x, y + cut, width, height - cut, None, None]
         return True
 
-    def _place_enemies(self):
-        """Размещение врагов в комнатах"""
-        self.enemy_positions = []
-        
-        # Пропускаем первую комнату (стартовую) и последнюю (с порталом)
-        rooms_for_enemies = self.rooms[1:-1]
-        print(f"Комнат для врагов: {len(rooms_for_enemies)}")
-        
-        for i, room in enumerate(rooms_for_enemies):
-            print(f"\nОбработка комнаты {i + 1}:")
-            print(f"Размеры комнаты: x={room.x}, y={room.y}, width={room.width}, height={room.height}")
-            
-            # Увеличиваем количество врагов с уровнем
-            min_enemies = max(1, int(ENEMIES_PER_ROOM[0] * (1 + (self.level_number - 1) * 0.2)))
-            max_enemies = max(2, int(ENEMIES_PER_ROOM[1] * (1 + (self.level_number - 1) * 0.2)))
-            enemy_count = random.randint(min_enemies, max_enemies)
-            
-            print(f"Планируется врагов: {enemy_count}")
-            
-            attempts = 0
-            placed_in_room = 0
-            
-            while placed_in_room < enemy_count and attempts < 50:
-                pos = room.get_random_position()
-                print(f"Попытка {attempts + 1}: позиция {pos}")
-                
-                if self._is_valid_enemy_position(pos, room, i):
-                    self.enemy_positions.append(pos)
-                    placed_in_room += 1
-                    
-                attempts += 1
-            
-            print(f"Размещено в комнате {i + 1}: {placed_in_room} врагов") 
\ No newline at end of file
+    def _room_in_leaf(self, node):
+        """Комната случайного размера внутри листа с отступом от его границ"""
+        x, y, width, height = node[:4]
+        room_width = self.rng.randint(min(ROOM_MIN_SIZE, width - 2), min(ROOM_MAX_SIZE, width - 2))
+        room_height = self.rng.randint(min(ROOM_MIN_SIZE, height - 2), min(ROOM_MAX_SIZE, height - 2))
+        return Room(x + self.rng.randint(1, width - room_width - 1),
+                    y + self.rng.randint(1, height - room_height - 1),
+                    room_width, room_height)
+
+class CaveGenerator(LevelGenerator):
+    """Пещеры клеточного автомата; комнатами считаются достаточно открытые секторы карты"""
+    name = 'caves'
+
+    def _build_layout(self):
+        noise = np.random.default_rng(self.rng.getrandbits(64))
+        walls = noise.random((self.width, self.height)) < CAVE_WALL_CHANCE
+        walls[0, :] = walls[-1, :] = walls[:, 0] = walls[:, -1] = True
+
+        # Сглаживание: клетка становится стеной, если в окне 3x3 не меньше 5 стен
+        for _ in range(CAVE_SMOOTHING_STEPS):
+            padded = np.pad(walls, 1, constant_values=True).astype(np.uint8)
+            counts = sum(padded[1 + dx:padded.shape[0] - 1 + dx, 1 + dy:padded.shape[1] - 1 + dy]
+                         for dx in (-1, 0, 1) for dy in (-1, 0, 1))
+            walls = counts >= 5
+            walls[0, :] = walls[-1, :] = walls[:, 0] = walls[:, -1] = True
+
+        # Оставляем только самую большую связную пещеру
+        floor = largest_region(~walls)
+        self.tiles[floor] = TILE_FLOOR
+        self._place_sectors(floor)
+
+    def _place_sectors(self, floor):
+        """Секторы с достаточной долей пола, упорядоченные змейкой по рядам"""
+        # На картах меньше сектора он сжимается до карты
+        size = min(CAVE_SECTOR_SIZE, self.width, self.height)
+        cols = max(1, self.width // size)
+        rows = max(1, self.height // size)
+        # Доля пола во всех секторах одним суммированием по блокам
+        blocks = floor[:cols * size, :rows * size].reshape(cols, size, rows, size).sum(axis=(1, 3))
+        min_floor = size * size * CAVE_SECTOR_MIN_FLOOR
+        sectors = {}
+        for row in range(rows):
+            columns = range(cols) if row % 2 == 0 else range(cols - 1, -1, -1)
+            for col in columns:
+                if blocks[col, row] >= min_floor:
+                    sectors[col, row] = len(self.rooms)
+                    self.rooms.append(Room(col * size, row * size, size, size))
+        # Пещера связна, поэтому соседние комнаты - секторы, граничащие по стороне
+        for (col, row), index in sectors.items():
+            for neighbour in ((col - 1, row), (col, row - 1)):
+                if neighbour in sectors:
+                    self.connections.append((sectors[neighbour], index))
+        if not self.rooms and floor.any():
+            # Ни один сектор не набрал пола: вся пещера становится одной комнатой по своим границам
+            xs, ys = np.nonzero(floor)
+            x0, y0 = int(xs.min()), int(ys.min())
+            self.rooms.append(Room(x0, y0, int(xs.max()) - x0 + 1, int(ys.max()) - y0 + 1))
+
+GENERATORS = {cls.name: cls for cls in (RoomGridGenerator, BSPGenerator, CaveGenerator)}
+
+def create_generator(name, width, height, level_number=1, rng=None):
+    """Генератор уровня по имени алгоритма"""
+    try:
+        generator_class = GENERATORS[name]
+    except KeyError:
+        raise ValueError(f"Неизвестный генератор уровня: {name}") from None
+    return generator_class(width, height, level_number, rng)
@@ -0,0 +1,78 @@
+import logging
+import multiprocessing
+import random
+from concurrent.futures import ProcessPoolExecutor
+from settings import *
+from level_generator import create_generator
+from level_format import LevelCache, LevelLayout
+
+logger = logging.getLogger(__name__)
+
+def generate_layout(width, height, level_number, seed, generator=LEVEL_GENERATOR, cache_dir=None):
+    """Раскладка уровня из дискового кэша или новая генерация; вызывается и в рабочем процессе, и синхронно"""
+    cache = LevelCache(cache_dir) if cache_dir else None
+    if cache is not None:
+        layout = cache.load(generator, seed, width, height, level_number)
+        if layout is not None:
+            return layout
+
+    level_generator = create_generator(generator, width, height, level_number, random.Random(seed))
+    tiles, spawn, enemies, portal = level_generator.generate()
+    layout = LevelLayout(generator, width, height, level_number, seed, tiles.tobytes(),
+                         tuple(spawn), [tuple(pos) for pos in enemies], tuple(portal),
+                         level_generator.checkpoints, level_generator.enemy_rooms,
+                         [(room.x, room.y, room.width, room.height) for room in level_generator.rooms],
+                         level_generator.connections)
+    if cache is not None:
+        try:
+            cache.store(layout)
+        except OSError as error:
+            logger.warning("Не удалось сохранить уровень в кэш: %s", error)
+    return layout
+
+class LevelPrefetcher:
+    """Заблаговременная генерация следующего уровня в отдельном процессе"""
+    def __init__(self):
+        # spawn: дочерний процесс не наследует окно, часы и потоки игры
+        self.executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+        self.pending = {}  # Ключ раскладки -> Future
+
+    def request(self, width, height, level_number, seed, generator=LEVEL_GENERATOR, cache_dir=None):
+        """Запуск фоновой генерации уровня"""
+        key = (width, height, level_number, seed, generator, cache_dir)
+        if key not in self.pending:
+            self.pending[key] = self.executor.submit(generate_layout, *key)
+
+    def take(self, width, height, level_number, seed, generator=LEVEL_GENERATOR, cache_dir=None):
+        """Готовая раскладка или синхронная генерация, если фоновая ещё не завершилась"""
+        key = (width, height, level_number, seed, generator, cache_dir)
+        future = self.pending.pop(key, None)
+        # Устаревшие запросы больше не нужны
+        for stale in self.pending.values():
+            stale.cancel()
+        self.pending.clear()
+
+        # Уровень из кэша отображается в память прямо здесь, без копирования через процессы
+        if cache_dir:
+            layout = LevelCache(cache_dir).load(generator, seed, width, height, level_number)
+            if layout is not None:
+                if future is not None:
+                    future.cancel()
+                return layout
+
+        if future is not None and future.done() and not future.cancelled():
+            try:
+                return future.result()
+            except Exception:
+                logger.exception("Фоновая генерация уровня %d завершилась ошибкой", level_number)
+        elif future is not None:
+            future.cancel()
+            logger.info("Уровень %d ещё не готов в фоне, генерируем синхронно", level_number)
+        return generate_layout(*key)
+
+    def close(self):
+        """Остановка рабочего процесса"""
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        self.executor.shutdown(wait=False)
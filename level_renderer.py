@@ -0,0 +1,85 @@
+from collections import OrderedDict
+import numpy as np
+import pygame
+from settings import *
+
+class ChunkedLevelRenderer:
+    """Кэш статичной части уровня, запечённой в поверхности-чанки"""
+    def __init__(self, level, chunk_size=LEVEL_CHUNK_SIZE, cache_limit=LEVEL_CHUNK_CACHE_LIMIT):
+        self.level = level
+        self.chunk_size = chunk_size
+        self.chunk_pixels = chunk_size * level.tile_size
+        self.cache_limit = cache_limit
+        # Чанки в порядке последнего использования для вытеснения старых
+        self.chunks = OrderedDict()
+        self.bake_count = 0
+
+    def invalidate_tile(self, tile_x, tile_y):
+        """Сброс чанка, содержащего тайл"""
+        self.chunks.pop((tile_x // self.chunk_size, tile_y // self.chunk_size), None)
+
+    def invalidate_all(self):
+        """Сброс всех чанков"""
+        self.chunks.clear()
+
+    def _bake_chunk(self, chunk_x, chunk_y):
+        """Отрисовка тайлов одного чанка в отдельную поверхность"""
+        level = self.level
+        tile_size = level.tile_size
+        start_x = chunk_x * self.chunk_size
+        start_y = chunk_y * self.chunk_size
+        end_x = min(level.width, start_x + self.chunk_size)
+        end_y = min(level.height, start_y + self.chunk_size)
+
+        surface = pygame.Surface(((end_x - start_x) * tile_size, (end_y - start_y) * tile_size))
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        surface.fill(BLACK)  # Пол совпадает с цветом фона
+
+        active = level.active_checkpoint_tile
+        tiles = level.grid.tiles[start_x:end_x, start_y:end_y]
+        for local_x, local_y in zip(*np.nonzero(tiles != TILE_FLOOR)):
+            tile = tiles[local_x, local_y]
+            rect = pygame.Rect(int(local_x) * tile_size, int(local_y) * tile_size, tile_size, tile_size)
+            if tile == TILE_WALL:
+                pygame.draw.rect(surface, WALL_COLOR, rect)
+            elif tile == TILE_CHECKPOINT:
+                is_active = (start_x + int(local_x), start_y + int(local_y)) == active
+                color = CHECKPOINT_ACTIVE_COLOR if is_active else CHECKPOINT_COLOR
+                pygame.draw.circle(surface, color, rect.center, CHECKPOINT_RADIUS)
+
+        self.bake_count += 1
+        return surface
+
+    def get_chunk(self, chunk_x, chunk_y):
+        """Запечённая поверхность чанка (запекается при первом обращении)"""
+        key = (chunk_x, chunk_y)
+        surface = self.chunks.get(key)
+        if surface is None:
+            surface = self._bake_chunk(chunk_x, chunk_y)
+            self.chunks[key] = surface
+            while len(self.chunks) > self.cache_limit:
+                self.chunks.popitem(last=False)
+        else:
+            self.chunks.move_to_end(key)
+        return surface
+
+    def draw(self, screen, camera):
+        """Вывод только тех чанков, которые пересекают камеру"""
+        level = self.level
+        screen_rect = screen.get_rect()
+        left = int(camera.render_offset.x)
+        top = int(camera.render_offset.y)
+        max_chunk_x = (level.width - 1) // self.chunk_size
+        max_chunk_y = (level.height - 1) // self.chunk_size
+
+        start_x = max(0, left // self.chunk_pixels)
+        end_x = min(max_chunk_x, (left + screen_rect.width) // self.chunk_pixels)
+        start_y = max(0, top // self.chunk_pixels)
+        end_y = min(max_chunk_y, (top + screen_rect.height) // self.chunk_pixels)
+
+        for chunk_x in range(start_x, end_x + 1):
+            for chunk_y in range(start_y, end_y + 1):
+                surface = self.get_chunk(chunk_x, chunk_y)
+                screen.blit(surface, (chunk_x * self.chunk_pixels - left,
+                                      chunk_y * self.chunk_pixels - top))
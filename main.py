@@ -1,10 +1,17 @@
+import argparse
+import os
 import pygame
 import sys
+import time
 from settings import *
 from game import Game
+from game_clock import GameClock
+from input_source import InputRecorder, PygameInput
+from tracing import ProfileCapture
 
 class Main:
-    def __init__(self):
+    def __init__(self, metrics_path=None, trace_dir=TRACE_DIR, profile_path=None, level_cache_dir=LEVEL_CACHE_DIR,
+                 autosave_path=AUTOSAVE_PATH, load_path=None, record_path=None, checksum=False, seed=None):
         # Инициализация Pygame
         pygame.init()
         
@@ -12,14 +19,33 @@ class Main:
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Roguelike RPG")
         
-        # Создаем часы для контроля FPS
+        # Скрываем системный курсор, вместо него рисуется прицел
+        pygame.mouse.set_visible(False)
+        
+        # Создаем часы для ограничения частоты отрисовки
         self.clock = pygame.time.Clock()
         
-        # Создаем игру
-        self.game = Game()
+        # Ввод с клавиатуры и мыши; при записи каждый шаг дописывается в файл для воспроизведения
+        self.recorder = InputRecorder(PygameInput(), record_path, checksum) if record_path else None
+        
+        # Создаем игру: симуляция идёт фиксированными шагами независимо от частоты кадров
+        self.game = Game(input_source=self.recorder, seed=seed, clock=GameClock(fixed_step=SIMULATION_STEP),
+                         metrics_path=metrics_path, trace_dir=trace_dir, interpolate=True, prefetch=True,
+                         level_cache_dir=level_cache_dir, autosave_path=autosave_path)
+        self.autosave_path = autosave_path
+        if load_path:
+            self.game.load_state(load_path)
+        
+        # Профилирование: на весь запуск по флагу или по горячей клавише F4
+        self.profiler = ProfileCapture(trace_dir or TRACE_DIR)
+        self.profile_path = profile_path
+        if profile_path:
+            self.profiler.start()
 
     def run(self):
         running = True
+        accumulator = 0.0  # Реальное время, ещё не отработанное симуляцией (мс)
+        previous_time = time.perf_counter()
         while running:
             # Обработка событий
             for event in pygame.event.get():
@@ -28,21 +54,69 @@ class Main:
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
                         running = False
+                    elif event.key == pygame.K_F3:
+                        self.game.metrics_overlay.toggle()
+                    elif event.key == pygame.K_F4 and not self.profile_path:
+                        path = self.profiler.toggle()
+                        if path:
+                            print(f"Профиль записан в {path}")
+                    elif event.key == pygame.K_F9 and self.recorder is None and self.autosave_path and \
+                            os.path.exists(self.autosave_path):
+                        # Возврат к последней активированной контрольной точке (не при записи ввода:
+                        # скачок состояния не попадает в запись)
+                        try:
+                            self.game.load_state(self.autosave_path)
+                        except (OSError, ValueError) as error:
+                            print(f"Не удалось загрузить сохранение: {error}")
+            
+            # Накопление реального времени кадра
+            now = time.perf_counter()
+            accumulator += min((now - previous_time) * 1000, MAX_FRAME_TIME)
+            previous_time = now
             
-            # Обновление
-            self.game.update()
+            # Обновление: столько шагов симуляции, сколько накопилось, но не больше лимита
+            self.game.begin_frame()
+            steps = 0
+            while accumulator >= SIMULATION_STEP and steps < MAX_SIMULATION_STEPS:
+                self.game.step()
+                accumulator -= SIMULATION_STEP
+                steps += 1
+            if accumulator >= SIMULATION_STEP:
+                # Не успеваем догнать - отбрасываем остаток, игра замедляется вместо лавины шагов
+                accumulator %= SIMULATION_STEP
             
-            # Отрисовка
-            self.game.draw(self.screen)
+            # Отрисовка с интерполяцией между двумя последними шагами
+            self.game.draw(self.screen, accumulator / SIMULATION_STEP)
             pygame.display.flip()
             
-            # Ограничение FPS
-            self.clock.tick(FPS)
+            # Ограничение частоты отрисовки
+            self.clock.tick(RENDER_FPS)
         
         # Завершение работы
+        if self.profiler.active:
+            print(f"Профиль записан в {self.profiler.stop(self.profile_path)}")
+        self.game.close()
+        if self.recorder is not None:
+            self.recorder.close()
         pygame.quit()
         sys.exit()
 
 if __name__ == '__main__':
-    game = Main()
+    parser = argparse.ArgumentParser(description="Roguelike RPG")
+    parser.add_argument('--metrics', metavar='FILE', help="Записывать метрики кадров в JSONL-файл")
+    parser.add_argument('--trace-dir', default=TRACE_DIR, help="Каталог трасс провалов кадра")
+    parser.add_argument('--profile', metavar='FILE', help="Профилировать весь запуск cProfile в .prof-файл")
+    parser.add_argument('--seed', type=int, help="Зерно игры; без него уровни случайны и не кэшируются")
+    parser.add_argument('--level-cache', default=LEVEL_CACHE_DIR, help="Каталог кэша сгенерированных уровней")
+    parser.add_argument('--no-level-cache', action='store_true', help="Всегда генерировать уровни заново")
+    parser.add_argument('--load', metavar='FILE', help="Продолжить игру из файла снимка")
+    parser.add_argument('--record', metavar='FILE', help="Записывать ввод для воспроизведения в headless.py --replay")
+    parser.add_argument('--checksum', action='store_true', help="Записывать хэш состояния каждого шага")
+    args = parser.parse_args()
+    if args.record and args.load:
+        # Запись воспроизводится с новой игры по зерну, а не с загруженного снимка
+        parser.error("--record нельзя совмещать с --load")
+    game = Main(metrics_path=args.metrics, trace_dir=args.trace_dir, profile_path=args.profile,
+                level_cache_dir=None if args.no_level_cache else args.level_cache, load_path=args.load,
+                record_path=args.record, checksum=args.checksum, seed=args.seed)
     game.run() 
\ No newline at end of file
@@ -0,0 +1,211 @@
+import json
+import queue
+import threading
+import time
+from collections import deque
+import numpy as np
+import pygame
+from settings import *
+from tracing import TRACE_TID_MAIN
+
+class _Timer:
+    """Замер времени именованного участка кадра, переиспользуется между кадрами"""
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        metrics = self.metrics
+        timings = metrics.timings
+        timings[self.name] = timings.get(self.name, 0.0) + elapsed * 1000
+        if metrics.tracer is not None:
+            metrics.tracer.events.append((self.name, self.start, elapsed, TRACE_TID_MAIN, None))
+        return False
+
+class FrameMetrics:
+    """Реестр таймеров, счётчиков и показателей кадра со скользящими перцентилями"""
+    def __init__(self, window=METRICS_WINDOW, writer=None, tracer=None):
+        self.window = window
+        self.writer = writer
+        self.tracer = tracer
+        self.frame = 0
+        self.frame_start = None
+        self.timings = {}  # Миллисекунды по таймерам за текущий кадр
+        self.counters = {}  # Счётчики вызовов за текущий кадр
+        self.gauges = {}  # Мгновенные значения на конец кадра
+        self.aggregated = {}  # Имя -> [секунды, вызовы] для участков, замеряемых по частям
+        self.last_frame = {}  # Итог последнего завершённого кадра
+        self.history = {'frame': deque(maxlen=window)}
+        self._timers = {}
+
+    def timer(self, name):
+        """Контекстный менеджер замера участка кадра"""
+        timer = self._timers.get(name)
+        if timer is None:
+            timer = _Timer(self, name)
+            self._timers[name] = timer
+        return timer
+
+    def add_time(self, name, seconds):
+        """Добавление времени к сводному участку (например, ИИ одного класса врагов)"""
+        entry = self.aggregated.get(name)
+        if entry is None:
+            self.aggregated[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def count(self, name, amount=1):
+        """Увеличение счётчика текущего кадра"""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def gauge(self, name, value):
+        """Мгновенное значение показателя"""
+        self.gauges[name] = value
+
+    def begin_frame(self):
+        """Начало нового кадра; предыдущий кадр закрывается и уходит в историю"""
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            self._finish_frame((now - self.frame_start) * 1000)
+        self.frame_start = now
+
+    def _finish_frame(self, frame_ms):
+        """Перенос данных кадра в скользящие окна, трассу и файл"""
+        self.frame += 1
+        for name, (seconds, calls) in self.aggregated.items():
+            self.timings[name] = seconds * 1000
+            self.count(f'{name}.calls', calls)
+        if self.tracer is not None:
+            self.tracer.end_frame(self.frame, self.frame_start, frame_ms, self.aggregated)
+        history = self.history
+        history['frame'].append(frame_ms)
+        for name, value in self.timings.items():
+            samples = history.get(name)
+            if samples is None:
+                samples = deque(maxlen=self.window)
+                history[name] = samples
+            samples.append(value)
+
+        self.last_frame = {
+            'frame': self.frame,
+            'frame_ms': frame_ms,
+            'timers': self.timings,
+            'counters': self.counters,
+            'gauges': dict(self.gauges)
+        }
+        if self.writer is not None:
+            self.writer.submit(self.last_frame)
+        # Новые словари вместо очистки: записанный кадр может ещё читаться фоновым потоком
+        self.timings = {}
+        self.counters = {}
+        self.aggregated = {}
+
+    def percentiles(self, name='frame', points=(50, 95, 99)):
+        """Перцентили скользящего окна таймера в миллисекундах"""
+        samples = self.history.get(name)
+        if not samples:
+            return None
+        return tuple(float(value) for value in np.percentile(np.fromiter(samples, float), points))
+
+    def close(self):
+        """Остановка фоновой записи метрик и трасс"""
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        if self.tracer is not None:
+            self.tracer.close()
+
+class MetricsWriter:
+    """Фоновая запись кадров в JSONL; кадр никогда не ждёт диска"""
+    def __init__(self, path, queue_size=METRICS_QUEUE_SIZE):
+        self.path = path
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, name='metrics-writer', daemon=True)
+        self.thread.start()
+
+    def submit(self, record):
+        """Постановка записи в очередь; при переполнении запись отбрасывается"""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            while True:
+                record = self.queue.get()
+                if record is None:
+                    break
+                f.write(json.dumps(record, ensure_ascii=False))
+                f.write('\n')
+                # Сбрасываем на диск, когда очередь опустела
+                if self.queue.empty():
+                    f.flush()
+
+    def close(self):
+        """Дозапись очереди и остановка потока"""
+        self.queue.put(None)
+        self.thread.join()
+
+class MetricsOverlay:
+    """Оверлей с перцентилями кадра, таймерами и счётчиками"""
+    def __init__(self, metrics, fonts):
+        self.metrics = metrics
+        self.font = fonts.get(METRICS_OVERLAY_FONT_SIZE)
+        self.visible = False
+        self.surface = None
+        self.last_refresh = None
+
+    def toggle(self):
+        """Показать или скрыть оверлей"""
+        self.visible = not self.visible
+        self.last_refresh = None
+
+    def build_lines(self):
+        """Строки оверлея по текущему окну метрик"""
+        metrics = self.metrics
+        lines = []
+        frame = metrics.percentiles('frame')
+        if frame:
+            lines.append("Кадр p50/p95/p99: {:.2f} / {:.2f} / {:.2f} мс".format(*frame))
+        for name in sorted(metrics.history):
+            if name == 'frame':
+                continue
+            p50, p95, p99 = metrics.percentiles(name)
+            lines.append(f"{name}: {p50:.2f} / {p95:.2f} / {p99:.2f} мс")
+        last = metrics.last_frame
+        for name, value in sorted(last.get('counters', {}).items()):
+            lines.append(f"{name}: {value}")
+        for name, value in sorted(last.get('gauges', {}).items()):
+            lines.append(f"{name}: {value}")
+        return lines
+
+    def refresh(self):
+        """Перерисовка поверхности оверлея"""
+        lines = self.build_lines()
+        line_height = self.font.get_linesize()
+        width = max((self.font.size(line)[0] for line in lines), default=0) + 16
+        self.surface = pygame.Surface((width, line_height * len(lines) + 12), pygame.SRCALPHA)
+        self.surface.fill(METRICS_OVERLAY_BG)
+        for i, line in enumerate(lines):
+            self.surface.blit(self.font.render(line, True, WHITE), (8, 6 + i * line_height))
+
+    def draw(self, screen):
+        """Вывод оверлея; текст пересобирается не чаще заданного интервала"""
+        if not self.visible:
+            return
+        now = time.perf_counter()
+        if self.last_refresh is None or (now - self.last_refresh) * 1000 >= METRICS_OVERLAY_INTERVAL:
+            self.last_refresh = now
+            self.refresh()
+        screen.blit(self.surface, (SCREEN_WIDTH - self.surface.get_width() - 10, 60))
@@ -0,0 +1,136 @@
+import numpy as np
+import pygame
+from settings import *
+
+class ParticleStyle:
+    """Внешний вид и параметры вспышки частиц одного вида"""
+    __slots__ = ('index', 'radius', 'count', 'speed', 'lifetime')
+
+    def __init__(self, index, radius, count, speed, lifetime):
+        self.index = index  # Индекс набора спрайтов в системе частиц
+        self.radius = radius
+        self.count = count  # Частиц во вспышке
+        self.speed = speed  # Диапазон скорости (мин, макс) в пикселях за шаг
+        self.lifetime = lifetime  # Диапазон времени жизни (мин, макс) в шагах
+
+class ParticleSystem:
+    """Пул частиц фиксированной ёмкости на массивах NumPy"""
+    def __init__(self, capacity=PARTICLE_CAPACITY, fade_steps=PARTICLE_FADE_STEPS):
+        self.capacity = capacity
+        self.fade_steps = fade_steps
+        self.count = 0
+        self.dropped = 0  # Частицы, не поместившиеся в пул
+        # Живые частицы занимают первые count ячеек, погибшие заменяются последними живыми
+        self.positions = np.zeros((capacity, 2))
+        self.velocities = np.zeros((capacity, 2))
+        self.lifetimes = np.zeros(capacity, dtype=np.int32)
+        self.max_lifetimes = np.ones(capacity, dtype=np.int32)
+        self.styles = np.zeros(capacity, dtype=np.int32)
+        self.sprites = []  # Индекс вида -> спрайты по ступеням затухания
+        self.offsets = []  # Индекс вида -> радиус для центрирования спрайта
+        self._style_cache = {}
+
+    def style(self, color, radius=2, count=8, speed=(1, 3), lifetime=(15, 30)):
+        """Регистрация вида частиц; спрайты одного цвета и радиуса общие"""
+        key = (tuple(color), radius)
+        index = self._style_cache.get(key)
+        if index is None:
+            index = len(self.sprites)
+            self._style_cache[key] = index
+            sprites = []
+            for step in range(self.fade_steps):
+                alpha = 255 * (step + 1) // self.fade_steps
+                sprite = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+                pygame.draw.circle(sprite, (*color[:3], alpha), (radius, radius), radius)
+                sprites.append(sprite)
+            self.sprites.append(sprites)
+            self.offsets.append(radius)
+        return ParticleStyle(index, radius, count, speed, lifetime)
+
+    def emit(self, style, x, y, velocity_x, velocity_y, lifetime):
+        """Добавление одной частицы; при заполненном пуле частица отбрасывается"""
+        index = self.count
+        if index >= self.capacity:
+            self.dropped += 1
+            return False
+        self.positions[index] = (x, y)
+        self.velocities[index] = (velocity_x, velocity_y)
+        self.lifetimes[index] = lifetime
+        self.max_lifetimes[index] = lifetime
+        self.styles[index] = style.index
+        self.count = index + 1
+        return True
+
+    def burst(self, style, x, y, rng, count=None):
+        """Вспышка частиц во все стороны из точки"""
+        count = style.count if count is None else count
+        free = self.capacity - self.count
+        if count > free:
+            self.dropped += count - free
+            count = free
+        if count <= 0:
+            return
+        start, end = self.count, self.count + count
+        angles = np.array([rng.uniform(0, 2 * np.pi) for _ in range(count)])
+        speeds = np.array([rng.uniform(*style.speed) for _ in range(count)])
+        lifetimes = [rng.randint(*style.lifetime) for _ in range(count)]
+        self.positions[start:end] = (x, y)
+        self.velocities[start:end, 0] = np.cos(angles) * speeds
+        self.velocities[start:end, 1] = np.sin(angles) * speeds
+        self.lifetimes[start:end] = lifetimes
+        self.max_lifetimes[start:end] = lifetimes
+        self.styles[start:end] = style.index
+        self.count = end
+
+    def update(self):
+        """Шаг всех частиц и удаление погибших"""
+        count = self.count
+        if not count:
+            return
+        self.positions[:count] += self.velocities[:count]
+        self.lifetimes[:count] -= 1
+        dead = np.flatnonzero(self.lifetimes[:count] <= 0)
+        if len(dead):
+            self._compact(dead)
+
+    def _compact(self, dead):
+        """Перенос живых частиц из хвоста на места погибших"""
+        alive_count = self.count - len(dead)
+        # Дыры в начале пула и живые частицы за его новой границей - их поровну
+        holes = dead[dead < alive_count]
+        movers = np.flatnonzero(self.lifetimes[alive_count:self.count] > 0) + alive_count
+        if len(holes):
+            for array in (self.positions, self.velocities, self.lifetimes, self.max_lifetimes, self.styles):
+                array[holes] = array[movers]
+        self.count = alive_count
+
+    def clear(self):
+        """Удаление всех частиц"""
+        self.count = 0
+
+    def draw(self, screen, camera):
+        """Отрисовка видимых частиц одним вызовом blits; возвращает их число"""
+        count = self.count
+        if not count:
+            return 0
+        offset = camera.render_offset
+        screen_x = self.positions[:count, 0] - offset.x
+        screen_y = self.positions[:count, 1] - offset.y
+        width, height = screen.get_size()
+        visible = np.flatnonzero((screen_x > -PARTICLE_MAX_RADIUS) & (screen_x < width + PARTICLE_MAX_RADIUS) &
+                                 (screen_y > -PARTICLE_MAX_RADIUS) & (screen_y < height + PARTICLE_MAX_RADIUS))
+        if not len(visible):
+            return 0
+        # Ступень затухания: доля оставшейся жизни, округлённая вверх
+        lifetimes = self.lifetimes[visible]
+        steps = (lifetimes * self.fade_steps + self.max_lifetimes[visible] - 1) // self.max_lifetimes[visible] - 1
+        steps = np.clip(steps, 0, self.fade_steps - 1)
+        styles = self.styles[visible]
+        radii = np.array(self.offsets)[styles]
+        xs = (screen_x[visible] - radii).astype(np.int32)
+        ys = (screen_y[visible] - radii).astype(np.int32)
+        sprites = self.sprites
+        screen.blits([(sprites[style][step], (x, y))
+                      for style, step, x, y in zip(styles.tolist(), steps.tolist(), xs.tolist(), ys.tolist())],
+                     doreturn=False)
+        return len(visible)
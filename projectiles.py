@@ -0,0 +1,285 @@
+import numpy as np
+import pygame
+from settings import *
+
+# Стороны: снаряды игрока попадают по врагам, снаряды врагов - по игроку
+FACTION_PLAYER = 0
+FACTION_ENEMY = 1
+
+class ProjectileKind:
+    """Общие параметры и заранее отрисованные изображения одного вида снарядов"""
+    def __init__(self, index, name, faction, settings):
+        self.index = index
+        self.name = name
+        self.faction = faction
+        self.speed = settings['projectile_speed']
+        self.max_range = settings['range']
+        size = settings['size']
+        # Снаряд сталкивается квадратом size x size, радиус - половина его диагонали
+        self.radius = 0.5 * (2 * size * size) ** 0.5
+
+        if name == 'ice_lance':
+            # Удлиненная форма ледяного копья
+            self.image = pygame.Surface((size * 2, size), pygame.SRCALPHA)
+            pygame.draw.ellipse(self.image, settings['color'], (0, 0, size * 2, size))
+        else:
+            self.image = pygame.Surface((size, size), pygame.SRCALPHA)
+            pygame.draw.circle(self.image, settings['color'], (size // 2, size // 2), size // 2)
+        self.image_offset = (self.image.get_width() // 2, self.image.get_height() // 2)
+
+        self.glow = None
+        if name == 'fireball':
+            # Свечение вокруг огненного шара
+            glow_radius = int(size * 1.5)
+            self.glow = pygame.Surface((glow_radius * 2, glow_radius * 2), pygame.SRCALPHA)
+            pygame.draw.circle(self.glow, (*settings['color'], 128), (glow_radius, glow_radius), glow_radius)
+            self.glow_offset = glow_radius
+
+def projectile_kinds():
+    """Таблица видов снарядов: снаряды оружия игрока в порядке MAGIC_WEAPONS, затем снаряд врага"""
+    kinds = []
+    for name, settings in MAGIC_WEAPONS.items():
+        if 'projectile_speed' in settings:
+            kinds.append(ProjectileKind(len(kinds), name, FACTION_PLAYER, settings))
+    kinds.append(ProjectileKind(len(kinds), 'enemy_bolt', FACTION_ENEMY, ENEMY_PROJECTILE))
+    return kinds
+
+class ProjectileManager:
+    """Все снаряды игры в пуле массивов фиксированной ёмкости"""
+    def __init__(self, game, capacity=PROJECTILE_CAPACITY):
+        self.game = game
+        self.capacity = capacity
+        self.count = 0
+        self.dropped = 0  # Выстрелы, не поместившиеся в пул
+        self.kinds = projectile_kinds()
+        self.kind_by_name = {kind.name: kind for kind in self.kinds}
+
+        # Параметры видов, выбираемые по индексу вида
+        self.kind_speeds = np.array([kind.speed for kind in self.kinds], dtype=np.float64)
+        self.kind_ranges = np.array([kind.max_range for kind in self.kinds], dtype=np.float64)
+        self.kind_factions = np.array([kind.faction for kind in self.kinds], dtype=np.int8)
+        self.kind_radii = np.array([kind.radius for kind in self.kinds])
+
+        # Живые снаряды занимают первые count ячеек в порядке выстрелов
+        self.positions = np.zeros((capacity, 2))
+        self.previous = np.zeros((capacity, 2))  # Позиции до последнего шага для интерполяции
+        self.directions = np.zeros((capacity, 2))
+        self.distances = np.zeros(capacity)
+        self.damages = np.zeros(capacity)
+        self.kind_ids = np.zeros(capacity, dtype=np.int32)
+
+    def __len__(self):
+        return self.count
+
+    def spawn(self, name, x, y, direction, damage):
+        """Выстрел; при заполненном пуле снаряд не создаётся"""
+        index = self.count
+        if index >= self.capacity:
+            self.dropped += 1
+            return False
+        self.positions[index] = (x, y)
+        self.previous[index] = (x, y)
+        self.directions[index] = (direction[0], direction[1])
+        self.distances[index] = 0
+        self.damages[index] = damage
+        self.kind_ids[index] = self.kind_by_name[name].index
+        self.count = index + 1
+        return True
+
+    def clear(self):
+        """Удаление всех снарядов"""
+        self.count = 0
+
+    def remember_positions(self):
+        """Запоминание позиций перед шагом симуляции"""
+        self.previous[:self.count] = self.positions[:self.count]
+
+    def update(self):
+        """Шаг всех снарядов и удаление пролетевших свою дальность или попавших в стену"""
+        count = self.count
+        if not count:
+            return
+        kind_ids = self.kind_ids[:count]
+        movement = self.directions[:count] * self.kind_speeds[kind_ids][:, None]
+        starts = self.positions[:count].copy()
+        self.positions[:count] += movement
+        self.distances[:count] += np.sqrt(movement[:, 0] * movement[:, 0] + movement[:, 1] * movement[:, 1])
+
+        # Отрезок шага каждого снаряда проверяется пакетным DDA, так что стену не пролететь насквозь
+        walls = self.game.level.segments_blocked(starts, self.positions[:count])
+        for row in np.flatnonzero(walls).tolist():
+            self.game.emit_particles(self.kinds[kind_ids[row]].name, *self.positions[row].tolist())
+
+        removed = walls | (self.distances[:count] >= self.kind_ranges[kind_ids])
+        if removed.any():
+            self._remove(removed)
+
+    def _remove(self, removed):
+        """Сжатие пула по маске удаляемых снарядов с сохранением порядка выстрелов"""
+        count = self.count
+        keep = ~removed
+        alive_count = int(keep.sum())
+        for array in (self.positions, self.previous, self.directions, self.distances, self.damages, self.kind_ids):
+            array[:alive_count] = array[:count][keep]
+        self.count = alive_count
+
+    def centers(self):
+        """Целочисленные центры прямоугольников снарядов, как у Rect с дробной позицией"""
+        positions = self.positions[:self.count]
+        return np.trunc(positions + np.copysign(0.5, positions)).astype(np.int64)
+
+    def check_hits(self):
+        """Попадания снарядов игрока по врагам и снарядов врагов по игроку"""
+        count = self.count
+        if not count:
+            return
+        self.game.metrics.count('collision_checks', count)
+        factions = self.kind_factions[self.kind_ids[:count]]
+        centers = self.centers()
+        removed = np.zeros(count, dtype=bool)
+
+        player_rows = np.flatnonzero(factions == FACTION_PLAYER)
+        if len(player_rows) and self.game.enemies:
+            self._hit_enemies(player_rows, centers, removed)
+        enemy_rows = np.flatnonzero(factions == FACTION_ENEMY)
+        if len(enemy_rows) and self.game.player.alive:
+            self._hit_player(enemy_rows, centers, removed)
+
+        if removed.any():
+            self._remove(removed)
+
+    def _hit_enemies(self, rows, centers, removed):
+        game = self.game
+        grid = game.enemy_grid
+        cell_size = grid.cell_size
+        projectile_radii = self.kind_radii[self.kind_ids[rows]]
+        reach = float(projectile_radii.max()) + ENEMY_SIZE // 2
+
+        # Снаряды группируются по ячейкам сетки врагов; кандидаты - враги из ячеек в пределах reach
+        cells = centers[rows] // cell_size
+        by_cell = np.lexsort((cells[:, 1], cells[:, 0]))
+        cells = cells[by_cell]
+        starts = np.flatnonzero(np.r_[True, (cells[1:] != cells[:-1]).any(axis=1)])
+        ends = np.r_[starts[1:], len(by_cell)]
+        enemies = []
+        targets_of = {}
+        pair_rows = []
+        pair_targets = []
+        for start, end, (cell_x, cell_y) in zip(starts.tolist(), ends.tolist(), cells[starts].tolist()):
+            found = []
+            for enemy in grid.query_rect(cell_x * cell_size - reach, cell_y * cell_size - reach,
+                                         (cell_x + 1) * cell_size + reach, (cell_y + 1) * cell_size + reach):
+                if not enemy.alive:
+                    continue
+                target = targets_of.get(enemy)
+                if target is None:
+                    target = targets_of[enemy] = len(enemies)
+                    enemies.append(enemy)
+                found.append(target)
+            if found:
+                group = by_cell[start:end]
+                pair_rows.append(np.repeat(group, len(found)))
+                pair_targets.append(np.tile(np.array(found, dtype=np.intp), len(group)))
+        if not pair_rows:
+            return
+        pair_rows = np.concatenate(pair_rows)
+        pair_targets = np.concatenate(pair_targets)
+        game.metrics.count('projectile_pairs', len(pair_rows))
+
+        # Точная проверка пересечения окружностей только для пар-кандидатов
+        enemy_centers = np.array([enemy.rect.center for enemy in enemies], dtype=np.int64)
+        enemy_radii = np.array([enemy.radius for enemy in enemies], dtype=np.float64)
+        delta = centers[rows[pair_rows]] - enemy_centers[pair_targets]
+        hit_reach = projectile_radii[pair_rows] + enemy_radii[pair_targets]
+        hits = delta[:, 0] * delta[:, 0] + delta[:, 1] * delta[:, 1] <= hit_reach * hit_reach
+        if not hits.any():
+            return
+        hit_rows = rows[pair_rows[hits]]
+        hit_targets = pair_targets[hits]
+        # Порядок врагов - номер регистрации: он не зависит от порядка обхода ячеек и сохраняется в снимке
+        serials = np.array([enemy.ai_serial for enemy in enemies], dtype=np.int64)[hit_targets]
+
+        # Снаряды разбираются по видам в порядке оружия, внутри вида - в порядке выстрелов;
+        # снаряд поражает первого ещё живого врага
+        order = np.lexsort((serials, hit_rows, self.kind_ids[hit_rows]))
+        for row, target in zip(hit_rows[order].tolist(), hit_targets[order].tolist()):
+            if removed[row]:
+                continue
+            enemy = enemies[target]
+            if not enemy.alive:
+                continue
+            kind = self.kinds[self.kind_ids[row]]
+            if enemy.take_damage(float(self.damages[row])):
+                game.player.gain_xp(ENEMY_XP_REWARD)  # Начисляем опыт за убийство
+            game.emit_particles(kind.name, *centers[row].tolist())
+            removed[row] = True
+
+    def _hit_player(self, rows, centers, removed):
+        game = self.game
+        player = game.player
+        delta = centers[rows] - np.array(player.rect.center, dtype=np.int64)
+        distance_sq = delta[:, 0] ** 2 + delta[:, 1] ** 2
+        reach = self.kind_radii[self.kind_ids[rows]] + player.radius
+        for row in rows[distance_sq <= reach * reach].tolist():
+            # Неуязвимый игрок поглощает снаряд без урона
+            player.take_damage(float(self.damages[row]))
+            game.emit_particles(self.kinds[self.kind_ids[row]].name, *centers[row].tolist())
+            removed[row] = True
+
+    def positions_of(self, name):
+        """Позиции снарядов одного вида в порядке выстрелов"""
+        kind = self.kind_by_name.get(name)
+        if kind is None:
+            return self.positions[:0]
+        return self.positions[:self.count][self.kind_ids[:self.count] == kind.index]
+
+    def rows(self):
+        """Состояние снарядов построчно для снимка игры"""
+        count = self.count
+        return list(zip(self.kind_ids[:count].tolist(), self.positions[:count, 0].tolist(),
+                        self.positions[:count, 1].tolist(), self.directions[:count, 0].tolist(),
+                        self.directions[:count, 1].tolist(), self.distances[:count].tolist(),
+                        self.damages[:count].tolist()))
+
+    def restore(self, kind_ids, positions, directions, distances, damages):
+        """Замена всех снарядов сохранёнными массивами"""
+        count = min(len(kind_ids), self.capacity)
+        self.kind_ids[:count] = kind_ids[:count]
+        self.positions[:count] = positions[:count]
+        self.previous[:count] = positions[:count]
+        self.directions[:count] = directions[:count]
+        self.distances[:count] = distances[:count]
+        self.damages[:count] = damages[:count]
+        self.count = count
+
+    def draw(self, screen, camera):
+        """Отрисовка видимых снарядов общими изображениями видов одним вызовом blits; возвращает их число"""
+        count = self.count
+        if not count:
+            return 0
+        positions = self.positions[:count]
+        if camera.alpha < 1:
+            previous = self.previous[:count]
+            positions = previous + (positions - previous) * camera.alpha
+        offset = camera.render_offset
+        screen_x = np.round(positions[:, 0] - offset.x).astype(np.int32)
+        screen_y = np.round(positions[:, 1] - offset.y).astype(np.int32)
+        width, height = screen.get_size()
+        margin = PROJECTILE_DRAW_MARGIN
+        visible = np.flatnonzero((screen_x > -margin) & (screen_x < width + margin) &
+                                 (screen_y > -margin) & (screen_y < height + margin))
+        if not len(visible):
+            return 0
+        kinds = self.kinds
+        glows = []
+        sprites = []
+        for kind_id, x, y in zip(self.kind_ids[visible].tolist(), screen_x[visible].tolist(),
+                                 screen_y[visible].tolist()):
+            kind = kinds[kind_id]
+            if kind.glow is not None:
+                glows.append((kind.glow, (x - kind.glow_offset, y - kind.glow_offset)))
+            sprites.append((kind.image, (x - kind.image_offset[0], y - kind.image_offset[1])))
+        if glows:
+            screen.blits(glows, doreturn=False)
+        screen.blits(sprites, doreturn=False)
+        return len(sprites)
@@ -0,0 +1,68 @@
+import numpy as np
+
+def label_regions(mask):
+    """Метки 4-связных областей маски (width, height) и размеры областей; 0 - фон, области с 1"""
+    mask = np.asarray(mask, dtype=bool)
+    width, height = mask.shape
+    labels = np.zeros(mask.shape, dtype=np.int32)
+    if not mask.any():
+        return labels, np.zeros(1, dtype=np.int64)
+
+    # Отрезки подряд идущих клеток внутри каждого столбца x
+    padded = np.zeros((width, height + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    steps = np.diff(padded, axis=1)
+    run_x, run_start = np.nonzero(steps == 1)
+    _, run_end = np.nonzero(steps == -1)
+    run_count = len(run_x)
+
+    # Для отрезка b из столбца x + 1 перекрывающиеся отрезки столбца x образуют диапазон [lo, hi)
+    stride = height + 1
+    start_keys = run_x * stride + run_start
+    end_keys = run_x * stride + run_end
+    has_left = run_x > 0
+    right = np.nonzero(has_left)[0]
+    left_x = run_x[right] - 1
+    lo = np.searchsorted(end_keys, left_x * stride + run_start[right], side='right')
+    hi = np.searchsorted(start_keys, left_x * stride + run_end[right], side='left')
+    counts = np.maximum(hi - lo, 0)
+    edge_right = np.repeat(right, counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    edge_left = np.repeat(lo, counts) + offsets
+
+    # Объединение отрезков со сжатием путей
+    parent = list(range(run_count))
+
+    def find(item):
+        root = item
+        while parent[root] != root:
+            root = parent[root]
+        while parent[item] != root:
+            parent[item], item = root, parent[item]
+        return root
+
+    for a, b in zip(edge_left.tolist(), edge_right.tolist()):
+        root_a = find(a)
+        root_b = find(b)
+        if root_a != root_b:
+            if root_a < root_b:
+                parent[root_b] = root_a
+            else:
+                parent[root_a] = root_b
+
+    roots = np.fromiter((find(item) for item in range(run_count)), dtype=np.int64, count=run_count)
+    unique_roots, run_labels = np.unique(roots, return_inverse=True)
+    run_labels = run_labels.astype(np.int32) + 1
+    lengths = run_end - run_start
+
+    # Клетки маски в порядке C совпадают с порядком отрезков (x, затем y)
+    labels.reshape(-1)[mask.reshape(-1)] = np.repeat(run_labels, lengths)
+    sizes = np.bincount(run_labels, weights=lengths, minlength=len(unique_roots) + 1).astype(np.int64)
+    return labels, sizes
+
+def largest_region(mask):
+    """Маска самой большой 4-связной области"""
+    labels, sizes = label_regions(mask)
+    if len(sizes) <= 1:
+        return np.zeros_like(np.asarray(mask, dtype=bool))
+    return labels == int(np.argmax(sizes[1:])) + 1
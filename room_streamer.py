@@ -0,0 +1,86 @@
+import numpy as np
+from settings import *
+from level import ROOM_UNVISITED, ROOM_AWAKE, ROOM_ASLEEP
+from snapshot import build_enemies, enemy_records, restore_ai_fields
+
+class RoomStreamer:
+    """Создание врагов комнат рядом с игроком и усыпление оставленных позади комнат"""
+    def __init__(self, game):
+        self.game = game
+
+    def update(self):
+        """Пробуждение комнат рядом с игроком и усыпление дальних"""
+        level = self.game.level
+        if not level.rooms:
+            return
+        player_x, player_y = self.game.player.rect.center
+        # Расстояния до всех комнат одной векторной операцией; враги перебираются только у засыпающих комнат
+        distances = level.room_distances(player_x, player_y)
+        states = level.room_states
+
+        # Соседи комнаты игрока просыпаются заранее, даже если коридор к ним длинный
+        near = distances < ROOM_WAKE_DISTANCE
+        for index in np.flatnonzero(distances == 0).tolist():
+            near[level.rooms[index].neighbours] = True
+
+        for index in np.flatnonzero(near & (states != ROOM_AWAKE)).tolist():
+            self.wake(level.rooms[index])
+        for index in np.flatnonzero(~near & (distances > ROOM_SLEEP_DISTANCE) & (states == ROOM_AWAKE)).tolist():
+            room = level.rooms[index]
+            if not self._has_enemy_near(room, player_x, player_y):
+                self.sleep(room)
+
+        metrics = self.game.metrics
+        awake = int(np.count_nonzero(states == ROOM_AWAKE))
+        metrics.gauge('rooms.awake', awake)
+        metrics.gauge('rooms.asleep', len(states) - awake)
+
+    def _has_enemy_near(self, room, player_x, player_y):
+        """Есть ли у комнаты живой враг ближе ROOM_SLEEP_DISTANCE к игроку (например, преследующий его)"""
+        sleep_sq = ROOM_SLEEP_DISTANCE * ROOM_SLEEP_DISTANCE
+        for enemy in room.enemies:
+            if enemy.alive:
+                dx = enemy.rect.centerx - player_x
+                dy = enemy.rect.centery - player_y
+                if dx * dx + dy * dy <= sleep_sq:
+                    return True
+        return False
+
+    def wake(self, room):
+        """Создание врагов комнаты из точек появления или из записей уснувших врагов"""
+        game = self.game
+        level = game.level
+        with game.metrics.timer('rooms.wake'):
+            if level.room_states[room.index] == ROOM_UNVISITED:
+                enemies = []
+                for position in room.spawns:
+                    enemy = game.create_enemy(position)
+                    enemy.room = room.index
+                    enemies.append(enemy)
+                room.spawns = []
+            elif room.records is not None:
+                enemies = build_enemies(game, room.records)
+                for enemy in enemies:
+                    game.add_enemy(enemy)
+                # Уснувшие враги продолжают со своими фазами ИИ, а не с выданными при регистрации
+                restore_ai_fields(enemies, room.records)
+                room.records = None
+            else:
+                enemies = []
+            room.enemies = enemies
+            level.room_states[room.index] = ROOM_AWAKE
+        game.metrics.count('rooms.woken')
+
+    def sleep(self, room):
+        """Сохранение живых врагов комнаты в записи и удаление их спрайтов"""
+        game = self.game
+        level = game.level
+        with game.metrics.timer('rooms.sleep'):
+            enemies = [enemy for enemy in room.enemies if enemy.alive]
+            room.records = enemy_records(enemies)
+            for enemy in enemies:
+                enemy.kill()
+                game.enemy_grid.remove(enemy)
+            room.enemies = []
+            level.room_states[room.index] = ROOM_ASLEEP
+        game.metrics.count('rooms.slept')
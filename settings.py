@@ -2,6 +2,7 @@
 SCREEN_WIDTH = 1280
 SCREEN_HEIGHT = 720
 FPS = 60
+RENDER_FPS = 144  # Ограничение частоты отрисовки; симуляция идёт с частотой FPS
 
 # Настройки камеры
 CAMERA_SMOOTHNESS = 0.1  # Плавность движения камеры (0-1)
@@ -94,6 +95,7 @@ ENEMY_KNOCKBACK_FORCE = 8  # Сила отталкивания при атаке
 ENEMY_FLEE_HP_THRESHOLD = 0.3  # Порог здоровья для отступления (30%)
 ENEMY_WANDER_RADIUS = 100  # Радиус случайного блуждания
 ENEMY_WANDER_PAUSE = 2000  # Пауза между перемещениями при блуждании
+ENEMY_THINK_INTERVAL = 100  # Интервал пересчёта состояния ИИ в миллисекундах
 
 # Настройки игры
 TILESIZE = 64
@@ -111,6 +113,8 @@ WALL_COLOR = (100, 100, 100)  # Серый
 # Настройки карты
 MAP_WIDTH = 80  # Ширина карты в тайлах (было 50)
 MAP_HEIGHT = 60  # Высота карты в тайлах (было 50)
+LEVEL_WIDTH = 50  # Размер генерируемого уровня в тайлах
+LEVEL_HEIGHT = 50
 
 # Пример простой карты для тестирования
 TEST_MAP = [
@@ -138,6 +142,7 @@ HEALTH_BAR_OFFSET = 10
 XP_BAR_WIDTH = 200
 XP_BAR_HEIGHT = 20
 XP_BAR_OFFSET = 10
+HUD_TEXT_CACHE_SIZE = 256  # Максимум строк в кэше отрендеренного текста
 
 # Цвета
 WHITE = (255, 255, 255)
@@ -156,6 +161,16 @@ ROOM_MAX_SIZE = 12  # Максимальный размер комнаты
 ROOMS_PER_LEVEL = 8  # Количество комнат на уровень
 MIN_ROOM_DISTANCE = 2  # Минимальное расстояние между комнатами
 CORRIDOR_WIDTH = 3  # Ширина коридоров
+LEVEL_GENERATOR = 'rooms'  # Алгоритм генерации: 'rooms', 'bsp' или 'caves'
+LEVEL_CACHE_DIR = 'level_cache'  # Каталог дискового кэша сгенерированных уровней
+LEVEL_CACHE_MAX_FILES = 256  # Файлов в кэше уровней; давно не использованные удаляются
+ROOM_GRID_CELL = 16  # Размер ячейки сетки комнат на больших картах
+ROOM_GRID_FILL = 0.66  # Доля ячеек сетки, занятых комнатами
+BSP_MIN_LEAF_SIZE = ROOM_MAX_SIZE + 4  # Минимальный размер листа двоичного разбиения
+CAVE_WALL_CHANCE = 0.45  # Начальная доля стен в пещерах
+CAVE_SMOOTHING_STEPS = 4  # Шагов сглаживания клеточного автомата
+CAVE_SECTOR_SIZE = 16  # Размер сектора пещеры, используемого как комната
+CAVE_SECTOR_MIN_FLOOR = 0.3  # Минимальная доля пола в секторе
 
 # Настройки контрольных точек
 CHECKPOINT_RADIUS = 32  # Радиус активации контрольной точки
@@ -175,11 +190,108 @@ TILE_CHECKPOINT = 2
 TILE_PORTAL = 3
 TILE_SPAWN = 4
 
+# Флаги тайлов (битовое поле)
+TILE_FLAG_SOLID = 1  # Непроходимый тайл
+TILE_FLAG_OPAQUE = 2  # Перекрывает линию видимости
+TILE_FLAG_TRIGGER = 4  # Срабатывает при входе игрока
+TILE_FLAG_SPAWNABLE = 8  # Можно размещать врагов
+
+# Флаги для каждого типа тайла
+TILE_TYPE_FLAGS = {
+    TILE_FLOOR: TILE_FLAG_SPAWNABLE,
+    TILE_WALL: TILE_FLAG_SOLID | TILE_FLAG_OPAQUE,
+    TILE_CHECKPOINT: TILE_FLAG_TRIGGER,
+    TILE_PORTAL: TILE_FLAG_TRIGGER,
+    TILE_SPAWN: 0
+}
+
 # Настройки спавна врагов
 ENEMIES_PER_ROOM = (8, 15)  # Мин и макс количество врагов в комнате
 MIN_ENEMY_DISTANCE = 2  # Минимальное расстояние между врагами
 MIN_ENEMY_DISTANCE_FROM_PLAYER = 10  # Минимальное начальное расстояние от игрока
 
+# Настройки пространственной сетки
+SPATIAL_HASH_CELL_SIZE = TILESIZE  # Размер ячейки сетки поиска соседей в пикселях
+
+# Настройки группового поведения (режим толпы)
+CROWD_NEIGHBOR_RADIUS = MIN_ENEMY_DISTANCE * 3  # Радиус поиска соседей для стаи
+CROWD_STEERING = True  # Пакетный расчёт стаи на NumPy
+CROWD_STEERING_MIN_ENEMIES = 64  # С какого числа врагов включается режим толпы
+
+# Настройки кэша отрисовки уровня
+LEVEL_CHUNK_SIZE = 16  # Размер чанка в тайлах
+LEVEL_CHUNK_CACHE_LIMIT = 16  # Максимум запечённых чанков в памяти
+
+# Настройки поиска пути
+FLOW_FIELD_RADIUS = 16  # Радиус поля направлений вокруг игрока (в тайлах)
+
+# Настройки лучей видимости
+RAYCAST_BATCH_MIN = 24  # С этого числа отрезков пакетный DDA быстрее проверки по одному
+
+# Настройки планировщика ИИ
+AI_UPDATE_BUDGET = 256  # Обновлений врагов за шаг; остальные переносятся на следующий шаг
+AI_LOD_FULL_RADIUS = TILESIZE * 12  # Ближе этого враги обновляются каждый шаг
+AI_LOD_REDUCED_RADIUS = TILESIZE * 24  # Ближе этого - раз в AI_LOD_REDUCED_INTERVAL шагов, дальше спят
+AI_LOD_REDUCED_INTERVAL = 3  # Шагов между обновлениями дальних врагов
+AI_PHASES = 6  # Фаз, по которым разнесены обдумывание и редкие обновления врагов
+AI_MAX_CATCHUP_STEPS = 4  # Предел удлинения шага движения после пропущенных обновлений
+
+# Настройки пробуждения комнат
+ROOM_WAKE_DISTANCE = AI_LOD_REDUCED_RADIUS + TILESIZE * 2  # Враги комнаты создаются, когда игрок ближе к ней
+ROOM_SLEEP_DISTANCE = ROOM_WAKE_DISTANCE + TILESIZE * 6  # Дальше комната засыпает (с запасом против дребезга)
+
+# Настройки фиксированного шага симуляции
+SIMULATION_STEP = 1000 / FPS  # Длительность шага симуляции в миллисекундах
+MAX_SIMULATION_STEPS = 5  # Максимум шагов догонения за один кадр отрисовки
+MAX_FRAME_TIME = 250  # Ограничение времени кадра в миллисекундах (после паузы, перетаскивания окна)
+INTERPOLATION_MAX_JUMP = TILESIZE * 2  # Смещение за шаг, при котором спрайт не интерполируется (телепорт)
+# Запас кадра при поиске видимых врагов и эффектов: сетка знает позиции после шага, а рисуются
+# интерполированные, плюс размер спрайта и ответвления молний
+DRAW_CULL_MARGIN = INTERPOLATION_MAX_JUMP
+
+# Настройки метрик кадра
+METRICS_WINDOW = 300  # Кадров в скользящем окне перцентилей
+METRICS_QUEUE_SIZE = 1024  # Максимум кадров в очереди фоновой записи
+METRICS_OVERLAY_INTERVAL = 250  # Период обновления текста оверлея в миллисекундах
+METRICS_OVERLAY_FONT_SIZE = 20
+METRICS_OVERLAY_BG = (0, 0, 0, 160)
+
+# Настройки трассировки провалов кадра
+TRACE_DIR = 'traces'  # Каталог трасс и профилей
+TRACE_BUFFER_SIZE = 20000  # Событий в кольцевом буфере (несколько сотен кадров)
+TRACE_HITCH_MS = 33  # Кадр дольше этого порога считается провалом
+TRACE_POST_FRAMES = 30  # Кадров после провала, попадающих в трассу
+TRACE_DUMP_COOLDOWN = 5000  # Минимальный интервал между сбросами трасс в миллисекундах
+TRACE_MAX_DUMPS = 20  # Максимум трасс за один запуск
+
+# Настройки сохранений
+AUTOSAVE_PATH = 'saves/autosave.snap'  # Автосохранение при активации контрольной точки
+AUTOSAVE_QUEUE_SIZE = 4  # Снимков в очереди записи; старые снимки вытесняются новыми
+
+# Настройки записи ввода
+INPUT_RECORD_FLUSH = 60  # Шагов между сбросами записи ввода на диск
+
+# Настройки снарядов
+PROJECTILE_CAPACITY = 4096  # Снарядов в общем пуле; сверх ёмкости выстрел не создаётся
+PROJECTILE_DRAW_MARGIN = 32  # Запас за краем экрана при отсечении снарядов (с учётом свечения)
+ENEMY_PROJECTILE = {  # Снаряд стрелков
+    'projectile_speed': 6,
+    'color': (255, 60, 60),
+    'size': 10,
+    'range': 300
+}
+
+# Настройки частиц
+PARTICLE_CAPACITY = 4096  # Частиц в общем пуле эффектов; лишние отбрасываются
+PARTICLE_FADE_STEPS = 16  # Заранее отрисованных ступеней прозрачности на вид частиц
+PARTICLE_MAX_RADIUS = 4  # Запас за краем экрана при отсечении частиц
+PORTAL_PARTICLE_CAPACITY = 64  # Частиц портала одновременно (рождается не больше одной за шаг)
+HIT_PARTICLES = 6  # Частиц при попадании по врагу
+HIT_PARTICLE_COLOR = (220, 40, 40)
+DEATH_PARTICLES = 24  # Частиц при смерти врага
+DEATH_PARTICLE_COLOR = (140, 0, 0)
+SPELL_PARTICLES = 10  # Частиц при попадании снаряда и применении заклинания
+
 # Настройки сложности
 DIFFICULTY_SCALING = 1.5  # Множитель сложности для каждого следующего уровня 
 
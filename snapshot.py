@@ -0,0 +1,608 @@
+import gc
+import logging
+import operator
+import os
+import queue
+import struct
+import threading
+import numpy as np
+import pygame
+from settings import *
+from crowd import STATE_CODES
+from enemy import MeleeEnemy, RangedEnemy, TankEnemy
+from level import Level, ROOM_ASLEEP
+from level_format import LevelLayout
+from weapons import LightningEffect, HealEffect
+
+logger = logging.getLogger(__name__)
+
+# Двоичный формат снимка игры (little-endian):
+#   заголовок SNAPSHOT_HEADER, затем секции с выравниванием по 8 байт в порядке
+#   мир, генераторы случайных чисел, зёрна уровней, игрок, оружие, враги, снаряды, эффекты,
+#   комнаты, коридоры между комнатами, точки появления врагов непосещённых комнат, тайлы
+SNAPSHOT_MAGIC = b'RSNP'
+SNAPSHOT_VERSION = 5
+SNAPSHOT_HEADER = struct.Struct('<4sHH16sQIIIIIIIIII')
+SNAPSHOT_ALIGN = 8
+
+# Типы сущностей хранятся индексами в этих таблицах
+ENEMY_TYPES = (MeleeEnemy, RangedEnemy, TankEnemy)
+EFFECT_TYPES = (LightningEffect, HealEffect)
+STATE_NAMES = {code: name for name, code in STATE_CODES.items()}
+MAX_PATROL_POINTS = 4
+MAX_EFFECT_POINTS = 4  # Первая точка и три прыжка молнии
+MAX_EFFECT_BRANCHES = 3
+
+WORLD_DTYPE = np.dtype([
+    ('clock_time', '<f8'), ('current_level', '<i4'), ('score', '<i8'),
+    ('level_seed', '<u8'), ('spawn', '<i4', 2), ('portal', '<i4', 2), ('active_checkpoint', '<i4', 2),
+    ('player_order', '<i4'), ('camera_offset', '<f8', 2), ('camera_offset_float', '<f8', 2),
+    ('camera_previous_offset', '<f8', 2),
+    # Состояние PCG64 генератора толпы: 128-битные state и inc по двум половинам
+    ('crowd_state', '<u8', 2), ('crowd_inc', '<u8', 2), ('crowd_has_uint32', '<i4'), ('crowd_uinteger', '<u4'),
+    ('ai_step', '<i8'), ('ai_serial', '<i8'),
+])
+
+RNG_DTYPE = np.dtype([('state', '<u4', 625), ('gauss_next', '<f8'), ('has_gauss', '?')])
+
+PLAYER_DTYPE = np.dtype([
+    ('position', '<f8', 2), ('spawn_position', '<f8', 2), ('velocity', '<f8', 2), ('knockback', '<f8', 2),
+    ('hp', '<f8'), ('max_hp', '<f8'), ('level', '<i4'), ('xp', '<i8'), ('xp_to_next_level', '<i8'),
+    ('current_mana', '<f8'), ('max_mana', '<f8'), ('last_mana_regen', '<i8'), ('current_weapon', '<i4'),
+    ('alive', '?'), ('is_invulnerable', '?'), ('is_attacking', '?'), ('is_dashing', '?'),
+    ('death_time', '<i8'), ('respawn_delay', '<i8'), ('invulnerable_time', '<i8'), ('invulnerable_duration', '<i8'),
+    ('last_attack_time', '<i8'), ('attack_direction', '<f8', 2), ('attack_start_angle', '<f8'),
+    ('attack_progress', '<f8'), ('dash_direction', '<f8', 2), ('dash_start_time', '<i8'), ('last_dash_time', '<i8'),
+])
+
+ENEMY_DTYPE = np.dtype([
+    ('kind', 'u1'), ('state', 'i1'), ('is_hit', '?'), ('has_wander_target', '?'), ('has_cached_direction', '?'),
+    ('patrol_count', 'u1'), ('current_patrol_index', '<u2'),
+    ('position', '<f8', 2), ('spawn_position', '<f8', 2), ('velocity', '<f8', 2), ('knockback', '<f8', 2),
+    ('current_hp', '<f8'), ('max_hp', '<f8'), ('hit_time', '<i8'), ('last_attack_time', '<i8'),
+    ('wander_target', '<f8', 2), ('wander_pause_time', '<i8'), ('last_state_update', '<i8'),
+    ('last_pathfinding_time', '<i8'), ('cached_direction', '<f8', 2), ('direction_cache_time', '<i8'),
+    ('stun_duration', '<i8'), ('patrol_points', '<f8', (MAX_PATROL_POINTS, 2)),
+    # Фаза планировщика ИИ, место в очереди перенесённых обновлений (-1 - нет), шаг последнего обновления
+    # и номер регистрации, задающий порядок обновления
+    ('ai_phase', 'u1'), ('ai_pending', '<i4'), ('ai_last_step', '<i8'), ('ai_serial', '<i8'),
+    # Комната врага (-1 - вне комнат); спящие враги хранятся записями своей комнаты
+    ('room', '<i4'), ('asleep', '?'),
+])
+
+ROOM_DTYPE = np.dtype([('rect', '<i4', 4), ('state', 'u1')])
+
+SPAWN_DTYPE = np.dtype([('room', '<i4'), ('position', '<f8', 2)])
+
+PROJECTILE_DTYPE = np.dtype([
+    ('kind', '<i4'), ('position', '<f8', 2), ('direction', '<f8', 2), ('distance_traveled', '<f8'),
+    ('damage', '<f8'),
+])
+
+EFFECT_DTYPE = np.dtype([
+    ('kind', 'u1'), ('point_count', 'u1'), ('alpha', '<i4'), ('alpha_direction', '<i4'),
+    ('creation_time', '<i8'), ('last_update', '<i8'), ('points', '<f8', (MAX_EFFECT_POINTS, 2)),
+    ('branch_offsets', '<i4', (MAX_EFFECT_POINTS - 1, MAX_EFFECT_BRANCHES, 2)),
+])
+
+def _number(value):
+    """Целое значение остаётся целым, чтобы интерфейс выводил его как раньше"""
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+def _vector(value):
+    return pygame.math.Vector2(float(value[0]), float(value[1]))
+
+class GameSnapshot:
+    """Снимок симуляционного состояния игры: плотные массивы NumPy или строки до упаковки"""
+    __slots__ = ('seed', 'generator', 'width', 'height', 'world', 'rngs', 'level_seeds', 'player',
+                 'weapons', 'enemies', 'projectiles', 'effects', 'rooms', 'connections', 'spawns', 'tiles')
+
+    def __init__(self, seed, generator, width, height, world, rngs, level_seeds, player, weapons,
+                 enemies, projectiles, effects, rooms, connections, spawns, tiles):
+        self.seed = seed
+        self.generator = generator
+        self.width = width
+        self.height = height
+        self.world = world
+        self.rngs = rngs  # rng, fx_rng, level_rng игры
+        self.level_seeds = level_seeds
+        self.player = player
+        self.weapons = weapons  # Время последнего применения каждого оружия игрока
+        self.enemies = enemies  # Поля бодрствующих врагов, очередь ИИ и массивы записей спящих комнат
+        self.projectiles = projectiles
+        self.effects = effects
+        self.rooms = rooms
+        self.connections = connections
+        self.spawns = spawns
+        self.tiles = tiles
+
+    def materialize(self):
+        """Перевод строк, скопированных в потоке игры, в структурные массивы"""
+        if isinstance(self.world, tuple):
+            self.world = _records([self.world], WORLD_DTYPE)[0]
+            self.rngs = _records(self.rngs, RNG_DTYPE)
+            self.level_seeds = np.array(self.level_seeds, dtype='<u4')
+            self.player = _records([self.player], PLAYER_DTYPE)[0]
+            self.weapons = np.array(self.weapons, dtype='<i8')
+            enemies, fields, pending, sleeping = self.enemies
+            self.enemies = np.concatenate([_records(_enemy_rows(enemies, fields, pending), ENEMY_DTYPE), *sleeping])
+            self.projectiles = _records(self.projectiles, PROJECTILE_DTYPE)
+            self.effects = _records(self.effects, EFFECT_DTYPE)
+            self.rooms = _records(self.rooms, ROOM_DTYPE)
+            self.connections = np.array(self.connections, dtype='<i4').reshape(-1, 2)
+            self.spawns = _records(self.spawns, SPAWN_DTYPE)
+        return self
+
+    def sections(self):
+        """Секции снимка в порядке записи"""
+        self.materialize()
+        return (self.world, self.rngs, self.level_seeds, self.player, self.weapons,
+                self.enemies, self.projectiles, self.effects, self.rooms, self.connections, self.spawns,
+                self.tiles)
+
+    def to_bytes(self):
+        """Упаковка снимка в двоичный формат"""
+        sections = self.sections()
+        header = SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, SNAPSHOT_HEADER.size, self.generator.encode()[:16],
+            self.seed, self.width, self.height, len(self.level_seeds), len(self.weapons),
+            len(self.enemies), len(self.projectiles), len(self.effects), len(self.rooms),
+            len(self.connections), len(self.spawns)
+        )
+        parts = [header]
+        size = len(header)
+        for section in sections:
+            padding = -size % SNAPSHOT_ALIGN
+            if padding:
+                parts.append(b'\0' * padding)
+            data = np.ascontiguousarray(section).tobytes()
+            parts.append(data)
+            size += padding + len(data)
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data, source='<bytes>'):
+        """Разбор двоичного снимка; массивы ссылаются на переданный буфер без копирования"""
+        if len(data) < SNAPSHOT_HEADER.size:
+            raise ValueError(f"{source}: файл короче заголовка")
+        (magic, version, header_size, generator, seed, width, height, seed_count, weapon_count,
+         enemy_count, projectile_count, effect_count, room_count, connection_count,
+         spawn_count) = SNAPSHOT_HEADER.unpack_from(data, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{source}: не снимок игры")
+        if version != SNAPSHOT_VERSION or header_size != SNAPSHOT_HEADER.size:
+            raise ValueError(f"{source}: версия формата {version}, ожидается {SNAPSHOT_VERSION}")
+
+        layout = ((WORLD_DTYPE, 1), (RNG_DTYPE, 3), (np.dtype('<u4'), seed_count), (PLAYER_DTYPE, 1),
+                  (np.dtype('<i8'), weapon_count), (ENEMY_DTYPE, enemy_count),
+                  (PROJECTILE_DTYPE, projectile_count), (EFFECT_DTYPE, effect_count),
+                  (ROOM_DTYPE, room_count), (np.dtype('<i4'), connection_count * 2), (SPAWN_DTYPE, spawn_count),
+                  (np.dtype(np.uint8), width * height))
+        sections = []
+        offset = SNAPSHOT_HEADER.size
+        for dtype, count in layout:
+            offset += -offset % SNAPSHOT_ALIGN
+            if offset + dtype.itemsize * count > len(data):
+                raise ValueError(f"{source}: файл обрезан")
+            sections.append(np.frombuffer(data, dtype=dtype, count=count, offset=offset))
+            offset += dtype.itemsize * count
+        (world, rngs, level_seeds, player, weapons, enemies, projectiles, effects, rooms, connections, spawns,
+         tiles) = sections
+        return cls(seed, generator.rstrip(b'\0').decode(), width, height, world[0], rngs, level_seeds,
+                   player[0], weapons, enemies, projectiles, effects, rooms, connections.reshape(-1, 2), spawns,
+                   tiles.reshape(width, height))
+
+def _flat_dtype(dtype):
+    """Плоский двойник структурного типа: подмассивы развёрнуты в скалярные поля с теми же смещениями"""
+    names, formats, offsets = [], [], []
+    for name in dtype.names:
+        field, offset = dtype.fields[name][:2]
+        for index in range(int(np.prod(field.shape))):
+            names.append(f'{name}_{index}' if field.shape else name)
+            formats.append(field.base)
+            offsets.append(offset + index * field.base.itemsize)
+    return np.dtype({'names': names, 'formats': formats, 'offsets': offsets, 'itemsize': dtype.itemsize})
+
+# Строки снимка - плоские кортежи скаляров: в потоке игры копируются только числа Python,
+# а в массив с вложенными полями они переводятся при упаковке через плоский двойник типа
+ROW_DTYPES = {dtype: _flat_dtype(dtype)
+              for dtype in (WORLD_DTYPE, RNG_DTYPE, PLAYER_DTYPE, ENEMY_DTYPE, PROJECTILE_DTYPE, EFFECT_DTYPE,
+                            ROOM_DTYPE, SPAWN_DTYPE)}
+
+def _records(rows, dtype):
+    """Структурный массив из плоских кортежей"""
+    return np.array(rows, dtype=ROW_DTYPES[dtype]).view(dtype)
+
+def _rng_row(rng):
+    _, state, gauss_next = rng.getstate()
+    return state + (gauss_next if gauss_next is not None else 0.0, gauss_next is not None)
+
+def _unpack_rng(record, rng):
+    gauss_next = float(record['gauss_next']) if record['has_gauss'] else None
+    rng.setstate((3, tuple(record['state'].tolist()), gauss_next))
+
+def _split_128(value):
+    return (value & 0xFFFFFFFFFFFFFFFF, value >> 64)
+
+def _join_128(pair):
+    return int(pair[0]) | (int(pair[1]) << 64)
+
+def _columns(records):
+    """Поля структурного массива как списки Python: одно преобразование на поле вместо доступа к каждой записи"""
+    return {name: records[name].tolist() for name in records.dtype.names}
+
+# Все поля врага читаются одним вызовом attrgetter, а строка собирается позже, при упаковке.
+# Изменяемые на месте векторы читаются покомпонентно; цель блуждания, кэш направления и список
+# точек патруля игра только переприсваивает, поэтому в снимке достаточно ссылок на них
+_ENEMY_FIELDS = operator.attrgetter(
+    '__class__', 'state', 'is_hit', 'current_patrol_index', 'position.x', 'position.y', 'spawn_position',
+    'velocity.x', 'velocity.y', 'knockback.x', 'knockback.y', 'current_hp', 'max_hp', 'hit_time',
+    'last_attack_time', 'wander_target', 'wander_pause_time', 'last_state_update', 'last_pathfinding_time',
+    'cached_direction', 'direction_cache_time', 'stun_duration', 'patrol_points', 'ai_phase', 'ai_last_step',
+    'ai_serial', 'room')
+_NO_PATROL = (0.0,) * (MAX_PATROL_POINTS * 2)
+
+def _enemy_row(fields, kinds, pending):
+    """Плоский кортеж полей врага из _ENEMY_FIELDS в порядке ENEMY_DTYPE"""
+    (cls, state, is_hit, current_patrol_index, position_x, position_y, spawn_position,
+     velocity_x, velocity_y, knockback_x, knockback_y, current_hp, max_hp, hit_time,
+     last_attack_time, wander_target, wander_pause_time, last_state_update, last_pathfinding_time,
+     cached_direction, direction_cache_time, stun_duration, patrol_points, ai_phase, ai_last_step,
+     ai_serial, room) = fields
+    if patrol_points:
+        patrol_points = patrol_points[:MAX_PATROL_POINTS]
+        patrol = tuple(coordinate for point in patrol_points for coordinate in (point[0], point[1]))
+        patrol += _NO_PATROL[len(patrol):]
+    else:
+        patrol = _NO_PATROL
+    return (
+        kinds[cls], STATE_CODES.get(state, 0), is_hit,
+        wander_target is not None, cached_direction is not None, len(patrol_points), current_patrol_index,
+        position_x, position_y, *spawn_position, velocity_x, velocity_y, knockback_x, knockback_y,
+        current_hp, max_hp, hit_time, last_attack_time,
+        *((wander_target.x, wander_target.y) if wander_target is not None else (0.0, 0.0)),
+        wander_pause_time, last_state_update, last_pathfinding_time,
+        *((cached_direction.x, cached_direction.y) if cached_direction is not None else (0.0, 0.0)),
+        direction_cache_time, stun_duration, *patrol,
+        ai_phase, pending, ai_last_step, ai_serial, room, False,
+    )
+
+def _enemy_rows(enemies, fields, pending):
+    """Плоские кортежи бодрствующих врагов с местами в очереди перенесённых обновлений"""
+    kinds = {cls: index for index, cls in enumerate(ENEMY_TYPES)}
+    pending = {enemy: index for index, enemy in enumerate(pending)}
+    return [_enemy_row(row, kinds, pending.get(enemy, -1)) for enemy, row in zip(enemies, fields)]
+
+def enemy_records(enemies):
+    """Записи засыпающих врагов в структурном массиве ENEMY_DTYPE"""
+    records = _records(_enemy_rows(enemies, map(_ENEMY_FIELDS, enemies), ()), ENEMY_DTYPE)
+    records['asleep'] = True
+    return records
+
+def build_enemies(game, records):
+    """Враги из записей в их порядке; в группы игры они не добавляются"""
+    enemies = _columns(records)
+    Vector2 = pygame.math.Vector2
+    rows = zip(enemies['kind'], enemies['state'], enemies['is_hit'], enemies['position'],
+               enemies['spawn_position'], enemies['velocity'], enemies['knockback'],
+               enemies['current_hp'], enemies['max_hp'], enemies['hit_time'], enemies['last_attack_time'],
+               enemies['wander_pause_time'], enemies['last_state_update'], enemies['last_pathfinding_time'],
+               enemies['direction_cache_time'], enemies['stun_duration'], enemies['room'])
+    built = []
+    for index, (kind, state, is_hit, position, spawn_position, velocity, knockback, current_hp, max_hp,
+                hit_time, last_attack_time, wander_pause_time, last_state_update, last_pathfinding_time,
+                direction_cache_time, stun_duration, room) in enumerate(rows):
+        enemy = ENEMY_TYPES[kind](spawn_position[0], spawn_position[1], game)
+        enemy.state = STATE_NAMES.get(state, 'wander')
+        enemy.is_hit = is_hit
+        enemy.position = Vector2(position)
+        enemy.rect.center = position
+        enemy.velocity = Vector2(velocity)
+        enemy.knockback = Vector2(knockback)
+        enemy.current_hp = int(current_hp) if current_hp.is_integer() else current_hp
+        enemy.max_hp = int(max_hp) if max_hp.is_integer() else max_hp
+        enemy.hit_time = hit_time
+        enemy.last_attack_time = last_attack_time
+        enemy.wander_pause_time = wander_pause_time
+        enemy.last_state_update = last_state_update
+        enemy.last_pathfinding_time = last_pathfinding_time
+        enemy.direction_cache_time = direction_cache_time
+        enemy.stun_duration = stun_duration
+        enemy.room = room
+        if enemies['has_wander_target'][index]:
+            enemy.wander_target = Vector2(enemies['wander_target'][index])
+        if enemies['has_cached_direction'][index]:
+            enemy.cached_direction = Vector2(enemies['cached_direction'][index])
+        patrol_count = enemies['patrol_count'][index]
+        if patrol_count:
+            enemy.patrol_points = [Vector2(point) for point in enemies['patrol_points'][index][:patrol_count]]
+            enemy.current_patrol_index = enemies['current_patrol_index'][index]
+        built.append(enemy)
+    return built
+
+def restore_ai_fields(enemies, records):
+    """Возврат сохранённых полей планировщика ИИ врагам, которым регистрация раздала новые"""
+    for enemy, serial, phase, last_step, last_state_update in zip(
+            enemies, records['ai_serial'].tolist(), records['ai_phase'].tolist(), records['ai_last_step'].tolist(),
+            records['last_state_update'].tolist()):
+        enemy.ai_serial = serial
+        enemy.ai_phase = phase
+        enemy.ai_last_step = last_step
+        enemy.last_state_update = last_state_update
+
+def _effect_row(effect):
+    """Плоский кортеж полей визуального эффекта в порядке EFFECT_DTYPE"""
+    points = [0.0] * (MAX_EFFECT_POINTS * 2)
+    branches = [0] * ((MAX_EFFECT_POINTS - 1) * MAX_EFFECT_BRANCHES * 2)
+    if isinstance(effect, LightningEffect):
+        chain = effect.chain_points[:MAX_EFFECT_POINTS]
+        for index, point in enumerate(chain):
+            points[index * 2:index * 2 + 2] = (point.x, point.y)
+        for segment_index, segment in enumerate(effect.branch_offsets[:MAX_EFFECT_POINTS - 1]):
+            for branch_index, offset in enumerate(segment[:MAX_EFFECT_BRANCHES]):
+                start = (segment_index * MAX_EFFECT_BRANCHES + branch_index) * 2
+                branches[start:start + 2] = offset
+        return (0, len(chain), effect.alpha, effect.alpha_direction, effect.creation_time, effect.last_update,
+                *points, *branches)
+    points[0:2] = effect.center_pos
+    return (1, 1, 0, 0, effect.creation_time, effect.creation_time, *points, *branches)
+
+def capture_snapshot(game):
+    """Копия состояния игры в потоке игры; массивы строятся позже, в фоновом потоке"""
+    level = game.level
+    player = game.player
+    camera = game.camera
+    tile_size = level.tile_size
+
+    crowd_state = game.crowd.rng.bit_generator.state
+    world = (
+        game.clock.time, game.current_level, game.score, level.seed,
+        int(level.player_pos[0] // tile_size), int(level.player_pos[1] // tile_size),
+        int(level.portal_pos[0] // tile_size), int(level.portal_pos[1] // tile_size),
+        *(level.active_checkpoint_tile or (-1, -1)),
+        # Место игрока среди спрайтов задаёт порядок обновления относительно врагов
+        game.all_sprites.sprites().index(player),
+        camera.offset.x, camera.offset.y, camera.offset_float.x, camera.offset_float.y,
+        camera.previous_offset.x, camera.previous_offset.y,
+        *_split_128(crowd_state['state']['state']), *_split_128(crowd_state['state']['inc']),
+        crowd_state['has_uint32'], crowd_state['uinteger'],
+        game.ai.step, game.ai.serial,
+    )
+
+    player_row = (
+        player.position.x, player.position.y, player.spawn_position[0], player.spawn_position[1],
+        player.velocity_x, player.velocity_y, player.knockback.x, player.knockback.y,
+        player.hp, player.max_hp, player.level, player.xp, player.xp_to_next_level,
+        player.current_mana, player.max_mana, player.last_mana_regen,
+        list(player.weapons).index(player.current_weapon),
+        player.alive, player.is_invulnerable, player.is_attacking, player.is_dashing,
+        player.death_time, player.respawn_delay, player.invulnerable_time, player.invulnerable_duration,
+        player.last_attack_time, player.attack_direction.x, player.attack_direction.y,
+        player.attack_start_angle, player.attack_progress, player.dash_direction.x, player.dash_direction.y,
+        player.dash_start_time, player.last_dash_time,
+    )
+
+    enemies = game.enemies.sprites()
+    # Записи спящих комнат не изменяются после засыпания, поэтому попадают в снимок без копирования
+    sleeping = [room.records for room in level.rooms if room.records is not None]
+    return GameSnapshot(
+        game.seed, level.generator, level.width, level.height, world,
+        [_rng_row(rng) for rng in (game.rng, game.fx_rng, game.level_rng)],
+        list(game.level_seeds), player_row,
+        [weapon.last_cast_time for weapon in player.weapons.values()],
+        (enemies, list(map(_ENEMY_FIELDS, enemies)), list(game.ai.pending), sleeping),
+        game.projectiles.rows(),
+        [_effect_row(effect) for effect in game.effects if isinstance(effect, EFFECT_TYPES)],
+        [(room.x, room.y, room.width, room.height, state)
+         for room, state in zip(level.rooms, level.room_states.tolist())],
+        [(room.index, neighbour) for room in level.rooms for neighbour in room.neighbours if room.index < neighbour],
+        [(room.index, x, y) for room in level.rooms for x, y in room.spawns],
+        level.tiles.copy()
+    )
+
+def restore_snapshot(game, snapshot):
+    """Перенос снимка в работающую игру: уровень, игрок, враги, снаряды, эффекты и генераторы"""
+    snapshot.materialize()
+    # Тысячи новых объектов подряд запускают сборщик циклов десятки раз; на время восстановления он выключен
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        _restore(game, snapshot)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+def _restore(game, snapshot):
+    world = snapshot.world
+    player = game.player
+
+    # Убираем сущности текущего уровня
+    for enemy in game.enemies:
+        enemy.kill()
+    game.enemy_grid.clear()
+    game.ai.clear()
+    game.effects.empty()
+    game.particles.clear()  # Частицы чисто визуальные и в снимок не входят
+    game.projectiles.clear()
+    game.all_sprites.remove(player, game.crosshair)
+
+    # Уровень строится из сохранённых тайлов без генерации
+    game.level_seeds = [int(seed) for seed in snapshot.level_seeds]
+    game.current_level = int(world['current_level'])
+    game.score = _number(world['score'])
+    layout = LevelLayout(snapshot.generator, snapshot.width, snapshot.height, game.current_level,
+                         int(world['level_seed']), np.array(snapshot.tiles), tuple(world['spawn'].tolist()),
+                         [], tuple(world['portal'].tolist()),
+                         rooms=[tuple(rect) for rect in snapshot.rooms['rect'].tolist()],
+                         connections=[tuple(pair) for pair in snapshot.connections.tolist()])
+    game.level = Level(game, game.current_level, layout)
+    game.level.generator = snapshot.generator
+    checkpoint_tile = tuple(world['active_checkpoint'].tolist())
+    for checkpoint in game.level.checkpoints:
+        if (int(checkpoint.x // TILESIZE), int(checkpoint.y // TILESIZE)) == checkpoint_tile:
+            game.level.set_active_checkpoint(checkpoint)
+            break
+
+    # Игрок
+    record = snapshot.player
+    player.position = _vector(record['position'])
+    player.rect.center = player.position
+    player.spawn_position = _vector(record['spawn_position'])
+    player.velocity_x, player.velocity_y = (_number(value) for value in record['velocity'])
+    player.knockback = _vector(record['knockback'])
+    for name in ('hp', 'max_hp', 'level', 'xp', 'xp_to_next_level', 'current_mana', 'max_mana',
+                 'last_mana_regen', 'death_time', 'respawn_delay', 'invulnerable_time', 'invulnerable_duration',
+                 'last_attack_time', 'attack_start_angle', 'attack_progress', 'dash_start_time', 'last_dash_time'):
+        setattr(player, name, _number(record[name]))
+    for name in ('alive', 'is_invulnerable', 'is_attacking', 'is_dashing'):
+        setattr(player, name, bool(record[name]))
+    weapons = list(player.weapons.values())
+    player.current_weapon = list(player.weapons)[int(record['current_weapon'])]
+    player.attack_direction = _vector(record['attack_direction'])
+    player.dash_direction = _vector(record['dash_direction'])
+    player.attack_trail = []
+    for weapon, last_cast_time in zip(weapons, snapshot.weapons.tolist()):
+        weapon.last_cast_time = last_cast_time
+
+    # Враги в исходном порядке обновления; игрок с прицелом встают на своё место среди них
+    player_order = int(world['player_order'])
+    records = snapshot.enemies
+    awake = records[~records['asleep']]
+    enemies = build_enemies(game, awake)
+    for index, enemy in enumerate(enemies):
+        if index == player_order:
+            game.all_sprites.add(player, game.crosshair)
+        game.add_enemy(enemy)
+    if player_order >= len(enemies):
+        game.all_sprites.add(player, game.crosshair)
+
+    # Планировщик ИИ: регистрация врагов выше раздала новые фазы, возвращаем сохранённые
+    game.ai.step = int(world['ai_step'])
+    game.ai.serial = int(world['ai_serial'])
+    restore_ai_fields(enemies, awake)
+    pending = [(pending_index, enemy) for enemy, pending_index in zip(enemies, awake['ai_pending'].tolist())
+               if pending_index >= 0]
+    game.ai.pending = [enemy for _, enemy in sorted(pending, key=lambda item: item[0])]
+
+    # Комнаты: состояние, созданные враги, записи спящих и точки появления непосещённых
+    level = game.level
+    level.room_states[:] = snapshot.rooms['state']
+    for enemy in enemies:
+        if 0 <= enemy.room < len(level.rooms):
+            level.rooms[enemy.room].enemies.append(enemy)
+    sleeping = records[records['asleep']]
+    for room in level.rooms:
+        if level.room_states[room.index] == ROOM_ASLEEP:
+            room.records = sleeping[sleeping['room'] == room.index].copy()
+    for room, x, y in zip(snapshot.spawns['room'].tolist(), snapshot.spawns['position'][:, 0].tolist(),
+                          snapshot.spawns['position'][:, 1].tolist()):
+        level.rooms[room].spawns.append((_number(x), _number(y)))
+
+    # Снаряды и эффекты
+    projectiles = snapshot.projectiles
+    game.projectiles.restore(projectiles['kind'], projectiles['position'], projectiles['direction'],
+                             projectiles['distance_traveled'], projectiles['damage'])
+    lightning = player.weapons['lightning_bolt'].settings
+    heal = player.weapons['heal'].settings
+    effects = _columns(snapshot.effects)
+    for index, kind in enumerate(effects['kind']):
+        points = effects['points'][index][:effects['point_count'][index]]
+        if kind == 0:
+            effect = LightningEffect([pygame.math.Vector2(point) for point in points],
+                                     lightning, game.clock, game.fx_rng)
+            effect.alpha = effects['alpha'][index]
+            effect.alpha_direction = effects['alpha_direction'][index]
+            effect.last_update = effects['last_update'][index]
+            effect.branch_offsets = [[tuple(offset) for offset in segment]
+                                     for segment in effects['branch_offsets'][index][:len(points) - 1]]
+        else:
+            effect = HealEffect(tuple(points[0]), heal, game.clock)
+        effect.creation_time = effects['creation_time'][index]
+        game.effects.add(effect)
+
+    # Камера и часы
+    camera = game.camera
+    camera.reset()
+    camera.offset = _vector(world['camera_offset'])
+    camera.offset_float = _vector(world['camera_offset_float'])
+    camera.previous_offset = _vector(world['camera_previous_offset'])
+    camera.render_offset = pygame.math.Vector2(camera.offset)
+    game.clock.time = float(world['clock_time'])
+    game.previous_positions = {}
+
+    # Генераторы восстанавливаются последними: создание эффектов выше тратит случайные числа
+    for record, rng in zip(snapshot.rngs, (game.rng, game.fx_rng, game.level_rng)):
+        _unpack_rng(record, rng)
+    game.crowd.rng.bit_generator.state = {
+        'bit_generator': 'PCG64',
+        'state': {'state': _join_128(world['crowd_state']), 'inc': _join_128(world['crowd_inc'])},
+        'has_uint32': int(world['crowd_has_uint32']),
+        'uinteger': int(world['crowd_uinteger']),
+    }
+
+def save_snapshot(path, snapshot):
+    """Запись снимка; файл подменяется атомарно"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(snapshot.to_bytes())
+    os.replace(temp_path, path)
+
+def load_snapshot(path):
+    """Чтение снимка одним вызовом read и разбор без копирования массивов"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return GameSnapshot.from_bytes(data, path)
+
+class SnapshotWriter:
+    """Фоновая запись снимков; при отставании записывается только самый свежий"""
+    def __init__(self, path, queue_size=AUTOSAVE_QUEUE_SIZE):
+        self.path = path
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.written = 0
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, name='snapshot-writer', daemon=True)
+        self.thread.start()
+
+    def submit(self, snapshot):
+        """Постановка снимка в очередь; самый старый снимок вытесняется при переполнении"""
+        while True:
+            try:
+                self.queue.put_nowait(snapshot)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _run(self):
+        while True:
+            snapshot = self.queue.get()
+            if snapshot is None:
+                break
+            # Пишем только последний снимок из накопившихся
+            while not self.queue.empty():
+                newer = self.queue.get_nowait()
+                if newer is None:
+                    self._write(snapshot)
+                    return
+                self.dropped += 1
+                snapshot = newer
+            self._write(snapshot)
+
+    def _write(self, snapshot):
+        try:
+            save_snapshot(self.path, snapshot)
+            self.written += 1
+        except OSError as error:
+            logger.warning("Не удалось записать снимок %s: %s", self.path, error)
+
+    def close(self):
+        """Дозапись очереди и остановка потока"""
+        self.queue.put(None)
+        self.thread.join()
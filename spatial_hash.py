@@ -0,0 +1,108 @@
+import math
+from settings import *
+
+class SpatialHash:
+    """Равномерная сетка для быстрых запросов соседей по радиусу"""
+    def __init__(self, cell_size=SPATIAL_HASH_CELL_SIZE, order=None):
+        self.cell_size = cell_size
+        self.order = order  # Ключ порядка соседей; без него - порядок вставки в ячейки
+        # Ячейки хранят словари вместо множеств, чтобы порядок обхода был детерминированным
+        self.cells = {}
+        self.sprite_cells = {}
+
+    def _cell_for(self, x, y):
+        """Ячейка сетки для точки в пикселях"""
+        return (int(x // self.cell_size), int(y // self.cell_size))
+
+    def clear(self):
+        """Очистка сетки"""
+        self.cells = {}
+        self.sprite_cells = {}
+
+    def insert(self, sprite):
+        """Добавление спрайта в сетку"""
+        cell = self._cell_for(*sprite.rect.center)
+        self.cells.setdefault(cell, {})[sprite] = None
+        self.sprite_cells[sprite] = cell
+
+    def remove(self, sprite):
+        """Удаление спрайта из сетки"""
+        cell = self.sprite_cells.pop(sprite, None)
+        if cell is None:
+            return
+        bucket = self.cells.get(cell)
+        if bucket is not None:
+            bucket.pop(sprite, None)
+            if not bucket:
+                del self.cells[cell]
+
+    def move(self, sprite):
+        """Обновление ячейки спрайта после перемещения"""
+        cell = self._cell_for(*sprite.rect.center)
+        old_cell = self.sprite_cells.get(sprite)
+        if old_cell == cell:
+            return
+        self.remove(sprite)
+        self.cells.setdefault(cell, {})[sprite] = None
+        self.sprite_cells[sprite] = cell
+
+    def rebuild(self, sprites):
+        """Полная перестройка сетки по группе спрайтов"""
+        self.clear()
+        for sprite in sprites:
+            if sprite.alive:
+                self.insert(sprite)
+
+    def query_rect(self, left, top, right, bottom):
+        """Кандидаты из ячеек, пересекающих прямоугольник"""
+        min_cx, min_cy = self._cell_for(left, top)
+        max_cx, max_cy = self._cell_for(right, bottom)
+        cells = self.cells
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    yield from bucket
+
+    def query_radius(self, x, y, radius, exclude=None):
+        """Живые спрайты, центры которых лежат строго внутри радиуса"""
+        radius_sq = radius * radius
+        for sprite in self.query_rect(x - radius, y - radius, x + radius, y + radius):
+            if sprite is exclude or not sprite.alive:
+                continue
+            dx = x - sprite.rect.centerx
+            dy = y - sprite.rect.centery
+            if dx * dx + dy * dy < radius_sq:
+                yield sprite
+
+    def neighbors(self, sprite, radius):
+        """Соседи спрайта с расстояниями до них"""
+        x, y = sprite.rect.center
+        radius_sq = radius * radius
+        found = []
+        for other in self.query_rect(x - radius, y - radius, x + radius, y + radius):
+            if other is sprite or not other.alive:
+                continue
+            dx = x - other.rect.centerx
+            dy = y - other.rect.centery
+            dist_sq = dx * dx + dy * dy
+            if dist_sq < radius_sq:
+                found.append((other, math.sqrt(dist_sq)))
+        if self.order is not None and len(found) > 1:
+            # Суммы сил по соседям зависят от порядка сложения
+            order = self.order
+            found.sort(key=lambda item: order(item[0]))
+        return found
+
+    def any_overlap(self, x, y, radius, max_other_radius, exclude=None):
+        """Есть ли спрайт, чей круг пересекается с кругом (x, y, radius)"""
+        reach = radius + max_other_radius
+        for other in self.query_rect(x - reach, y - reach, x + reach, y + reach):
+            if other is exclude or not other.alive:
+                continue
+            dx = x - other.rect.centerx
+            dy = y - other.rect.centery
+            limit = radius + other.radius
+            if dx * dx + dy * dy < limit * limit:
+                return True
+        return False
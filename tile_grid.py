@@ -0,0 +1,131 @@
+import math
+import numpy as np
+from settings import *
+
+# Таблица флагов, индексируемая типом тайла
+TILE_FLAGS = np.zeros(256, dtype=np.uint8)
+for tile_type, tile_flags in TILE_TYPE_FLAGS.items():
+    TILE_FLAGS[tile_type] = tile_flags
+
+class TileGrid:
+    """Компактная карта тайлов на NumPy со слоем флагов"""
+    def __init__(self, width, height, tiles=None, tile_size=TILESIZE):
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        if tiles is None:
+            tiles = np.full((width, height), TILE_WALL, dtype=np.uint8)
+        # Индексация [x, y], как и у прежнего списка списков
+        self.tiles = tiles
+        self.flags = None
+        self.update_flags()
+
+    def update_flags(self):
+        """Пересчёт слоя флагов после изменения тайлов"""
+        self.flags = TILE_FLAGS[self.tiles]
+        # Рамка из сплошных тайлов позволяет проверять точки за картой без ветвлений
+        self._solid = np.ones((self.width + 2, self.height + 2), dtype=bool)
+        self._solid[1:-1, 1:-1] = (self.flags & TILE_FLAG_SOLID) != 0
+        self._limits = np.array([self.width, self.height], dtype=np.intp)
+
+    def set_tile(self, x, y, tile):
+        """Изменение одного тайла с обновлением флагов"""
+        self.tiles[x, y] = tile
+        self.flags[x, y] = TILE_FLAGS[tile]
+        self._solid[x + 1, y + 1] = (TILE_FLAGS[tile] & TILE_FLAG_SOLID) != 0
+
+    def has_flag(self, tile_x, tile_y, flag):
+        """Проверка флага у тайла по координатам в тайлах"""
+        if 0 <= tile_x < self.width and 0 <= tile_y < self.height:
+            return bool(self.flags[tile_x, tile_y] & flag)
+        return False
+
+    def is_wall_at(self, x, y):
+        """Проверка наличия стены в позиции в пикселях"""
+        tile_x = int(x // self.tile_size)
+        tile_y = int(y // self.tile_size)
+        if 0 <= tile_x < self.width and 0 <= tile_y < self.height:
+            return bool(self.flags[tile_x, tile_y] & TILE_FLAG_SOLID)
+        return True  # За пределами уровня считаем стеной
+
+    def is_wall_in_rect(self, left, top, right, bottom):
+        """Есть ли стена среди тайлов, которые накрывает прямоугольник (границы включительно)"""
+        size = self.tile_size
+        # Индексы в массиве с рамкой: -1 и width/height указывают на сплошную рамку
+        x0 = min(max(int(left // size), -1), self.width) + 1
+        x1 = min(max(int(right // size), -1), self.width) + 2
+        y0 = min(max(int(top // size), -1), self.height) + 1
+        y1 = min(max(int(bottom // size), -1), self.height) + 2
+        return bool(self._solid[x0:x1, y0:y1].any())
+
+    def raycast(self, x0, y0, x1, y1):
+        """Первый сплошной тайл на отрезке между точками в пикселях (DDA) или None, если путь свободен"""
+        size = self.tile_size
+        tile_x = int(x0 // size)
+        tile_y = int(y0 // size)
+        end_x = int(x1 // size)
+        end_y = int(y1 // size)
+        dx = x1 - x0
+        dy = y1 - y0
+        step_x = 1 if dx > 0 else -1
+        step_y = 1 if dy > 0 else -1
+        # Доля отрезка до следующей границы тайла по каждой оси и шаг этой доли на один тайл
+        t_max_x = ((tile_x + (dx > 0)) * size - x0) / dx if dx else math.inf
+        t_max_y = ((tile_y + (dy > 0)) * size - y0) / dy if dy else math.inf
+        t_delta_x = size / abs(dx) if dx else math.inf
+        t_delta_y = size / abs(dy) if dy else math.inf
+
+        width, height = self.width, self.height
+        solid = self._solid
+        for _ in range(abs(end_x - tile_x) + abs(end_y - tile_y) + 1):
+            if not (0 <= tile_x < width and 0 <= tile_y < height) or solid[tile_x + 1, tile_y + 1]:
+                return tile_x, tile_y
+            if t_max_x < t_max_y:
+                tile_x += step_x
+                t_max_x += t_delta_x
+            else:
+                tile_y += step_y
+                t_max_y += t_delta_y
+        return None
+
+    def segments_blocked(self, starts, ends):
+        """Пакетный DDA для массивов отрезков (N, 2): пересекает ли отрезок сплошной тайл"""
+        if len(starts) < RAYCAST_BATCH_MIN:
+            # Несколько отрезков дешевле проверить по одному, чем платить за векторные операции
+            return np.array([self.raycast(x0, y0, x1, y1) is not None
+                             for (x0, y0), (x1, y1) in zip(np.asarray(starts).tolist(), np.asarray(ends).tolist())],
+                            dtype=bool)
+        size = self.tile_size
+        starts = np.asarray(starts, dtype=np.float64)
+        ends = np.asarray(ends, dtype=np.float64)
+        tiles = (starts // size).astype(np.intp)
+        end_tiles = (ends // size).astype(np.intp)
+        delta = ends - starts
+        steps = np.where(delta > 0, 1, -1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t_max = np.where(delta != 0, ((tiles + (delta > 0)) * size - starts) / delta, np.inf)
+            t_delta = np.where(delta != 0, size / np.abs(delta), np.inf)
+        remaining = np.abs(end_tiles - tiles).sum(axis=1)
+
+        blocked = self._solid_at(tiles)
+        # Все отрезки продвигаются на тайл за итерацию: шаг снаряда укладывается в одну-две
+        active = np.flatnonzero(~blocked & (remaining > 0))
+        while len(active):
+            # Ось, граница которой ближе: 0 - x, 1 - y
+            axis = (t_max[active, 0] >= t_max[active, 1]).astype(np.intp)
+            tiles[active, axis] += steps[active, axis]
+            t_max[active, axis] += t_delta[active, axis]
+            remaining[active] -= 1
+            blocked[active] = self._solid_at(tiles[active])
+            active = active[~blocked[active] & (remaining[active] > 0)]
+        return blocked
+
+    def _solid_at(self, tiles):
+        """Сплошность тайлов (N, 2) с учётом рамки за пределами карты"""
+        tiles = np.clip(tiles, -1, self._limits)
+        return self._solid[tiles[:, 0] + 1, tiles[:, 1] + 1]
+
+    def positions_of(self, tile):
+        """Координаты всех тайлов указанного типа в тайлах"""
+        # Обходим построчно (сначала y), как прежний цикл по карте
+        return [(int(x), int(y)) for y, x in np.argwhere(self.tiles.T == tile)]
@@ -0,0 +1,137 @@
+import cProfile
+import json
+import os
+import threading
+import time
+from collections import deque
+from settings import *
+
+# Дорожки трассы: основной поток кадра и сводное время ИИ по классам врагов
+TRACE_TID_MAIN = 0
+TRACE_TID_AI = 1
+TRACE_THREAD_NAMES = {TRACE_TID_MAIN: 'кадр', TRACE_TID_AI: 'ИИ по классам (сумма за кадр)'}
+
+class TraceRecorder:
+    """Кольцевой буфер событий кадра, сбрасываемый в Chrome trace при провале кадра"""
+    def __init__(self, directory=None, capacity=TRACE_BUFFER_SIZE, threshold=TRACE_HITCH_MS,
+                 post_frames=TRACE_POST_FRAMES, cooldown=TRACE_DUMP_COOLDOWN, max_dumps=TRACE_MAX_DUMPS):
+        self.directory = directory  # None - только запись в буфер, без сброса на диск
+        self.events = deque(maxlen=capacity)  # (имя, начало, длительность, дорожка, аргументы)
+        self.threshold = threshold
+        self.post_frames = post_frames
+        self.cooldown = cooldown
+        self.max_dumps = max_dumps
+        self.origin = time.perf_counter()
+        self.pending = None  # (кадр сброса, описание провала)
+        self.last_dump = None
+        self.dumps = []
+        self._threads = []
+
+    def complete(self, name, start, duration, tid=TRACE_TID_MAIN, args=None):
+        """Событие с началом и длительностью в секундах perf_counter"""
+        self.events.append((name, start, duration, tid, args))
+
+    def end_frame(self, frame, start, frame_ms, aggregated):
+        """Закрытие кадра: событие кадра, сводки ИИ и проверка провала"""
+        self.complete('frame', start, frame_ms / 1000, args={'frame': frame})
+        # Сводное время по классам выкладываем подряд от начала кадра на своей дорожке
+        offset = start
+        for name, (seconds, calls) in aggregated.items():
+            self.complete(name, offset, seconds, TRACE_TID_AI, {'calls': calls})
+            offset += seconds
+
+        if self.directory is None:
+            return
+        if self.pending is None and frame_ms >= self.threshold and self._can_dump(start):
+            # Ждём ещё несколько кадров, чтобы в трассу попало и то, что было после провала
+            self.pending = (frame + self.post_frames, f'frame{frame}_{frame_ms:.0f}ms')
+        if self.pending is not None and frame >= self.pending[0]:
+            self.dump(self.pending[1])
+            self.pending = None
+
+    def _can_dump(self, now):
+        if len(self.dumps) >= self.max_dumps:
+            return False
+        return self.last_dump is None or (now - self.last_dump) * 1000 >= self.cooldown
+
+    def to_chrome(self, events):
+        """Преобразование событий в формат Chrome/Perfetto trace"""
+        trace_events = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': 0, 'tid': tid, 'args': {'name': name}}
+            for tid, name in TRACE_THREAD_NAMES.items()
+        ]
+        origin = self.origin
+        for name, start, duration, tid, args in events:
+            event = {
+                'name': name,
+                'cat': name.split('.', 1)[0],
+                'ph': 'X',
+                'ts': (start - origin) * 1e6,
+                'dur': duration * 1e6,
+                'pid': 0,
+                'tid': tid
+            }
+            if args:
+                event['args'] = args
+            trace_events.append(event)
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+    def dump(self, label='manual'):
+        """Запись содержимого буфера в файл; сериализация идёт в фоновом потоке"""
+        if self.directory is None:
+            return None
+        self.last_dump = time.perf_counter()
+        events = list(self.events)
+        path = os.path.join(self.directory, f'trace_{time.strftime("%Y%m%d_%H%M%S")}_{label}.json')
+        self.dumps.append(path)
+        thread = threading.Thread(target=self._write, args=(path, events), name='trace-writer', daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return path
+
+    def _write(self, path, events):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome(events), f)
+
+    def close(self):
+        """Ожидание незаконченных записей трасс"""
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+class ProfileCapture:
+    """Захват полного профиля cProfile по горячей клавише или на весь запуск"""
+    def __init__(self, directory=TRACE_DIR):
+        self.directory = directory
+        self.profile = None
+
+    @property
+    def active(self):
+        """Идёт ли сейчас захват"""
+        return self.profile is not None
+
+    def start(self):
+        """Начало захвата"""
+        if self.profile is None:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def stop(self, path=None):
+        """Остановка захвата и запись .prof-файла для pstats/snakeviz"""
+        if self.profile is None:
+            return None
+        self.profile.disable()
+        if path is None:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f'profile_{time.strftime("%Y%m%d_%H%M%S")}.prof')
+        self.profile.dump_stats(path)
+        self.profile = None
+        return path
+
+    def toggle(self):
+        """Запуск или остановка захвата; возвращает путь записанного профиля"""
+        if self.active:
+            return self.stop()
+        self.start()
+        return None
@@ -1,18 +1,17 @@
 import pygame
 import math
-import random
 from settings import *
 
 class MagicWeapon:
     def __init__(self, game, weapon_type):
         self.game = game
+        self.clock = game.clock
         self.weapon_type = weapon_type
         self.settings = MAGIC_WEAPONS[weapon_type]
         self.last_cast_time = 0
-        self.projectiles = pygame.sprite.Group()
 
     def can_cast(self, player):
-        current_time = pygame.time.get_ticks()
+        current_time = self.clock.get_ticks()
         return (current_time - self.last_cast_time >= self.settings['cooldown'] and 
                 player.current_mana >= self.settings['mana_cost'])
 
@@ -21,7 +20,7 @@ class MagicWeapon:
             return False
         
         player.current_mana -= self.settings['mana_cost']
-        self.last_cast_time = pygame.time.get_ticks()
+        self.last_cast_time = self.clock.get_ticks()
         return True
 
 class Fireball(MagicWeapon):
@@ -35,13 +34,8 @@ class Fireball(MagicWeapon):
             if direction.length() > 0:
                 direction = direction.normalize()
             
-            projectile = FireballProjectile(
-                player.rect.centerx,
-                player.rect.centery,
-                direction,
-                self.settings
-            )
-            self.projectiles.add(projectile)
+            self.game.projectiles.spawn(self.weapon_type, player.rect.centerx, player.rect.centery,
+                                        direction, self.settings['damage'])
             return True
         return False
 
@@ -55,13 +49,8 @@ class IceLance(MagicWeapon):
             if direction.length() > 0:
                 direction = direction.normalize()
             
-            projectile = IceLanceProjectile(
-                player.rect.centerx,
-                player.rect.centery,
-                direction,
-                self.settings
-            )
-            self.projectiles.add(projectile)
+            self.game.projectiles.spawn(self.weapon_type, player.rect.centerx, player.rect.centery,
+                                        direction, self.settings['damage'])
             return True
         return False
 
@@ -75,10 +64,12 @@ class LightningBolt(MagicWeapon):
         closest_enemy = None
         min_distance = self.chain_range
         
+        level = self.game.level
         for enemy in self.game.enemies:
             if enemy not in hit_enemies:
                 distance = pygame.math.Vector2(enemy.rect.center).distance_to(current_pos)
-                if distance < min_distance:
+                # Молния не перескакивает сквозь стены
+                if distance < min_distance and level.has_line_of_sight(current_pos, enemy.rect.center):
                     min_distance = distance
                     closest_enemy = enemy
         
@@ -90,9 +81,11 @@ class LightningBolt(MagicWeapon):
             first_target = None
             min_distance = self.settings['range']  # Используем range вместо float('inf')
             
+            level = self.game.level
             for enemy in self.game.enemies:
                 distance = pygame.math.Vector2(enemy.rect.center).distance_to(player.rect.center)
-                if distance < min_distance:  # Проверяем, что враг в пределах досягаемости
+                # Проверяем, что враг в пределах досягаемости и виден игроку
+                if distance < min_distance and level.has_line_of_sight(player.rect.center, enemy.rect.center):
                     min_distance = distance
                     first_target = enemy
             
@@ -116,64 +109,20 @@ class LightningBolt(MagicWeapon):
                         break
                 
                 # Создаем эффект молнии и добавляем его в группу эффектов игры
-                effect = LightningEffect(chain_points, self.settings)
+                effect = LightningEffect(chain_points, self.settings, self.clock, self.game.fx_rng)
                 self.game.effects.add(effect)
             return True
         return False
 
-class MagicProjectile(pygame.sprite.Sprite):
-    def __init__(self, x, y, direction, settings):
-        super().__init__()
-        self.settings = settings
-        self.direction = direction
-        self.speed = settings['projectile_speed']
-        self.distance_traveled = 0
-        self.max_range = settings['range']
-        
-        # Создаем спрайт снаряда
-        self.image = pygame.Surface((settings['size'], settings['size']), pygame.SRCALPHA)
-        pygame.draw.circle(self.image, settings['color'], 
-                         (settings['size']//2, settings['size']//2), 
-                         settings['size']//2)
-        self.rect = self.image.get_rect()
-        self.rect.center = (x, y)
-        self.position = pygame.math.Vector2(self.rect.center)
-
-    def update(self):
-        # Обновляем позицию
-        movement = self.direction * self.speed
-        self.position += movement
-        self.rect.center = self.position
-        self.distance_traveled += movement.length()
-        
-        # Уничтожаем снаряд, ��сли он пролетел максимальную дистанцию
-        if self.distance_traveled >= self.max_range:
-            self.kill()
-
-class FireballProjectile(MagicProjectile):
-    def __init__(self, x, y, direction, settings):
-        super().__init__(x, y, direction, settings)
-        # Добавляем эффект свечения
-        self.glow_radius = settings['size'] * 1.5
-        self.glow_surface = pygame.Surface((self.glow_radius * 2, self.glow_radius * 2), pygame.SRCALPHA)
-        pygame.draw.circle(self.glow_surface, (*settings['color'], 128), 
-                         (self.glow_radius, self.glow_radius), self.glow_radius)
-
-class IceLanceProjectile(MagicProjectile):
-    def __init__(self, x, y, direction, settings):
-        super().__init__(x, y, direction, settings)
-        # Создаем удлиненную форму для ледяного копья
-        self.image = pygame.Surface((settings['size'] * 2, settings['size']), pygame.SRCALPHA)
-        pygame.draw.ellipse(self.image, settings['color'], 
-                          (0, 0, settings['size'] * 2, settings['size']))
-
 class LightningEffect(pygame.sprite.Sprite):
-    def __init__(self, chain_points, settings):
+    def __init__(self, chain_points, settings, clock, rng):
         super().__init__()
         self.chain_points = chain_points
         self.settings = settings
+        self.clock = clock
+        self.rng = rng  # Отдельный поток случайных чисел для визуальных эффектов
         self.lifetime = 200
-        self.creation_time = pygame.time.get_ticks()
+        self.creation_time = self.clock.get_ticks()
         self.last_update = self.creation_time
         self.update_interval = 50  # Обновление анимации каждые 50мс
         
@@ -199,14 +148,14 @@ class LightningEffect(pygame.sprite.Sprite):
             segment_branches = []
             for _ in range(3):  # 3 ответвления на сегмент
                 offset = (
-                    random.randint(-15, 15),
-                    random.randint(-15, 15)
+                    self.rng.randint(-15, 15),
+                    self.rng.randint(-15, 15)
                 )
                 segment_branches.append(offset)
             self.branch_offsets.append(segment_branches)
     
     def update(self):
-        current_time = pygame.time.get_ticks()
+        current_time = self.clock.get_ticks()
         
         # Проверяем время жизни
         if not self.is_alive():
@@ -229,7 +178,7 @@ class LightningEffect(pygame.sprite.Sprite):
             self.last_update = current_time
     
     def is_alive(self):
-        return pygame.time.get_ticks() - self.creation_time < self.lifetime
+        return self.clock.get_ticks() - self.creation_time < self.lifetime
     
     def draw(self, screen, camera):
         if self.is_alive():
@@ -259,12 +208,12 @@ class LightningEffect(pygame.sprite.Sprite):
                     
                     # Добавляем небольшое смещение для начала и конца ответвления
                     start_offset = (
-                        start[0] + random.randint(-5, 5),
-                        start[1] + random.randint(-5, 5)
+                        start[0] + self.rng.randint(-5, 5),
+                        start[1] + self.rng.randint(-5, 5)
                     )
                     end_offset = (
-                        end[0] + random.randint(-5, 5),
-                        end[1] + random.randint(-5, 5)
+                        end[0] + self.rng.randint(-5, 5),
+                        end[1] + self.rng.randint(-5, 5)
                     )
                     
                     pygame.draw.line(screen, branch_color, start_offset, mid_point, self.settings['width'] - 1)
@@ -281,18 +230,20 @@ class Heal(MagicWeapon):
             player.hp = min(player.max_hp, player.hp + heal_amount)
             
             # Создаем визуальный эффект
-            effect = HealEffect(player.rect.center, self.settings)
+            effect = HealEffect(player.rect.center, self.settings, self.clock)
             self.game.effects.add(effect)
+            self.game.emit_particles('heal', *player.rect.center)
             return True
         return False
 
 class HealEffect(pygame.sprite.Sprite):
-    def __init__(self, center_pos, settings):
+    def __init__(self, center_pos, settings, clock):
         super().__init__()
         self.settings = settings
         self.center_pos = center_pos
+        self.clock = clock
         self.lifetime = 1000  # 1 секунда
-        self.creation_time = pygame.time.get_ticks()
+        self.creation_time = self.clock.get_ticks()
         self.radius = settings['size']
         self.max_radius = settings['size'] * 2
         
@@ -306,12 +257,12 @@ class HealEffect(pygame.sprite.Sprite):
             self.kill()
     
     def is_alive(self):
-        return pygame.time.get_ticks() - self.creation_time < self.lifetime
+        return self.clock.get_ticks() - self.creation_time < self.lifetime
     
     def draw(self, screen, camera):
         if self.is_alive():
             # Вычисляем текущий размер эффекта
-            progress = (pygame.time.get_ticks() - self.creation_time) / self.lifetime
+            progress = (self.clock.get_ticks() - self.creation_time) / self.lifetime
             current_radius = self.radius + (self.max_radius - self.radius) * progress
             
             # Вычисляем прозрачность (убывает со временем)